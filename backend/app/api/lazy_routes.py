@@ -0,0 +1,72 @@
+import asyncio
+import importlib
+import logging
+import time
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+def _import_modules(names: list[str]) -> list:
+    return [importlib.import_module(name) for name in names]
+
+
+class LazyRouters:
+    """
+    API routers that are imported in the background once the server has started.
+
+    The route modules pull in pydantic_ai, httpx, PIL and the services behind
+    them, which is most of the backend's import time. Loading them after
+    startup lets the server answer /health right away; other requests wait in
+    WaitForRoutesMiddleware until the routes are registered.
+    """
+
+    def __init__(self, routers: list[tuple[str, str, str]]):
+        # (module, prefix, tag); each module exposes a `router`
+        self.routers = routers
+        self.loaded = False
+        self.load_ms: float | None = None
+        self._ready = asyncio.Event()
+        self._error: Exception | None = None
+
+    async def load(self, app: FastAPI) -> None:
+        """Import the route modules in a worker thread, then register their routes on the loop."""
+        if self.loaded:
+            return
+        start = time.perf_counter()
+        try:
+            # Imports are CPU-bound; keep them off the event loop
+            modules = await asyncio.to_thread(_import_modules, [name for name, _, _ in self.routers])
+            for module, (_, prefix, tag) in zip(modules, self.routers):
+                app.include_router(module.router, prefix=prefix, tags=[tag])
+            # Regenerate the OpenAPI schema with the new routes
+            app.openapi_schema = None
+        except Exception as e:
+            self._error = e
+            raise
+        finally:
+            self._ready.set()
+        self.loaded = True
+        self.load_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("API routes loaded", extra={"load_ms": self.load_ms})
+
+    async def wait(self) -> None:
+        """Wait until the routes are registered."""
+        await self._ready.wait()
+        if self._error is not None:
+            raise RuntimeError("API routes failed to load") from self._error
+
+
+class WaitForRoutesMiddleware:
+    """Hold requests (except exempt paths such as /health) until the lazily loaded routes are registered."""
+
+    def __init__(self, app: ASGIApp, routers: LazyRouters, exempt_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.routers = routers
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket") and scope["path"] not in self.exempt_paths:
+            await self.routers.wait()
+        await self.app(scope, receive, send)
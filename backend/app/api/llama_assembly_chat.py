@@ -1,12 +1,17 @@
+import logging
 from fastapi import APIRouter, Query, UploadFile, File, HTTPException
-from pydantic_core import to_jsonable_python
 from pydantic_ai.exceptions import ModelHTTPError
-from app.services.llama_assembly_agent import run_agent_with_files
-from app.services.session_manager import (
-    get_manual_text,
-    get_conversation_history,
-    update_conversation_history,
-)
+from pydantic_ai.messages import ModelMessage
+from app.api.sse import format_sse, format_sse_error, sse_response
+from app.services.answer_cache import CachedTurn, check_answer_cache
+from app.services.image_processing import SUPPORTED_IMAGE_TYPES, preprocess_images
+from app.services.manual_index import ManualIndex
+from app.services.llama_assembly_agent import run_agent_with_files, stream_agent_with_files
+from app.services.session_manager import get_session, append_conversation_messages
+from app.api.uploads import read_upload
+from app.core.config import UPLOAD_MAX_IMAGE_BYTES, UPLOAD_MAX_IMAGES
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,6 +21,7 @@ async def chat(
     message: str = Query(..., description="The message to send to the AI"),
     files: list[UploadFile] = File(None, description="Optional images (up to 5)"),
     session_id: str = Query(None, description="Optional session ID from PDF upload for manual context"),
+    stream: bool = Query(False, description="Stream the response as Server-Sent Events"),
 ):
     """
     Chat endpoint using SambaNova Llama-4-Maverick model.
@@ -24,71 +30,79 @@ async def chat(
     - Text-only messages
     - Messages with attached images (JPEG, PNG, GIF, WebP) - up to 5 images
     - Optional session_id for assembly manual context (from /api/pdf-to-text)
+    - Optional stream=true to receive "delta" events as tokens arrive, followed by a "done" event
+    - With ANSWER_CACHE_ENABLED, repeated first-turn questions about the same manual are
+      answered from a local cache ("cached": true in the response)
     """
     try:
         # Look up manual text and conversation history from session if session_id provided
+        session = None
         manual_text = None
+        manual_index = None
         conversation_history = None
         if session_id:
-            manual_text = get_manual_text(session_id)
-            if manual_text is None:
+            session = await get_session(session_id)
+            if session is None:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Session not found or expired: {session_id}",
                 )
-            conversation_history = get_conversation_history(session_id)
+            manual_text = session.manual_text
+            manual_index = session.manual_index
+            conversation_history = session.conversation_history
 
-        if not files:
-            # Text-only message (with optional manual context and conversation history)
-            result = await run_agent_with_files(
-                message, manual_text=manual_text, message_history=conversation_history
-            )
-        else:
+        image_urls = None
+        if files:
             # Validate image count
             valid_files = [f for f in files if f]
-            if len(valid_files) > 5:
+            if len(valid_files) > UPLOAD_MAX_IMAGES:
                 raise HTTPException(
                     status_code=400,
-                    detail="Maximum 5 images allowed per request",
+                    detail=f"Maximum {UPLOAD_MAX_IMAGES} images allowed per request",
                 )
 
-            # Process files
-            file_data = []
+            # Validate all file types before reading any image data
             for file in valid_files:
-                # Read file content
-                content = await file.read()
-
-                # Validate file type
                 content_type = file.content_type or "application/octet-stream"
-
-                # Support only images
-                supported_types = [
-                    "image/jpeg",
-                    "image/png",
-                    "image/gif",
-                    "image/webp",
-                ]
-
-                if content_type not in supported_types:
+                if content_type not in SUPPORTED_IMAGE_TYPES:
                     raise HTTPException(
                         status_code=400,
                         detail=f"Unsupported file type: {content_type}. Only images (JPEG, PNG, GIF, WebP) are supported.",
                     )
 
-                file_data.append((content, file.filename or "file", content_type))
+            # Downscale and encode all images in parallel, off the event loop
+            image_contents = [
+                await read_upload(file, UPLOAD_MAX_IMAGE_BYTES, "Image") for file in valid_files
+            ]
+            image_urls = await preprocess_images(image_contents, session_id)
 
-            # Run agent with files, manual context, and conversation history
-            result = await run_agent_with_files(
-                message, file_data, manual_text, conversation_history
+        # Repeated first-turn questions about the same manual are answered from the cache
+        turn = await check_answer_cache(session, session_id, message, has_images=bool(image_urls))
+
+        if stream:
+            return sse_response(
+                _stream_chat(message, image_urls, manual_text, manual_index, conversation_history, session_id, turn)
             )
 
+        if turn.hit is not None:
+            return {"response": turn.hit.answer, "cached": True}
+
+        # Run agent with optional files, manual context, and conversation history
+        result = await run_agent_with_files(
+            message,
+            image_urls=image_urls,
+            manual_text=manual_text,
+            message_history=conversation_history,
+            manual_index=manual_index,
+        )
+
         # Update conversation history in session if session_id provided
         if session_id:
-            # Serialize all messages and update session
-            serialized_messages = to_jsonable_python(result.all_messages())
-            update_conversation_history(session_id, serialized_messages)
+            # Append only this turn's messages to the session
+            await append_conversation_messages(session_id, result.new_messages())
+        turn.store(result.output, result.new_messages())
 
-        return {"response": result.output}
+        return {"response": result.output, "cached": False}
 
     except HTTPException:
         raise
@@ -105,3 +119,41 @@ async def chat(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
+
+
+async def _stream_chat(
+    message: str,
+    image_urls: list[str] | None,
+    manual_text: str | None,
+    manual_index: ManualIndex | None,
+    conversation_history: list[ModelMessage] | None,
+    session_id: str | None,
+    turn: CachedTurn,
+):
+    """Yield "delta" events while the agent generates, then persist history and send "done"."""
+    if turn.hit is not None:
+        # Already in the session history; replay the whole answer as one delta
+        yield format_sse("delta", {"text": turn.hit.answer})
+        yield format_sse("done", {"response": turn.hit.answer, "cached": True})
+        return
+
+    try:
+        async with stream_agent_with_files(
+            message,
+            image_urls=image_urls,
+            manual_text=manual_text,
+            message_history=conversation_history,
+            manual_index=manual_index,
+        ) as result:
+            async for delta in result.stream_text(delta=True):
+                yield format_sse("delta", {"text": delta})
+            output = await result.get_output()
+            new_messages = result.new_messages()
+
+        if session_id:
+            await append_conversation_messages(session_id, new_messages)
+        turn.store(output, new_messages)
+
+        yield format_sse("done", {"response": output, "cached": False})
+    except Exception as e:
+        yield format_sse_error(e)
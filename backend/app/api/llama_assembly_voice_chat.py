@@ -1,33 +1,46 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from pydantic_core import to_jsonable_python
+import logging
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Response
 from pydantic_ai.exceptions import ModelHTTPError
-from app.services.transcription import transcription_service
-from app.services.llama_assembly_agent import run_agent_with_files
-from app.services.session_manager import (
-    get_manual_text,
-    get_conversation_history,
-    update_conversation_history,
-)
-from pathlib import Path
-from datetime import datetime
+from pydantic_ai.messages import ModelMessage
+from app.services.answer_cache import CachedTurn, check_answer_cache
+from app.services.transcription import TranscriptionTimeoutError, transcribe_upload
+from app.api.sse import format_sse, format_sse_error, sse_response
+from app.services.manual_index import ManualIndex
+from app.services.llama_assembly_agent import run_agent_with_files, stream_agent_with_files
+from app.services.session_manager import get_session, append_conversation_messages
+from app.services.session_store import ManualSession
+from app.services.recording_archiver import recording_archiver
+from app.services.stage_graph import StageGraph
+from app.api.uploads import read_upload
+from app.core.config import UPLOAD_MAX_AUDIO_BYTES
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 @router.post("/voice-chat")
 async def voice_chat(
+    response: Response,
     file: UploadFile = File(..., description="Audio file to transcribe and chat about"),
     session_id: str = Query(
         None, description="Optional session ID from PDF upload for manual context"
     ),
+    stream: bool = Query(False, description="Stream the response as Server-Sent Events"),
 ):
     """
     Voice chat endpoint combining audio transcription with Llama assembly assistant.
 
     Workflow:
-    1. Transcribe audio using SambaNova's Whisper-Large-v3
+    1. Read and transcribe audio using SambaNova's Whisper-Large-v3, while the
+       session is loaded concurrently (the recording is archived in the background)
     2. Send transcribed text to Llama assembly agent (with optional manual context)
-    3. Return both transcription and agent response
+    3. Return both transcription and agent response, with a Server-Timing header
+       breaking latency down by stage
+
+    With stream=true the response is a text/event-stream instead:
+    "transcription" first, then "delta" events as tokens arrive, then "done"
+    once the session history has been persisted.
 
     Supports:
     - Audio transcription (MP3, WAV, M4A, etc.)
@@ -37,87 +50,117 @@ async def voice_chat(
     Args:
         file: Audio file to transcribe
         session_id: Optional session ID for manual context and conversation history
+        stream: Whether to stream the agent response as Server-Sent Events
 
     Returns:
-        JSON with transcription, AI response, and filename
+        JSON with transcription, AI response, cached flag, and filename
     """
     if not file:
         raise HTTPException(status_code=400, detail="No file provided")
 
     try:
-        # Step 1: Read and save audio file
-        print(f"[Voice Chat] Received file: {file.filename}, content_type: {file.content_type}")
-        contents = await file.read()
-        print(f"[Voice Chat] File size: {len(contents)} bytes")
-
-        if len(contents) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Received empty audio file"
+        # Run independent stages concurrently: the session loads while the upload
+        # is read and transcribed, and a missing session aborts transcription
+        graph = StageGraph()
+
+        async def read_audio():
+            contents = await read_upload(file, UPLOAD_MAX_AUDIO_BYTES, "Audio file")
+            logger.info(
+                "Received audio",
+                extra={"upload_filename": file.filename, "content_type": file.content_type, "bytes": len(contents)},
             )
 
-        # Save audio file to recordings directory
-        recordings_dir = Path("recordings")
-        recordings_dir.mkdir(exist_ok=True)
-
-        # Create filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = Path(file.filename).suffix if file.filename else ".mp3"
-        saved_filename = f"recording_{timestamp}{file_extension}"
-        saved_path = recordings_dir / saved_filename
-
-        # Write audio file
-        with open(saved_path, "wb") as f:
-            f.write(contents)
-        print(f"[Voice Chat] Saved audio file to: {saved_path}")
-
-        # Step 2: Transcribe audio
-
-        transcription = transcription_service.transcribe_from_bytes(
-            contents, file.filename or "audio.mp3"
-        )
-        print(f"[Voice Chat] Transcription successful: {transcription[:100]}...")
+            if len(contents) == 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Received empty audio file"
+                )
 
-        # Step 3: Get manual text and conversation history from session if provided
-        manual_text = None
-        conversation_history = None
-        if session_id:
-            print(f"[Voice Chat] Using session_id: {session_id}")
-            manual_text = get_manual_text(session_id)
-            if manual_text is None:
+            # Archive the recording in the background, off the request path
+            recording_archiver.submit(contents, file.filename, prefix="recording")
+            return contents
+
+        async def transcribe(contents: bytes):
+            transcription = await transcribe_upload(contents, file.filename or "audio.mp3")
+            logger.debug("Transcription successful", extra={"preview": transcription[:100]})
+            return transcription
+
+        async def load_session():
+            # Get manual text and conversation history from session if provided
+            if not session_id:
+                return None
+            session = await get_session(session_id)
+            if session is None:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Session not found or expired: {session_id}",
                 )
-            conversation_history = get_conversation_history(session_id)
-
-        # Step 4: Send transcribed text to Llama assembly agent
-        print("[Voice Chat] Sending to Llama agent...")
-        result = await run_agent_with_files(
-            message=transcription,
-            manual_text=manual_text,
-            message_history=conversation_history,
-        )
-        print(f"[Voice Chat] Agent response received: {result.output[:100]}...")
+            return session
+
+        async def run_agent(transcription: str, session: ManualSession | None) -> tuple[str, bool]:
+            # Repeated first-turn questions about the same manual are answered from the cache
+            turn = await check_answer_cache(session, session_id, transcription)
+            if turn.hit is not None:
+                return turn.hit.answer, True
+
+            # Send transcribed text to Llama assembly agent
+            result = await run_agent_with_files(
+                message=transcription,
+                manual_text=session.manual_text if session else None,
+                message_history=session.conversation_history if session else None,
+                manual_index=session.manual_index if session else None,
+            )
+            logger.debug("Agent response received", extra={"preview": result.output[:100]})
+
+            # Update conversation history in session if session_id provided
+            if session_id:
+                # Append only this turn's messages to the session
+                await append_conversation_messages(session_id, result.new_messages())
+            turn.store(result.output, result.new_messages())
+            return result.output, False
+
+        graph.add("upload", read_audio)
+        graph.add("session", load_session)
+        graph.add("transcribe", transcribe, after=("upload",))
+
+        if stream:
+            # Only the stages before the first byte can be reported in the header
+            results = await graph.run()
+            transcription, session = results["transcribe"], results["session"]
+            turn = await check_answer_cache(session, session_id, transcription)
+            return sse_response(
+                _stream_voice_chat(
+                    transcription,
+                    session.manual_text if session else None,
+                    session.manual_index if session else None,
+                    session.conversation_history if session else None,
+                    session_id,
+                    file.filename,
+                    turn,
+                ),
+                headers={"Server-Timing": graph.server_timing()},
+            )
 
-        # Step 5: Update conversation history in session if session_id provided
-        if session_id:
-            # Serialize all messages and update session
-            serialized_messages = to_jsonable_python(result.all_messages())
-            update_conversation_history(session_id, serialized_messages)
+        graph.add("agent", run_agent, after=("transcribe", "session"))
+        results = await graph.run()
+        response.headers["Server-Timing"] = graph.server_timing()
 
-        # Step 6: Return transcription and response
+        # Return transcription and response
+        output, cached = results["agent"]
         return {
-            "transcription": transcription,
-            "response": result.output,
+            "transcription": results["transcribe"],
+            "response": output,
+            "cached": cached,
             "filename": file.filename,
         }
 
     except HTTPException:
         raise
+    except TranscriptionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ModelHTTPError as e:
         # Handle Pydantic AI model errors (rate limits, API errors, etc.)
-        print(f"[Voice Chat] ModelHTTPError: status={e.status_code}, body={e.body}")
+        logger.warning("Model error", extra={"status": e.status_code, "body": e.body})
         if e.status_code == 429:
             raise HTTPException(
                 status_code=429,
@@ -128,11 +171,53 @@ async def voice_chat(
             detail=f"AI model error: {e.body.get('message', str(e)) if isinstance(e.body, dict) else str(e)}"
         )
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"[Voice Chat] Error: {str(e)}")
-        print(f"[Voice Chat] Traceback:\n{error_trace}")
-
+        logger.exception("Voice chat failed")
         raise HTTPException(
             status_code=500, detail=f"Voice chat processing failed: {str(e)}"
         )
+
+
+async def _stream_voice_chat(
+    transcription: str,
+    manual_text: str | None,
+    manual_index: ManualIndex | None,
+    conversation_history: list[ModelMessage] | None,
+    session_id: str | None,
+    filename: str | None,
+    turn: CachedTurn,
+):
+    """Yield the transcription, then agent text deltas, then persist history and send "done"."""
+    yield format_sse("transcription", {"transcription": transcription, "filename": filename})
+    if turn.hit is not None:
+        # Already in the session history; replay the whole answer as one delta
+        yield format_sse("delta", {"text": turn.hit.answer})
+        yield format_sse(
+            "done",
+            {"transcription": transcription, "response": turn.hit.answer, "cached": True, "filename": filename},
+        )
+        return
+
+    try:
+        async with stream_agent_with_files(
+            message=transcription,
+            manual_text=manual_text,
+            message_history=conversation_history,
+            manual_index=manual_index,
+        ) as result:
+            async for delta in result.stream_text(delta=True):
+                yield format_sse("delta", {"text": delta})
+            output = await result.get_output()
+            new_messages = result.new_messages()
+        logger.debug("Agent stream completed", extra={"preview": output[:100]})
+
+        if session_id:
+            await append_conversation_messages(session_id, new_messages)
+        turn.store(output, new_messages)
+
+        yield format_sse(
+            "done",
+            {"transcription": transcription, "response": output, "cached": False, "filename": filename},
+        )
+    except Exception as e:
+        logger.exception("Voice chat stream failed")
+        yield format_sse_error(e)
@@ -0,0 +1,122 @@
+import asyncio
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from app.api.sse import format_sse, sse_response
+from app.api.uploads import read_upload
+from app.core.config import PDF_JOB_EVENTS_KEEPALIVE_SECONDS, UPLOAD_MAX_PDF_BYTES
+from app.services.pdf_jobs import JobCapacityError, PdfJob, pdf_jobs
+
+router = APIRouter()
+
+
+def _get_job(job_id: str) -> PdfJob:
+    job = pdf_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"PDF job not found: {job_id}")
+    return job
+
+
+@router.post("/pdf-jobs", status_code=202)
+async def submit_pdf_job(file: UploadFile = File(...)):
+    """
+    Start converting a PDF manual in the background and return immediately.
+
+    The session is created right away; its manual fills in as page ranges are
+    converted, so chat requests can use the session before the whole manual
+    is done. Follow the job by polling its status URL or subscribing to its
+    events URL (Server-Sent Events).
+
+    Args:
+        file: PDF manual file to convert
+
+    Returns:
+        JSON with job_id, session_id, status and the status/events URLs
+    """
+    # Validate file type
+    if not file.content_type == "application/pdf":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type: {file.content_type}. Only PDF files are supported.",
+        )
+
+    pdf_bytes = await read_upload(file, UPLOAD_MAX_PDF_BYTES, "PDF")
+    try:
+        job = await pdf_jobs.submit(pdf_bytes, file.filename or "manual.pdf")
+    except JobCapacityError as e:
+        # Jobs take tens of seconds, so ask the client to come back later rather than queue without bound
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+    return {
+        "job_id": job.job_id,
+        "session_id": job.session_id,
+        "filename": job.filename,
+        "status": job.status,
+        "status_url": f"/api/pdf-jobs/{job.job_id}",
+        "events_url": f"/api/pdf-jobs/{job.job_id}/events",
+    }
+
+
+@router.get("/pdf-jobs/{job_id}")
+async def get_pdf_job(job_id: str, offset: int = Query(0, ge=0)):
+    """
+    Poll a PDF job's status and the text extracted so far.
+
+    Args:
+        job_id: The job identifier
+        offset: Return the text from this character on (pass the text_length
+            already received to fetch only what's new)
+
+    Returns:
+        JSON with status, page range progress, text_length and text
+    """
+    return _get_job(job_id).snapshot(offset)
+
+
+@router.get("/pdf-jobs/{job_id}/events")
+async def pdf_job_events(job_id: str):
+    """
+    Stream a PDF job's progress as Server-Sent Events.
+
+    Events:
+        status: Job state (as returned by polling, without the text) on every change
+        text: {"delta": ...} new text appended to the manual
+        done: Final job state, after which the stream ends
+
+    Idle streams get a keepalive comment every PDF_JOB_EVENTS_KEEPALIVE_SECONDS.
+    """
+    job = _get_job(job_id)
+
+    async def events():
+        sent_chars = 0
+        while True:
+            version = job.version
+            if len(job.text) > sent_chars:
+                yield format_sse("text", {"delta": job.text[sent_chars:]})
+                sent_chars = len(job.text)
+            if job.finished:
+                yield format_sse("done", job.snapshot(None))
+                return
+            yield format_sse("status", job.snapshot(None))
+            while job.version == version:
+                try:
+                    await asyncio.wait_for(job.wait_for_change(version), PDF_JOB_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+
+    return sse_response(events())
+
+
+@router.delete("/pdf-jobs/{job_id}")
+async def cancel_pdf_job(job_id: str):
+    """
+    Cancel a queued or running PDF job.
+
+    The session keeps whatever text was extracted before the cancellation.
+    Cancelling a finished job has no effect.
+
+    Returns:
+        JSON with the job state
+    """
+    job = await pdf_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"PDF job not found: {job_id}")
+    return job.snapshot(None)
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.services.gemini_pdf_agent import extract_text_from_pdf
 from app.services.session_manager import create_session
+from app.api.uploads import read_upload
+from app.core.config import UPLOAD_MAX_PDF_BYTES
 
 router = APIRouter()
 
@@ -26,13 +28,13 @@ async def pdf_to_text(file: UploadFile = File(...)):
 
     try:
         # Read PDF file bytes
-        pdf_bytes = await file.read()
+        pdf_bytes = await read_upload(file, UPLOAD_MAX_PDF_BYTES, "PDF")
 
         # Extract text using service layer
         text = await extract_text_from_pdf(pdf_bytes)
 
         # Create session to store manual text
-        session_id = create_session(text, file.filename or "manual.pdf")
+        session_id = await create_session(text, file.filename or "manual.pdf")
 
         return {
             "text": text,
@@ -41,5 +43,7 @@ async def pdf_to_text(file: UploadFile = File(...)):
             "status": "success",
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
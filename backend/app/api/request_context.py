@@ -0,0 +1,76 @@
+import logging
+import re
+import time
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.logging import request_id_var
+from app.services.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION, HTTP_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Client-supplied request IDs are accepted if they look like an ID, not arbitrary text
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving every HTTP request an ID, metrics and an access log line.
+
+    The ID comes from an incoming X-Request-ID header (e.g. set by a proxy or
+    the frontend) or is generated, is stored in request_id_var for the log
+    lines emitted while serving the request, and is echoed back in the
+    X-Request-ID response header. Request counts, latency and in-flight
+    requests are recorded per route template. WebSocket connections get an
+    ID for their log lines too, but no HTTP metrics.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        if scope["type"] == "websocket":
+            # One ID for the whole connection (voice and video streams)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                request_id_var.reset(token)
+            return
+
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(route=route_path, method=scope["method"], status=str(status))
+            HTTP_REQUEST_DURATION.observe(duration, route=route_path)
+            logger.info(
+                "request completed",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                },
+            )
+            request_id_var.reset(token)
@@ -0,0 +1,57 @@
+import json
+from collections.abc import AsyncIterator
+from fastapi.responses import StreamingResponse
+from pydantic_ai.exceptions import ModelHTTPError
+
+
+def format_sse(event: str, data: dict) -> str:
+    """
+    Format a single Server-Sent Event.
+
+    Args:
+        event: Event name (e.g. "transcription", "delta", "done", "error")
+        data: JSON-serializable payload
+
+    Returns:
+        SSE-formatted string terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str], headers: dict[str, str] | None = None) -> StreamingResponse:
+    """Wrap an async iterator of formatted events in a text/event-stream response."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering (nginx / Cloud Run front ends) so deltas flush immediately
+            "X-Accel-Buffering": "no",
+            **(headers or {}),
+        },
+    )
+
+
+def describe_model_error(e: Exception) -> tuple[int, str]:
+    """
+    Map an exception to the (status_code, detail) the HTTP handlers would return.
+
+    Used where errors have to be reported in-band (SSE streams, WebSockets).
+    """
+    if isinstance(e, ModelHTTPError):
+        if e.status_code == 429:
+            return 429, "SambaNova API rate limit exceeded. Please wait a moment and try again."
+        detail = e.body.get("message", str(e)) if isinstance(e.body, dict) else str(e)
+        return e.status_code or 500, f"AI model error: {detail}"
+    return 500, f"Streaming failed: {str(e)}"
+
+
+def format_sse_error(e: Exception) -> str:
+    """
+    Convert an exception raised mid-stream into an "error" event.
+
+    Once the stream has started the HTTP status is already sent, so errors are
+    reported in-band using the same messages as the non-streaming handlers.
+    """
+    status_code, detail = describe_model_error(e)
+    return format_sse("error", {"status_code": status_code, "detail": detail})
@@ -0,0 +1,48 @@
+from fastapi import APIRouter
+from app.api.uploads import get_upload_limit_stats
+from app.services.agent_cache import agent_cache
+from app.services.answer_cache import answer_cache
+from app.services.frame_pipeline import get_frame_pipeline_stats
+from app.services.gemini_pdf_agent import pdf_extractions
+from app.services.http_pools import http_pools
+from app.services.image_cache import image_cache
+from app.services.loop_monitor import loop_monitor
+from app.services.pdf_cache import pdf_text_cache
+from app.services.pdf_jobs import pdf_jobs
+from app.services.prewarm import prewarm_state
+from app.services.recording_archiver import recording_archiver
+from app.services.session_manager import get_session_stats
+from app.services.transcription import transcription_service, transcriptions
+from app.services.upstream_governor import get_upstream_stats
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def stats():
+    """
+    Runtime counters for sessions and caches.
+
+    Returns:
+        JSON with session store, cache, transcription and video pipeline statistics
+    """
+    return {
+        "sessions": await get_session_stats(),
+        "agent_cache": agent_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "pdf_cache": pdf_text_cache.stats(),
+        "pdf_jobs": pdf_jobs.stats(),
+        "image_cache": image_cache.stats(),
+        "transcription": transcription_service.stats(),
+        "coalescing": {
+            "pdf_extraction": pdf_extractions.stats(),
+            "transcription": transcriptions.stats(),
+        },
+        "recordings": recording_archiver.stats(),
+        "uploads": get_upload_limit_stats(),
+        "http_pools": http_pools.stats(),
+        "upstreams": get_upstream_stats(),
+        "video": get_frame_pipeline_stats(),
+        "prewarm": prewarm_state,
+        "event_loop": loop_monitor.stats(),
+    }
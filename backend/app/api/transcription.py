@@ -1,5 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.transcription import transcription_service
+from app.services.transcription import TranscriptionTimeoutError, transcribe_upload
+from app.api.uploads import read_upload
+from app.core.config import UPLOAD_MAX_AUDIO_BYTES
 
 router = APIRouter()
 
@@ -19,13 +21,15 @@ async def transcribe_audio(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="No file provided")
 
     try:
-        contents = await file.read()
+        contents = await read_upload(file, UPLOAD_MAX_AUDIO_BYTES, "Audio file")
 
-        transcription = transcription_service.transcribe_from_bytes(
-            contents, file.filename or "audio.mp3"
-        )
+        transcription = await transcribe_upload(contents, file.filename or "audio.mp3")
 
         return {"transcription": transcription, "filename": file.filename}
 
+    except HTTPException:
+        raise
+    except TranscriptionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
@@ -0,0 +1,158 @@
+import json
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import (
+    UPLOAD_DEFAULT_MAX_BODY_BYTES,
+    UPLOAD_MAX_AUDIO_BYTES,
+    UPLOAD_MAX_IMAGE_BYTES,
+    UPLOAD_MAX_IMAGES,
+    UPLOAD_MAX_PDF_BYTES,
+    UPLOAD_MULTIPART_OVERHEAD_BYTES,
+)
+from app.services.metrics import span
+
+# Whole-request body limits per route: the files a route accepts plus multipart framing
+ROUTE_BODY_LIMITS = {
+    "/api/chat": UPLOAD_MAX_IMAGES * UPLOAD_MAX_IMAGE_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+    "/api/transcribe": UPLOAD_MAX_AUDIO_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+    "/api/voice-chat": UPLOAD_MAX_AUDIO_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+    "/api/voice-chat-multimodal": (
+        UPLOAD_MAX_AUDIO_BYTES + UPLOAD_MAX_IMAGES * UPLOAD_MAX_IMAGE_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES
+    ),
+    "/api/pdf-to-text": UPLOAD_MAX_PDF_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+    "/api/pdf-jobs": UPLOAD_MAX_PDF_BYTES + UPLOAD_MULTIPART_OVERHEAD_BYTES,
+}
+
+
+# Requests rejected by UploadLimitMiddleware, for stats reporting
+_rejections = {"early": 0, "streaming": 0}
+
+
+def _format_limit(max_bytes: int) -> str:
+    return f"{max_bytes / (1024 * 1024):.0f} MB"
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized request bodies with 413.
+
+    A Content-Length above the route's limit is rejected before any body is
+    read. Otherwise the body is counted as it streams in, and the request is
+    cut off with 413 as soon as it crosses the limit. Either way the multipart
+    parser never spools more than the limit to memory or disk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: dict[str, int] | None = None,
+        default_limit: int = UPLOAD_DEFAULT_MAX_BODY_BYTES,
+    ):
+        self.app = app
+        self.limits = ROUTE_BODY_LIMITS if limits is None else limits
+        self.default_limit = default_limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"], self.default_limit)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            _rejections["early"] += 1
+            await self._send_too_large(send, limit)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request" and not rejected:
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    _rejections["streaming"] += 1
+                    if not response_started:
+                        await self._send_too_large(send, limit)
+                    # Make the app stop parsing as if the client went away
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _send_too_large(send: Send, limit: int) -> None:
+        body = json.dumps({"detail": f"Request body too large. Maximum is {_format_limit(limit)}."}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def get_upload_limit_stats() -> dict:
+    """Body limits and 413 counters (Content-Length vs cut off while streaming)."""
+    return {
+        "route_limits": ROUTE_BODY_LIMITS,
+        "default_limit": UPLOAD_DEFAULT_MAX_BODY_BYTES,
+        "rejected_early": _rejections["early"],
+        "rejected_streaming": _rejections["streaming"],
+    }
+
+
+async def read_upload(file: UploadFile, max_bytes: int, label: str = "File") -> bytes:
+    """
+    Read an uploaded file, enforcing a per-file size limit.
+
+    Starlette has already spooled the part to a temporary file (on disk once it
+    is larger than 1 MB) and recorded its size, so oversized files are rejected
+    without being read. The file is read in a single call, so the bytes handed
+    to services are the only in-memory copy.
+
+    Args:
+        file: The uploaded file
+        max_bytes: Maximum accepted size
+        label: Name used in the error message ("Audio file", "PDF", "Image")
+
+    Returns:
+        File contents
+
+    Raises:
+        HTTPException: 413 if the file is larger than max_bytes
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{label} too large ({file.size} bytes). Maximum is {_format_limit(max_bytes)}.",
+        )
+    with span("upload_read", label=label):
+        if file.size is not None:
+            return await file.read()
+
+        # Size unknown: read at most one byte past the limit
+        contents = await file.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{label} too large. Maximum is {_format_limit(max_bytes)}.",
+        )
+    return contents
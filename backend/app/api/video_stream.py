@@ -0,0 +1,68 @@
+import asyncio
+import json
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.services.frame_pipeline import FramePipeline, active_pipelines, register_frame_stage
+from app.services.frame_stages import builtin_frame_stages
+
+router = APIRouter()
+
+# Lightweight analysis stages for the frontend's "sam" and "dinov3" frames
+for stage in builtin_frame_stages():
+    register_frame_stage(stage)
+
+
+@router.websocket("/ws/video")
+async def video_stream(websocket: WebSocket):
+    """
+    Camera frame ingest used by the frontend VideoInput component.
+
+    Client messages:
+    - {"type": "frame", "timestamp": ms, "data": {"type": "sam" | "dinov3", "frame": "<data URL>", ...}}
+    - Binary messages are treated as encoded frames for the "sam" channel
+
+    Server messages:
+    - {"type": "segmentation" | "dinov3", "payload": ...} from the registered analysis stages
+      (see frame_stages for the built-in ones)
+    - {"type": "error", "payload": {"message": ...}}
+
+    Only the newest frame per channel is kept, so slow analysis drops stale
+    frames instead of queueing them.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(payload: dict) -> None:
+        async with send_lock:
+            try:
+                await websocket.send_json(payload)
+            except (RuntimeError, WebSocketDisconnect):
+                pass
+
+    pipeline = FramePipeline(send)
+    pipeline.start()
+    active_pipelines.add(pipeline)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                pipeline.submit("sam", message["bytes"])
+                continue
+            if message.get("text") is None:
+                continue
+            try:
+                data = json.loads(message["text"])
+            except json.JSONDecodeError:
+                await send({"type": "error", "payload": {"message": "Invalid JSON message"}})
+                continue
+            if data.get("type") != "frame":
+                continue
+            frame = data.get("data") or {}
+            if not frame.get("frame"):
+                continue
+            pipeline.submit(frame.get("type", "sam"), frame["frame"], data.get("timestamp"))
+    finally:
+        active_pipelines.discard(pipeline)
+        await pipeline.close()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.api.sse import describe_model_error
+from app.core.config import VAD_TURN_SILENCE_MS, VOICE_STREAM_SAMPLE_RATES
+from app.services.llama_assembly_agent import run_agent_with_files
+from app.services.metrics import span
+from app.services.session_manager import append_conversation_messages, get_session
+from app.services.transcription import TranscriptionTimeoutError, get_transcriber
+from app.services.voice_activity import UtteranceSegmenter, pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class VoiceStreamSession:
+    """
+    State of one streaming voice connection.
+
+    Each VAD segment is transcribed as soon as it is cut, while the user keeps
+    talking. When the turn ends (client "end" message or VAD_TURN_SILENCE_MS of
+    silence) the segment transcripts are joined in order and sent to the agent.
+    Turns are chained so conversation history is always appended in order.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str | None, sample_rate: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.segmenter = UtteranceSegmenter(sample_rate=sample_rate)
+        self.transcriber = get_transcriber()
+        self._send_lock = asyncio.Lock()
+        self._segment_tasks: list[asyncio.Task] = []
+        self._segment_count = 0
+        # Latest turn (the next one waits for it) and every turn still running
+        self._turn_task: asyncio.Task | None = None
+        self._turn_tasks: set[asyncio.Task] = set()
+
+    async def send(self, payload: dict) -> None:
+        async with self._send_lock:
+            # The client may be gone by the time a transcript or answer is ready
+            with suppress(RuntimeError, WebSocketDisconnect):
+                await self.websocket.send_json(payload)
+
+    def feed_audio(self, pcm: bytes) -> None:
+        """Run VAD on incoming audio, transcribing segments and ending turns as they complete."""
+        for segment in self.segmenter.feed(pcm):
+            self._start_segment(segment)
+        if (
+            self._segment_tasks
+            and not self.segmenter.in_speech
+            and self.segmenter.trailing_silence_ms >= VAD_TURN_SILENCE_MS
+        ):
+            self.end_turn()
+
+    def end_turn(self) -> None:
+        """Close the current utterance and hand the turn's transcripts to the agent."""
+        segment = self.segmenter.flush()
+        if segment:
+            self._start_segment(segment)
+        if not self._segment_tasks:
+            return
+        segment_tasks, self._segment_tasks = self._segment_tasks, []
+        self._turn_task = asyncio.create_task(self._run_turn(segment_tasks, self._turn_task))
+        self._turn_tasks.add(self._turn_task)
+        self._turn_task.add_done_callback(self._turn_tasks.discard)
+
+    def _start_segment(self, pcm: bytes) -> None:
+        index = self._segment_count
+        self._segment_count += 1
+        self._segment_tasks.append(asyncio.create_task(self._transcribe_segment(index, pcm)))
+
+    async def _transcribe_segment(self, index: int, pcm: bytes) -> str:
+        with span("transcription", segment=index):
+            text = await self.transcriber.transcribe_async(
+                pcm_to_wav(pcm, self.sample_rate), f"segment_{index}.wav"
+            )
+        text = text.strip()
+        await self.send({"type": "segment", "index": index, "text": text})
+        return text
+
+    async def _run_turn(self, segment_tasks: list[asyncio.Task], previous_turn: asyncio.Task | None):
+        try:
+            texts = await asyncio.gather(*segment_tasks)
+        except TranscriptionTimeoutError as e:
+            await self.send({"type": "error", "status_code": 504, "detail": str(e)})
+            return
+        except Exception as e:
+            await self.send(
+                {"type": "error", "status_code": 500, "detail": f"Transcription failed: {str(e)}"}
+            )
+            return
+
+        # Wait for the previous turn so history is appended in order
+        if previous_turn is not None:
+            with suppress(Exception):
+                await previous_turn
+
+        transcription = " ".join(text for text in texts if text)
+        if not transcription:
+            return
+        await self.send({"type": "transcription", "transcription": transcription})
+
+        manual_text = manual_index = conversation_history = None
+        if self.session_id:
+            session = await get_session(self.session_id)
+            if session is None:
+                await self.send(
+                    {
+                        "type": "error",
+                        "status_code": 404,
+                        "detail": f"Session not found or expired: {self.session_id}",
+                    }
+                )
+                return
+            manual_text = session.manual_text
+            manual_index = session.manual_index
+            conversation_history = session.conversation_history
+
+        try:
+            logger.debug("Sending turn to agent", extra={"preview": transcription[:100]})
+            result = await run_agent_with_files(
+                message=transcription,
+                manual_text=manual_text,
+                message_history=conversation_history,
+                manual_index=manual_index,
+            )
+        except Exception as e:
+            status_code, detail = describe_model_error(e)
+            await self.send({"type": "error", "status_code": status_code, "detail": detail})
+            return
+
+        if self.session_id:
+            await append_conversation_messages(self.session_id, result.new_messages())
+
+        await self.send(
+            {"type": "response", "transcription": transcription, "response": result.output}
+        )
+
+    async def close(self) -> None:
+        """Cancel outstanding work when the client disconnects."""
+        tasks = [*self._segment_tasks, *self._turn_tasks]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(BaseException):
+                await task
+
+
+@router.websocket("/ws/voice-chat")
+async def voice_chat_stream(websocket: WebSocket):
+    """
+    Streaming voice chat over WebSocket.
+
+    Protocol:
+    1. Client sends {"type": "start", "session_id": "...", "sample_rate": 16000}
+       (session_id is optional; sample_rate defaults to 16000 and must be one of
+       VOICE_STREAM_SAMPLE_RATES, otherwise the socket is closed with 1003)
+    2. Client streams binary frames of little-endian 16-bit mono PCM as the user speaks
+    3. Server sends {"type": "segment", "index", "text"} as each utterance segment is transcribed
+    4. On {"type": "end"} from the client, or a long enough pause, the server sends
+       {"type": "transcription"} followed by {"type": "response"} with the agent's answer
+    5. Steps 2-4 repeat for further turns; errors arrive as {"type": "error", "status_code", "detail"}
+    """
+    await websocket.accept()
+
+    try:
+        start = await websocket.receive_json()
+    except Exception:
+        await websocket.close(code=1003, reason="Expected a JSON start message")
+        return
+    if start.get("type") != "start":
+        await websocket.close(code=1003, reason="Expected a start message")
+        return
+
+    sample_rate = start.get("sample_rate", 16000)
+    if not isinstance(sample_rate, int) or sample_rate not in VOICE_STREAM_SAMPLE_RATES:
+        await websocket.close(code=1003, reason=f"Unsupported sample_rate: {sample_rate}")
+        return
+
+    session_id = start.get("session_id")
+    if session_id and await get_session(session_id) is None:
+        await websocket.send_json(
+            {
+                "type": "error",
+                "status_code": 404,
+                "detail": f"Session not found or expired: {session_id}",
+            }
+        )
+        await websocket.close(code=1008)
+        return
+
+    stream = VoiceStreamSession(websocket, session_id, sample_rate)
+    await stream.send({"type": "ready"})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                stream.feed_audio(message["bytes"])
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    await stream.send(
+                        {"type": "error", "status_code": 400, "detail": "Invalid JSON message"}
+                    )
+                    continue
+                if control.get("type") == "end":
+                    stream.end_turn()
+    finally:
+        await stream.close()
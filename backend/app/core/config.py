@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 from pathlib import Path
 
@@ -6,6 +7,43 @@ class Settings(BaseSettings):
     sambanova_api_key: str
     sambanova_base_url: str
     google_api_key: str
+    # Structured logs with request IDs: "text" (key=value) or "json" (one object per line)
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+    # Point at a local stub (see benchmarks/stub_upstreams.py) to run without Gemini quota
+    gemini_base_url: str = "https://generativelanguage.googleapis.com"
+    # "full" pastes the entire manual into the system prompt; "retrieval" (opt-in)
+    # sends only the manual sections matching each question's keywords, so
+    # follow-ups without keyword overlap ("what next?") get no manual sections
+    manual_context_mode: Literal["retrieval", "full"] = "full"
+    # "memory" keeps sessions in one process; "sqlite" shares them between
+    # uvicorn workers (e.g. WEB_CONCURRENCY=4) through a WAL-mode database file
+    session_backend: Literal["memory", "sqlite"] = "memory"
+    session_db_path: Path = Path("cache/sessions.db")
+    # "stub" swaps Whisper for a local deterministic transcriber (tests, load tests)
+    transcription_backend: Literal["sambanova", "stub"] = "sambanova"
+    # Uploaded voice recordings are archived to RECORDINGS_DIR in the background;
+    # set to false to keep no audio at all, or sample a fraction of requests
+    recording_archive_enabled: bool = True
+    recording_sample_rate: float = 1.0
+    # Upstream HTTP pools negotiate HTTP/2 so concurrent calls share one TLS connection
+    http2_enabled: bool = True
+    # Serve repeated first-turn questions about the same manual from a local cache
+    answer_cache_enabled: bool = False
+    # Build the model clients and open upstream connections in the background
+    # right after startup (/health answers immediately either way)
+    prewarm_services: bool = True
+    # Client-side pacing to stay under the upstream quotas (0 = unlimited).
+    # SambaNova limits are per model, so chat (Llama) and Whisper are paced separately
+    sambanova_requests_per_minute: int = 0
+    sambanova_tokens_per_minute: int = 0
+    whisper_requests_per_minute: int = 0
+    gemini_requests_per_minute: int = 0
+    gemini_tokens_per_minute: int = 0
+    # Estimated prompt tokens per agent run (system prompt + history + message);
+    # older turns are dropped to fit. Bounds per-turn cost and latency in long
+    # sessions well below the model's context window. 0 = no limit
+    prompt_token_budget: int = 64000
 
     class Config:
         env_file = Path(__file__).parent.parent.parent.parent / ".env"
@@ -16,4 +54,143 @@ settings = Settings()
 
 # Session Configuration
 MAX_SESSION_AGE_HOURS = 1
-MAX_SESSIONS = 100
+# Least recently used sessions are evicted once either limit is reached
+SESSION_MAX_COUNT = 20000
+SESSION_MAX_BYTES = 512 * 1024 * 1024
+# How often the background sweeper drops expired sessions
+SESSION_SWEEP_INTERVAL_SECONDS = 60
+
+# Agent Cache Configuration
+# Maximum number of per-manual agents (with formatted system prompts) kept in memory
+AGENT_CACHE_MAX_ENTRIES = 32
+
+# PDF Text Cache Configuration
+# Extracted manual text is cached on disk keyed by PDF content hash + prompt/model version
+PDF_CACHE_DIR = Path("cache/pdf_text")
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# PDF Extraction Configuration
+# Manuals with at least this many pages are split locally and converted in parallel ranges
+PDF_PARALLEL_MIN_PAGES = 12
+PDF_PAGES_PER_RANGE = 6
+# Concurrent Gemini calls per manual (all uploads share the Gemini upstream governor)
+PDF_RANGE_CONCURRENCY = 6
+# Attempts per range before the whole extraction fails
+PDF_RANGE_MAX_ATTEMPTS = 3
+PDF_RANGE_RETRY_BASE_SECONDS = 1
+
+# PDF Job Configuration
+# Background extractions for /api/pdf-jobs: at most PDF_JOB_WORKERS run at once,
+# submissions are refused (429) once PDF_JOB_MAX_ACTIVE are queued or running
+PDF_JOB_WORKERS = 2
+PDF_JOB_MAX_ACTIVE = 16
+# Finished jobs (and their text) stay available for polling this long
+PDF_JOB_RETENTION_SECONDS = 3600
+# Seconds between keepalive comments on an idle job event stream
+PDF_JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+# HTTP Connection Pool Configuration
+# Shared by the SambaNova (agent + Whisper) and Gemini clients
+HTTP_POOL_MAX_CONNECTIONS = 100
+HTTP_POOL_MAX_KEEPALIVE = 20
+HTTP_POOL_KEEPALIVE_EXPIRY_SECONDS = 120
+HTTP_POOL_CONNECT_TIMEOUT_SECONDS = 10
+HTTP_POOL_READ_TIMEOUT_SECONDS = 300
+# Connections opened per pool at startup (one is enough with HTTP/2)
+HTTP_POOL_WARMUP_CONNECTIONS = 2
+HTTP_POOL_WARMUP_TIMEOUT_SECONDS = 5
+
+# Upstream Admission Configuration
+# Token buckets refill continuously and hold at most this many seconds of quota as burst
+UPSTREAM_BURST_SECONDS = 10
+# Requests waiting for admission per upstream; further requests are rejected with 429 immediately
+UPSTREAM_MAX_QUEUED = 256
+# Total time a request may spend waiting for admission and between retries before giving up with 429
+UPSTREAM_ADMISSION_TIMEOUT_SECONDS = 30
+# Retries of upstream 429/503 responses (Retry-After is honored, otherwise jittered exponential backoff)
+UPSTREAM_MAX_RETRIES = 3
+UPSTREAM_RETRY_BASE_SECONDS = 0.5
+UPSTREAM_RETRY_MAX_SECONDS = 10
+
+# Event Loop Monitor Configuration
+# How often the loop's wake-up delay is sampled, and the lag histogram bucket bounds
+LOOP_MONITOR_INTERVAL_SECONDS = 0.05
+LOOP_LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Answer Cache Configuration
+# First-turn answers per (manual, question); only used when ANSWER_CACHE_ENABLED=true
+ANSWER_CACHE_TTL_SECONDS = 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 5000
+ANSWER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Minimum Jaccard similarity of question content words for a near-duplicate hit
+ANSWER_CACHE_MIN_SIMILARITY = 0.8
+
+# Manual Retrieval Configuration
+# Target maximum size of one indexed manual section
+MANUAL_CHUNK_MAX_CHARS = 1500
+# Number of sections attached to each question in retrieval mode
+MANUAL_RETRIEVAL_TOP_K = 4
+
+# Prompt Budget Configuration
+# Flat estimate per attached image (Llama 4 vision tiles of a <= IMAGE_MAX_SIZE picture)
+PROMPT_IMAGE_TOKENS = 1500
+# Chat template tokens around each message (role header, end-of-turn)
+PROMPT_MESSAGE_OVERHEAD_TOKENS = 4
+
+# Transcription Configuration
+# Whisper calls run in a dedicated thread pool so they never block the event loop
+TRANSCRIPTION_MAX_CONCURRENCY = 8
+TRANSCRIPTION_TIMEOUT_SECONDS = 60
+
+# Upload Limits Configuration
+# Per-file limits; oversized uploads get 413 (Whisper accepts up to 25 MB, Gemini inline PDFs ~20 MB)
+UPLOAD_MAX_AUDIO_BYTES = 25 * 1024 * 1024
+UPLOAD_MAX_PDF_BYTES = 20 * 1024 * 1024
+UPLOAD_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+UPLOAD_MAX_IMAGES = 5
+# Request bodies are cut off with 413 while streaming once past the route's files + this margin
+UPLOAD_MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+# Body limit for routes without file uploads
+UPLOAD_DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+
+# Recording Archive Configuration
+RECORDINGS_DIR = Path("recordings")
+# Audio bytes waiting to be written (held in memory); new recordings are dropped
+# when they don't fit instead of delaying requests
+RECORDINGS_QUEUE_MAX_BYTES = 64 * 1024 * 1024
+# Older recordings are deleted past either limit
+RECORDINGS_MAX_BYTES = 1024 * 1024 * 1024
+RECORDINGS_MAX_AGE_HOURS = 24 * 7
+RECORDINGS_RETENTION_INTERVAL_SECONDS = 300
+
+# Streaming Voice Configuration
+# PCM16 RMS energy above which a frame counts as speech
+VAD_ENERGY_THRESHOLD = 500
+# Silence that closes a segment (which is then transcribed immediately)
+VAD_SEGMENT_SILENCE_MS = 400
+# Silence after the last segment that ends the user's turn and triggers the agent
+VAD_TURN_SILENCE_MS = 1200
+VAD_MIN_SPEECH_MS = 200
+VAD_MAX_SEGMENT_MS = 15000
+# PCM sample rates accepted in the start message (common microphone/AudioContext rates)
+VOICE_STREAM_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+
+# Video Frame Pipeline Configuration
+# Frames are downscaled so their longest side is at most this many pixels before analysis
+FRAME_MAX_SIZE = 640
+FRAME_DECODE_WORKERS = 2
+# Decoded frames waiting per analysis stage; the oldest is dropped when full
+FRAME_STAGE_QUEUE_SIZE = 1
+# Stages with skip_unchanged ignore frames whose 64-bit perceptual hash differs from the last analyzed one by at most this many bits
+FRAME_UNCHANGED_MAX_DISTANCE = 2
+
+# Image Preprocessing Configuration
+# Uploaded images are downscaled to fit IMAGE_MAX_SIZE and re-encoded as JPEG before reaching the model
+IMAGE_MAX_SIZE = 1024
+IMAGE_JPEG_QUALITY = 85
+IMAGE_JPEG_OPTIMIZE = True
+IMAGE_PROCESSING_WORKERS = 4
+# Repeated photos of the same step reuse the cached data URL (exact content hash, or near-duplicate dHash within the same session)
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Max differing bits of the 64-bit perceptual hash for a near-duplicate match; -1 disables near matching
+IMAGE_CACHE_MAX_DISTANCE = 3
@@ -1,21 +1,100 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.api.llama_assembly_chat import router as chat_router
-from app.api.transcription import router as transcription_router
-from app.api.pdf_to_text import router as pdf_router
-from app.api.llama_assembly_voice_chat import router as voice_chat_router
-from app.api.llama_assembly_voice_chat_multimodal import router as voice_chat_multimodal_router
+from app.api.lazy_routes import LazyRouters, WaitForRoutesMiddleware
+from app.api.request_context import RequestContextMiddleware
+from app.api.uploads import UploadLimitMiddleware
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.services.loop_monitor import loop_monitor
+from app.services.metrics import registry
 from pathlib import Path
 
-app = FastAPI()
+configure_logging(settings.log_level, settings.log_format)
 
-# Create uploads directory if it doesn't exist
 UPLOADS_DIR = Path("uploads")
-UPLOADS_DIR.mkdir(exist_ok=True)
 
-# Mount static files for serving uploaded images
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# API routers as (module, prefix, tag). Their modules (and the pydantic_ai, httpx and
+# PIL imports behind them) load in the background after startup, so /health answers first.
+routers = LazyRouters(
+    [
+        ("app.api.llama_assembly_chat", "/api", "Chat"),
+        ("app.api.transcription", "/api", "Transcription"),
+        ("app.api.pdf_to_text", "/api", "PDF"),
+        ("app.api.pdf_jobs", "/api", "PDF Jobs"),
+        ("app.api.llama_assembly_voice_chat", "/api", "Voice Chat"),
+        ("app.api.llama_assembly_voice_chat_multimodal", "/api", "Voice Chat Multimodal"),
+        ("app.api.voice_stream", "/api", "Voice Stream"),
+        ("app.api.stats", "/api", "Stats"),
+        # The frontend connects to ws://<host>/ws/video without the /api prefix
+        ("app.api.video_stream", "", "Video Stream"),
+    ]
+)
+
+
+async def start_services(tasks: list[asyncio.Task]) -> None:
+    """Load the API routes, then start the background tasks of the services behind them."""
+    await routers.load(app)
+    # Already imported by the route modules
+    from app.services.prewarm import prewarm_services
+    from app.services.recording_archiver import recording_archiver
+    from app.services.session_manager import run_session_sweeper
+
+    tasks.append(asyncio.create_task(run_session_sweeper()))
+    tasks.append(asyncio.create_task(recording_archiver.run()))
+    if settings.prewarm_services:
+        # Build the model clients and open upstream connections without blocking requests
+        tasks.append(asyncio.create_task(prewarm_services()))
+
+
+async def stop_services() -> None:
+    """Flush and close what the loaded services hold open."""
+    from app.services.http_pools import http_pools
+    from app.services.pdf_jobs import pdf_jobs
+    from app.services.recording_archiver import recording_archiver
+
+    # Give queued recordings a moment to reach disk before stopping the writer
+    await recording_archiver.flush(timeout=5)
+    # Background PDF jobs are per process; stop them before the pools they use close
+    await pdf_jobs.close()
+    await http_pools.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create uploads directory if it doesn't exist
+    UPLOADS_DIR.mkdir(exist_ok=True)
+    # Start background tasks
+    tasks = [asyncio.create_task(loop_monitor.run())]
+    startup = asyncio.create_task(start_services(tasks))
+    try:
+        yield
+    finally:
+        startup.cancel()
+        with suppress(Exception, asyncio.CancelledError):
+            await startup
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        if routers.loaded:
+            await stop_services()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Mount static files for serving uploaded images (the directory is created at startup)
+app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR, check_dir=False), name="uploads")
+
+# Requests wait for the API routes while they load; /health and /metrics answer right away
+app.add_middleware(WaitForRoutesMiddleware, routers=routers, exempt_paths=("/health", "/metrics"))
+
+# Reject oversized uploads with 413 while they stream in, before the handlers read them
+# (added before CORS so 413 responses still carry CORS headers)
+app.add_middleware(UploadLimitMiddleware)
 
 # Configure CORS for local development
 app.add_middleware(
@@ -29,8 +108,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Request IDs, HTTP metrics and access logs (outermost, so 413s and CORS preflights are counted too)
+app.add_middleware(RequestContextMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -42,6 +125,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request/stage latency histograms, in-flight gauges, upstream errors, LLM tokens."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/test")
 async def test_endpoint():
     return {
@@ -50,10 +139,3 @@ async def test_endpoint():
         "data": {"timestamp": "2025-11-20"},
     }
 
-
-# Include routers
-app.include_router(chat_router, prefix="/api", tags=["Chat"])
-app.include_router(transcription_router, prefix="/api", tags=["Transcription"])
-app.include_router(pdf_router, prefix="/api", tags=["PDF"])
-app.include_router(voice_chat_router, prefix="/api", tags=["Voice Chat"])
-app.include_router(voice_chat_multimodal_router, prefix="/api", tags=["Voice Chat Multimodal"])
@@ -0,0 +1,64 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any
+from app.core.config import AGENT_CACHE_MAX_ENTRIES
+
+
+def manual_content_hash(manual_text: str) -> str:
+    """Return the SHA-256 hex digest used to key per-manual caches."""
+    return hashlib.sha256(manual_text.encode("utf-8")).hexdigest()
+
+
+class AgentCache:
+    """
+    Bounded LRU cache of prepared agents, keyed by manual content hash.
+
+    Building an agent for a manual means formatting a system prompt that can be
+    hundreds of KB long, so agents are prepared once per manual and reused on
+    every turn. Entries are discarded by session_manager when the last session
+    using that manual goes away.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached agent for key (marking it most recently used), or None."""
+        agent = self._entries.get(key)
+        if agent is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return agent
+
+    def put(self, key: str, agent: Any) -> None:
+        """Store an agent, evicting the least recently used entry when full."""
+        self._entries[key] = agent
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        """Drop an entry if present."""
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+agent_cache = AgentCache(AGENT_CACHE_MAX_ENTRIES)
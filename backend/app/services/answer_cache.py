@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+from app.core.config import (
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MIN_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+    settings,
+)
+from app.services.expiring_lru import ExpiringLRU
+from app.services.manual_index import tokenize
+from app.services.session_manager import append_conversation_messages
+from app.services.session_store import ManualSession
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variations share a key."""
+    return _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", question.lower())).strip()
+
+
+@dataclass
+class CachedAnswer:
+    """A model answer to a first-turn question, with the messages to replay into history."""
+
+    manual_hash: str
+    question: str
+    answer: str
+    # result.new_messages() of the original run (includes the system prompt, which
+    # later turns rely on being present in the history)
+    messages: list[ModelMessage]
+    size: int
+
+
+class AnswerCache:
+    """
+    TTL + LRU cache of answers to first-turn questions about a manual.
+
+    Keyed by (manual content hash, context mode, normalized question). Questions
+    that are worded differently but share the same content words (stopwords
+    removed, light stemming, identical numbers) are matched by Jaccard
+    similarity against the other cached questions of the same manual, so
+    "Which screw is part 104?" and "what screw is part 104" share an answer
+    but "step 3" and "step 4" never do.
+
+    Only used for turns without history or images, where the answer depends on
+    nothing but the manual and the question.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int, min_similarity: float):
+        self.min_similarity = min_similarity
+        self._entries: ExpiringLRU[CachedAnswer] = ExpiringLRU(
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda entry: entry.size,
+            on_evict=self._forget,
+        )
+        # manual hash -> {cache key: content tokens} for the similarity tier
+        self._questions: dict[str, dict[str, frozenset[str]]] = {}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(manual_hash: str, normalized: str) -> str:
+        raw = f"{manual_hash}:{settings.manual_context_mode}:{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _forget(self, key: str, entry: CachedAnswer) -> None:
+        """Drop an evicted or expired entry from the similarity tier."""
+        questions = self._questions.get(entry.manual_hash)
+        if questions is None:
+            return
+        questions.pop(key, None)
+        if not questions:
+            del self._questions[entry.manual_hash]
+
+    def get(self, manual_hash: str, question: str) -> CachedAnswer | None:
+        """Return the cached answer for an identical or near-identical question, or None."""
+        normalized = normalize_question(question)
+        entry = self._entries.get(self._key(manual_hash, normalized))
+        if entry is not None:
+            self.exact_hits += 1
+            return entry
+
+        tokens = frozenset(tokenize(normalized))
+        numbers = {token for token in tokens if token.isdigit()}
+        best_key, best_score = None, self.min_similarity
+        for key, cached_tokens in self._questions.get(manual_hash, {}).items():
+            if not tokens or not cached_tokens:
+                continue
+            # Numbers (step, part, screw ids) must match exactly
+            if numbers != {token for token in cached_tokens if token.isdigit()}:
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None:
+            # Expired entries are removed from the similarity tier by get() via on_evict
+            entry = self._entries.get(best_key)
+            if entry is not None:
+                self.similar_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, manual_hash: str, question: str, answer: str, messages: list[ModelMessage]) -> None:
+        """Cache the answer and messages of a first-turn run."""
+        normalized = normalize_question(question)
+        key = self._key(manual_hash, normalized)
+        size = len(answer) + len(ModelMessagesTypeAdapter.dump_json(messages))
+        self._entries.set(key, CachedAnswer(manual_hash, question, answer, list(messages), size))
+        if key in self._entries:
+            self._questions.setdefault(manual_hash, {})[key] = frozenset(tokenize(normalized))
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size for monitoring."""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "enabled": settings.answer_cache_enabled,
+            **self._entries.stats(),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+        }
+
+
+def is_answer_cacheable(session: ManualSession | None, has_images: bool = False) -> bool:
+    """Whether a turn's answer depends only on the manual and the question."""
+    return (
+        settings.answer_cache_enabled
+        and session is not None
+        and not has_images
+        and not session.conversation_history
+    )
+
+
+@dataclass
+class CachedTurn:
+    """Answer cache state of one chat turn: the cached answer, or where to store the new one."""
+
+    question: str
+    # Manual the answer is cached under; None when the turn isn't cacheable
+    manual_hash: str | None = None
+    hit: CachedAnswer | None = None
+
+    def store(self, answer: str, messages: list[ModelMessage]) -> None:
+        """Cache a freshly generated answer, if the turn is cacheable."""
+        if self.manual_hash is not None and self.hit is None:
+            answer_cache.put(self.manual_hash, self.question, answer, messages)
+
+
+async def check_answer_cache(
+    session: ManualSession | None, session_id: str | None, question: str, has_images: bool = False
+) -> CachedTurn:
+    """
+    Look up a turn's answer in the cache, before running the agent.
+
+    On a hit the cached messages are appended to the session history, as the
+    agent run's would be, so callers only send back turn.hit.answer. Otherwise
+    they run the agent and pass its output to turn.store().
+    """
+    if not is_answer_cacheable(session, has_images):
+        return CachedTurn(question)
+    turn = CachedTurn(question, session.manual_hash, answer_cache.get(session.manual_hash, question))
+    if turn.hit is not None:
+        logger.info("Answer cache hit", extra={"session_id": session_id})
+        await append_conversation_messages(session_id, turn.hit.messages)
+    return turn
+
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    max_bytes=ANSWER_CACHE_MAX_BYTES,
+    min_similarity=ANSWER_CACHE_MIN_SIMILARITY,
+)
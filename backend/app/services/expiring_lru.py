@@ -0,0 +1,141 @@
+import heapq
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+
+class ExpiringLRU(Generic[V]):
+    """
+    Dictionary with a fixed time-to-live per entry plus LRU eviction by count and bytes.
+
+    - get/set/pop are amortized O(1): recency is tracked with an OrderedDict and
+      expiry with a min-heap of (expires_at, key) whose stale entries are skipped lazily.
+    - Entries expire ttl_seconds after insertion (reads do not extend the lifetime).
+    - When max_entries or max_bytes is exceeded the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        sizeof: Callable[[V], int],
+        on_evict: Callable[[str, V], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._clock = clock
+        # key -> (value, expires_at, size)
+        self._entries: OrderedDict[str, tuple[V, float, int]] = OrderedDict()
+        self._expiry_heap: list[tuple[float, str]] = []
+        self.total_bytes = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, touch=False) is not None
+
+    def get(self, key: str, touch: bool = True) -> V | None:
+        """Return the live value for key (marking it most recently used), or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        if touch:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        """Insert or replace key with a fresh TTL, then evict LRU entries over capacity."""
+        if key in self._entries:
+            self._remove(key, notify=False)
+        expires_at = self._clock() + self.ttl_seconds
+        size = self._sizeof(value)
+        self._entries[key] = (value, expires_at, size)
+        self.total_bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._enforce_capacity()
+
+    def resize(self, key: str) -> None:
+        """Recompute the byte size of key after its value was mutated in place."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        value, expires_at, old_size = entry
+        new_size = self._sizeof(value)
+        self._entries[key] = (value, expires_at, new_size)
+        self.total_bytes += new_size - old_size
+        self._enforce_capacity()
+
+    def pop(self, key: str) -> V | None:
+        """Remove key and return its value (None if missing). Does not call on_evict."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._remove(key, notify=False)
+        return entry[0]
+
+    def sweep(self) -> int:
+        """
+        Remove every expired entry.
+
+        Cost is proportional to the number of expired (or stale heap) entries,
+        not to the number of live entries.
+
+        Returns:
+            Number of entries removed
+        """
+        now = self._clock()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            # Skip heap entries left behind by pop/replace
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+                removed += 1
+        return removed
+
+    def _enforce_capacity(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+        # Stale heap entries are normally dropped by sweep(); compact if they pile up
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(entry[1], key) for key, entry in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _remove(self, key: str, notify: bool = True) -> None:
+        value, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+        if notify and self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def stats(self) -> dict:
+        """Size and eviction counters for monitoring."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import io
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from PIL import Image
+from app.core.config import (
+    FRAME_DECODE_WORKERS,
+    FRAME_MAX_SIZE,
+    FRAME_STAGE_QUEUE_SIZE,
+    FRAME_UNCHANGED_MAX_DISTANCE,
+)
+from app.services.image_cache import difference_hash, hamming_distance
+
+
+@dataclass
+class DecodedFrame:
+    """A camera frame decoded and downscaled for analysis."""
+
+    image: Image.Image
+    original_size: tuple[int, int]
+    client_timestamp: float | None
+    received_at: float
+    # Perceptual hash, only computed when a stage on the channel skips unchanged frames
+    perceptual_hash: int | None = None
+
+
+@dataclass
+class FrameStage:
+    """
+    An analysis stage plugged into the video pipeline.
+
+    Attributes:
+        name: Stage name used in stats
+        channel: Frame type sent by the client that this stage consumes ("sam", "dinov3")
+        message_type: Message type of results sent back ("segmentation", "dinov3")
+        analyze: Async function returning a JSON payload for a frame, or None to send nothing
+        skip_unchanged: Don't re-analyze frames that look the same as the last one analyzed
+            (perceptual hash within FRAME_UNCHANGED_MAX_DISTANCE bits)
+    """
+
+    name: str
+    channel: str
+    message_type: str
+    analyze: Callable[[DecodedFrame], Awaitable[dict | None]]
+    skip_unchanged: bool = False
+
+
+# Registered analysis stages; the /ws/video route registers the built-in ones from frame_stages
+_frame_stages: list[FrameStage] = []
+
+
+def register_frame_stage(stage: FrameStage) -> None:
+    """Add an analysis stage to every new video connection."""
+    _frame_stages.append(stage)
+
+
+# Decoding and downscaling are CPU work, so they run in their own small pool
+_decode_executor = ThreadPoolExecutor(max_workers=FRAME_DECODE_WORKERS, thread_name_prefix="frame-decode")
+
+
+def decode_frame(frame_data: bytes | str, max_size: int = FRAME_MAX_SIZE) -> tuple[Image.Image, tuple[int, int]]:
+    """
+    Decode an encoded frame (raw bytes or base64 data URL) and downscale it.
+
+    JPEG frames are decoded at reduced resolution via draft mode, which is much
+    cheaper than a full decode followed by a resize.
+
+    Returns:
+        Tuple of (downscaled RGB image, original (width, height))
+    """
+    if isinstance(frame_data, str):
+        frame_data = base64.b64decode(frame_data.split(",", 1)[-1])
+    image = Image.open(io.BytesIO(frame_data))
+    original_size = image.size
+    image.draft("RGB", (max_size, max_size))
+    image = image.convert("RGB")
+    if image.width > max_size or image.height > max_size:
+        image.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+    return image, original_size
+
+
+def _decode_and_hash(frame_data: bytes | str, with_hash: bool) -> tuple[Image.Image, tuple[int, int], int | None]:
+    image, original_size = decode_frame(frame_data)
+    return image, original_size, difference_hash(image) if with_hash else None
+
+
+class LatestSlot:
+    """Single-item mailbox that only keeps the newest value, counting the ones it replaced."""
+
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, item) -> None:
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self._event.set()
+
+    async def get(self):
+        await self._event.wait()
+        item, self._item = self._item, None
+        self._event.clear()
+        return item
+
+
+class _LatencyTracker:
+    """Rolling throughput and latency for one pipeline component."""
+
+    def __init__(self, window: int = 100, fps_window_seconds: float = 5.0):
+        self.processed = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._completed_at: deque[float] = deque()
+        self._fps_window_seconds = fps_window_seconds
+
+    def record(self, latency_seconds: float) -> None:
+        now = time.monotonic()
+        self.processed += 1
+        self._latencies.append(latency_seconds)
+        self._completed_at.append(now)
+        while self._completed_at and now - self._completed_at[0] > self._fps_window_seconds:
+            self._completed_at.popleft()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        recent = [t for t in self._completed_at if now - t <= self._fps_window_seconds]
+        latencies = sorted(self._latencies)
+        return {
+            "processed": self.processed,
+            "fps": len(recent) / self._fps_window_seconds,
+            "latency_ms_avg": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_ms_p95": 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+        }
+
+
+class FramePipeline:
+    """
+    Per-connection frame pipeline with backpressure.
+
+    receive loop -> latest-frame slot per channel (stale frames dropped)
+                 -> decoder (thread pool) -> bounded queue per stage (oldest dropped)
+                 -> stage worker -> send result
+
+    Analysis slower than the camera never builds up memory or delay: each stage
+    always works on the most recent frame available.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict], Awaitable[None]],
+        stages: list[FrameStage] | None = None,
+        queue_size: int = FRAME_STAGE_QUEUE_SIZE,
+    ):
+        self._send = send
+        self.stages = list(_frame_stages if stages is None else stages)
+        self._slots: dict[str, LatestSlot] = {}
+        self._stage_queues: dict[str, asyncio.Queue] = {}
+        self._stage_dropped: dict[str, int] = {}
+        self._stage_unchanged: dict[str, int] = {}
+        self._last_hashes: dict[str, int] = {}
+        self._decode_stats: dict[str, _LatencyTracker] = {}
+        self._stage_stats: dict[str, _LatencyTracker] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.received = 0
+        self.ignored = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+
+        for stage in self.stages:
+            self._stage_queues[stage.name] = asyncio.Queue(maxsize=queue_size)
+            self._stage_dropped[stage.name] = 0
+            self._stage_unchanged[stage.name] = 0
+            self._stage_stats[stage.name] = _LatencyTracker()
+            if stage.channel not in self._slots:
+                self._slots[stage.channel] = LatestSlot()
+                self._decode_stats[stage.channel] = _LatencyTracker()
+
+    def start(self) -> None:
+        """Start one decoder per channel and one worker per stage."""
+        for channel in self._slots:
+            self._tasks.append(asyncio.create_task(self._decode_loop(channel)))
+        for stage in self.stages:
+            self._tasks.append(asyncio.create_task(self._stage_loop(stage)))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, channel: str, frame_data: bytes | str, client_timestamp: float | None = None) -> None:
+        """Hand a frame to the pipeline, replacing any frame of that channel not yet decoded."""
+        self.received += 1
+        slot = self._slots.get(channel)
+        if slot is None:
+            # No stage consumes this channel; don't spend CPU decoding it
+            self.ignored += 1
+            return
+        slot.put((frame_data, client_timestamp, time.monotonic()))
+
+    async def _decode_loop(self, channel: str) -> None:
+        loop = asyncio.get_running_loop()
+        slot = self._slots[channel]
+        stages = [stage for stage in self.stages if stage.channel == channel]
+        with_hash = any(stage.skip_unchanged for stage in stages)
+        while True:
+            frame_data, client_timestamp, received_at = await slot.get()
+            try:
+                image, original_size, perceptual_hash = await loop.run_in_executor(
+                    _decode_executor, _decode_and_hash, frame_data, with_hash
+                )
+            except Exception as e:
+                self.errors += 1
+                await self._send({"type": "error", "payload": {"message": f"Could not decode frame: {e}"}})
+                continue
+            self._decode_stats[channel].record(time.monotonic() - received_at)
+            frame = DecodedFrame(image, original_size, client_timestamp, received_at, perceptual_hash)
+            for stage in stages:
+                if stage.skip_unchanged:
+                    last_hash = self._last_hashes.get(stage.name)
+                    if (
+                        last_hash is not None
+                        and hamming_distance(last_hash, perceptual_hash) <= FRAME_UNCHANGED_MAX_DISTANCE
+                    ):
+                        self._stage_unchanged[stage.name] += 1
+                        continue
+                    self._last_hashes[stage.name] = perceptual_hash
+                queue = self._stage_queues[stage.name]
+                if queue.full():
+                    queue.get_nowait()
+                    self._stage_dropped[stage.name] += 1
+                queue.put_nowait(frame)
+
+    async def _stage_loop(self, stage: FrameStage) -> None:
+        queue = self._stage_queues[stage.name]
+        while True:
+            frame = await queue.get()
+            try:
+                payload = await stage.analyze(frame)
+            except Exception as e:
+                self.errors += 1
+                await self._send({"type": "error", "payload": {"message": f"{stage.name} failed: {e}"}})
+                continue
+            self._stage_stats[stage.name].record(time.monotonic() - frame.received_at)
+            if payload is not None:
+                await self._send({"type": stage.message_type, "payload": payload})
+
+    def stats(self) -> dict:
+        """Per-connection frame counts, drops, fps and latency (receive -> result)."""
+        return {
+            "uptime_seconds": time.monotonic() - self.started_at,
+            "received": self.received,
+            "ignored": self.ignored,
+            "errors": self.errors,
+            "channels": {
+                channel: {"dropped": slot.dropped, **self._decode_stats[channel].stats()}
+                for channel, slot in self._slots.items()
+            },
+            "stages": {
+                name: {
+                    "dropped": self._stage_dropped[name],
+                    "unchanged": self._stage_unchanged[name],
+                    **tracker.stats(),
+                }
+                for name, tracker in self._stage_stats.items()
+            },
+        }
+
+
+# Pipelines of currently connected clients, for stats reporting
+active_pipelines: set[FramePipeline] = set()
+
+
+def get_frame_pipeline_stats() -> dict:
+    """Stats for every open video connection."""
+    return {
+        "connections": len(active_pipelines),
+        "registered_stages": [stage.name for stage in _frame_stages],
+        "pipelines": [pipeline.stats() for pipeline in active_pipelines],
+    }
@@ -0,0 +1,84 @@
+import asyncio
+from PIL import ImageFilter, ImageStat
+from app.services.frame_pipeline import DecodedFrame, FrameStage
+from app.services.image_cache import difference_hash
+
+# Edge strength (0-255) above which a pixel counts as part of an object outline
+EDGE_THRESHOLD = 48
+
+
+def outline_frame(frame: DecodedFrame) -> dict:
+    """
+    Bounding box of the strong edges in a frame, in the coordinates of the frame as sent.
+
+    A lightweight stand-in for SAM segmentation: it gives the overlay a box
+    around whatever is in view, in the shape the frontend draws.
+    """
+    image = frame.image
+    edges = image.convert("L").filter(ImageFilter.FIND_EDGES)
+    # The edge filter marks the image border itself, so leave a 1px margin out
+    inner = edges.crop((1, 1, image.width - 1, image.height - 1))
+    bbox = inner.point(lambda value: 255 if value >= EDGE_THRESHOLD else 0).getbbox()
+    width, height = frame.original_size
+    boxes = []
+    if bbox is not None:
+        scale_x, scale_y = width / image.width, height / image.height
+        left, top, right, bottom = bbox[0] + 1, bbox[1] + 1, bbox[2] + 1, bbox[3] + 1
+        boxes.append(
+            {
+                "x": round(left * scale_x),
+                "y": round(top * scale_y),
+                "width": round((right - left) * scale_x),
+                "height": round((bottom - top) * scale_y),
+                "label": "object",
+            }
+        )
+    return {"boxes": boxes, "width": width, "height": height, "timestamp": frame.client_timestamp}
+
+
+def describe_frame(frame: DecodedFrame) -> dict:
+    """
+    Global descriptor of a frame: perceptual hash, mean colour and brightness.
+
+    A lightweight stand-in for DINOv3 embeddings; frames of the same scene get
+    hashes a few bits apart.
+    """
+    perceptual_hash = frame.perceptual_hash
+    if perceptual_hash is None:
+        perceptual_hash = difference_hash(frame.image)
+    mean_rgb = [round(value, 1) for value in ImageStat.Stat(frame.image).mean]
+    return {
+        "hash": f"{perceptual_hash:016x}",
+        "mean_rgb": mean_rgb,
+        "brightness": round(sum(mean_rgb) / len(mean_rgb), 1),
+        "width": frame.original_size[0],
+        "height": frame.original_size[1],
+        "timestamp": frame.client_timestamp,
+    }
+
+
+async def _outline(frame: DecodedFrame) -> dict:
+    return await asyncio.to_thread(outline_frame, frame)
+
+
+async def _describe(frame: DecodedFrame) -> dict:
+    return await asyncio.to_thread(describe_frame, frame)
+
+
+def builtin_frame_stages() -> list[FrameStage]:
+    """Stages answering the frontend's "sam" and "dinov3" frames until the real models are served."""
+    return [
+        FrameStage(
+            name="edge_outline",
+            channel="sam",
+            message_type="segmentation",
+            analyze=_outline,
+            skip_unchanged=True,
+        ),
+        FrameStage(
+            name="frame_descriptor",
+            channel="dinov3",
+            message_type="dinov3",
+            analyze=_describe,
+        ),
+    ]
@@ -1,25 +1,254 @@
+import asyncio
+import logging
+import random
+from collections.abc import Callable
+from functools import cache
 from pydantic_ai import Agent, BinaryContent
+from pydantic_ai.exceptions import ModelHTTPError
+from app.core.config import (
+    PDF_PAGES_PER_RANGE,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_RANGE_CONCURRENCY,
+    PDF_RANGE_MAX_ATTEMPTS,
+    PDF_RANGE_RETRY_BASE_SECONDS,
+    settings,
+)
+from app.services.http_pools import http_pools
+from app.services.metrics import record_llm_usage, span
+from app.services.pdf_cache import pdf_text_cache
+from app.services.pdf_pages import PageRange, split_pdf
+from app.services.single_flight import SingleFlight
 
-# Create agent with Google Gemini for PDF processing
+logger = logging.getLogger(__name__)
+
+# Agent with Google Gemini for PDF processing
 # Using gemini-2.5-flash for faster and cost-effective PDF text extraction
 # Requires GOOGLE_API_KEY environment variable to be set
-agent = Agent("google-gla:gemini-2.5-flash")
+PDF_MODEL_NAME = "google-gla:gemini-2.5-flash"
+
 
+@cache
+def get_pdf_agent() -> Agent:
+    """
+    Build the Gemini agent on first use.
 
-async def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+    The google-genai SDK is the single most expensive import of the backend,
+    so it is only loaded when a PDF is processed (or by the startup pre-warm).
+    """
+    from pydantic_ai.models.google import GoogleModel
+    from pydantic_ai.providers.google import GoogleProvider
+
+    return Agent(
+        GoogleModel(
+            "gemini-2.5-flash",
+            provider=GoogleProvider(
+                api_key=settings.google_api_key,
+                http_client=http_pools.gemini,
+                base_url=settings.gemini_base_url,
+            ),
+        )
+    )
+
+
+PDF_EXTRACTION_PROMPT = "Convert this PDF manual into a clear, readable text-based manual in English. Organize the content logically with proper sections, steps, and formatting. Include all important information like titles, instructions, part lists, diagrams descriptions, warnings, and notes. Make it easy to follow and understand. Do not include any meta-commentary about the conversion process. Always respond in English."
+
+# Large manuals are converted a few pages at a time; each range is told where
+# it sits so sections continue across range boundaries without repeated intros
+PDF_RANGE_EXTRACTION_PROMPT = (
+    PDF_EXTRACTION_PROMPT
+    + " These are pages {first_page}-{last_page} of a {total_pages}-page manual; the other pages are"
+    " converted separately and joined in order. Convert only these pages, continue any section that"
+    " started on an earlier page, and do not add an introduction, table of contents or summary."
+)
+
+# Cache entries are keyed by PDF content + this version, so changing the model
+# or prompts automatically invalidates previously extracted text
+PDF_EXTRACTION_VERSION = f"{PDF_MODEL_NAME}:{PDF_EXTRACTION_PROMPT}:{PDF_RANGE_EXTRACTION_PROMPT}"
+
+# Upstream client errors that a retry can fix: timeouts and rate limits
+RETRYABLE_CLIENT_STATUS_CODES = {408, 429}
+
+# Called as page ranges complete with (ranges done, total ranges, text of the
+# leading ranges that are all done, in page order)
+ProgressCallback = Callable[[int, int, str], None]
+
+# Concurrent uploads of the same PDF share one Gemini extraction
+pdf_extractions: SingleFlight[str] = SingleFlight("pdf_extraction")
+
+
+async def _run_extraction(prompt: str, pdf_bytes: bytes) -> tuple[str, bool]:
+    """One Gemini call; returns (text, whether it stopped at the output limit)."""
+    result = await get_pdf_agent().run([prompt, BinaryContent(data=pdf_bytes, media_type="application/pdf")])
+    record_llm_usage(PDF_MODEL_NAME, result.usage())
+    return result.output, result.response.finish_reason == "length"
+
+
+async def extract_single(pdf_bytes: bytes) -> str:
+    """Convert the whole PDF in one Gemini call (small manuals, or PDFs that can't be split)."""
+    with span("pdf_extraction", mode="single", pdf_bytes=len(pdf_bytes)):
+        text, truncated = await _run_extraction(PDF_EXTRACTION_PROMPT, pdf_bytes)
+    if truncated:
+        logger.warning("PDF extraction stopped at the output limit", extra={"pdf_bytes": len(pdf_bytes)})
+    return text
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ModelHTTPError):
+        return error.status_code >= 500 or error.status_code in RETRYABLE_CLIENT_STATUS_CODES
+    return True
+
+
+async def _gather_or_cancel(coroutines) -> list:
+    """
+    Like asyncio.gather, but cancels the other tasks once one fails (nobody would use their text).
+
+    The cancelled tasks are awaited before the error is raised, so none of them
+    is still holding a semaphore slot or retrying in the background.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _extract_range(
+    page_range: PageRange, total_pages: int, semaphore: asyncio.Semaphore
+) -> list[str]:
+    """
+    Convert one page range, retrying it on its own if it fails.
+
+    A range whose output hits the model's output limit is split in half and
+    each half converted separately. The semaphore slot is only held during
+    the Gemini call, so splitting can't starve the other ranges.
+    """
+    prompt = PDF_RANGE_EXTRACTION_PROMPT.format(
+        first_page=page_range.first_page, last_page=page_range.last_page, total_pages=total_pages
+    )
+    for attempt in range(1, PDF_RANGE_MAX_ATTEMPTS + 1):
+        try:
+            async with semaphore:
+                with span("pdf_range_extraction", pages=page_range.page_count, attempt=attempt):
+                    text, truncated = await _run_extraction(prompt, page_range.pdf_bytes)
+            break
+        except Exception as e:
+            if attempt == PDF_RANGE_MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            delay = PDF_RANGE_RETRY_BASE_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            logger.warning(
+                "PDF range extraction failed, retrying",
+                extra={
+                    "first_page": page_range.first_page,
+                    "last_page": page_range.last_page,
+                    "attempt": attempt,
+                    "error": repr(e),
+                    "retry_in_s": round(delay, 2),
+                },
+            )
+            await asyncio.sleep(delay)
+
+    if not truncated or page_range.page_count == 1:
+        return [text]
+
+    logger.info(
+        "PDF range hit the output limit, splitting it",
+        extra={"first_page": page_range.first_page, "last_page": page_range.last_page},
+    )
+    _, halves = await asyncio.to_thread(
+        split_pdf, page_range.pdf_bytes, (page_range.page_count + 1) // 2, 1, page_range.first_page
+    )
+    texts = await _gather_or_cancel(_extract_range(half, total_pages, semaphore) for half in halves)
+    return [part for half_texts in texts for part in half_texts]
+
+
+def _join_ranges(texts: list[list[str]]) -> str:
+    return "\n\n".join(part.strip() for range_texts in texts for part in range_texts)
+
+
+async def extract_page_ranges(
+    ranges: list[PageRange], total_pages: int, on_progress: ProgressCallback | None = None
+) -> str:
+    """
+    Convert page ranges concurrently and join their text in page order.
+
+    At most PDF_RANGE_CONCURRENCY Gemini calls run at a time. If a range
+    still fails after its retries, the remaining ranges are cancelled and
+    the error is raised. on_progress gets the text completed so far from
+    the start of the manual, which only ever grows.
+    """
+    semaphore = asyncio.Semaphore(PDF_RANGE_CONCURRENCY)
+    results: list[list[str] | None] = [None] * len(ranges)
+
+    async def extract(index: int, page_range: PageRange) -> list[str]:
+        results[index] = await _extract_range(page_range, total_pages, semaphore)
+        if on_progress is not None:
+            done = [texts for texts in results if texts is not None]
+            leading = next((i for i, texts in enumerate(results) if texts is None), len(results))
+            on_progress(len(done), len(ranges), _join_ranges(results[:leading]))
+        return results[index]
+
+    with span("pdf_extraction", mode="ranges", pages=total_pages, ranges=len(ranges)):
+        texts = await _gather_or_cancel(extract(i, page_range) for i, page_range in enumerate(ranges))
+    return _join_ranges(texts)
+
+
+async def _extract(pdf_bytes: bytes, on_progress: ProgressCallback | None) -> str:
+    """Split large manuals into page ranges; convert small (or unparseable) ones in one call."""
+    try:
+        with span("pdf_split", pdf_bytes=len(pdf_bytes)):
+            total_pages, ranges = await asyncio.to_thread(
+                split_pdf, pdf_bytes, PDF_PAGES_PER_RANGE, PDF_PARALLEL_MIN_PAGES
+            )
+    except Exception as e:
+        # Gemini may still read PDFs pypdf can't (e.g. malformed cross-reference tables)
+        logger.warning("Could not split PDF, extracting it in one call", extra={"error": repr(e)})
+        return await extract_single(pdf_bytes)
+
+    if len(ranges) <= 1:
+        return await extract_single(pdf_bytes)
+    logger.info("Extracting PDF in page ranges", extra={"pages": total_pages, "ranges": len(ranges)})
+    return await extract_page_ranges(ranges, total_pages, on_progress)
+
+
+async def extract_text_from_pdf(
+    pdf_bytes: bytes, on_progress: ProgressCallback | None = None, cancel_if_abandoned: bool = False
+) -> str:
     """
     Convert a PDF manual into a readable text-based manual using Google Gemini.
 
+    Manuals of PDF_PARALLEL_MIN_PAGES pages or more are split locally into
+    ranges of PDF_PAGES_PER_RANGE pages that are converted concurrently, so
+    latency stays roughly flat with page count and no single call runs into
+    the output limit; smaller manuals are converted in one call.
+
+    Results are cached on disk by PDF content hash, so re-uploading the same
+    manual returns immediately without calling Gemini. Identical PDFs uploaded
+    while an extraction is in flight wait for that extraction instead of
+    starting another.
+
     Args:
         pdf_bytes: The PDF file as bytes
+        on_progress: Called with the partial text as page ranges complete (only
+            for an extraction this call starts; cache hits and joined calls
+            just return the full text)
+        cancel_if_abandoned: Stop the extraction if this caller is cancelled and
+            nobody else waits for it, instead of finishing it for the cache
 
     Returns:
         Well-formatted text manual converted from the PDF
     """
-    result = await agent.run(
-        [
-            "Convert this PDF manual into a clear, readable text-based manual in English. Organize the content logically with proper sections, steps, and formatting. Include all important information like titles, instructions, part lists, diagrams descriptions, warnings, and notes. Make it easy to follow and understand. Do not include any meta-commentary about the conversion process. Always respond in English.",
-            BinaryContent(data=pdf_bytes, media_type="application/pdf"),
-        ]
-    )
-    return result.output
+    cache_key = pdf_text_cache.make_key(pdf_bytes, PDF_EXTRACTION_VERSION)
+    cached_text = await pdf_text_cache.aget(cache_key)
+    if cached_text is not None:
+        logger.info("PDF text cache hit", extra={"key": cache_key[:12]})
+        return cached_text
+
+    async def extract() -> str:
+        text = await _extract(pdf_bytes, on_progress)
+        await pdf_text_cache.aput(cache_key, text)
+        return text
+
+    return await pdf_extractions.do(cache_key, extract, cancel_if_abandoned)
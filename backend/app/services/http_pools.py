@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import threading
+import httpx
+from app.core.config import (
+    HTTP_POOL_CONNECT_TIMEOUT_SECONDS,
+    HTTP_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    HTTP_POOL_READ_TIMEOUT_SECONDS,
+    HTTP_POOL_WARMUP_CONNECTIONS,
+    HTTP_POOL_WARMUP_TIMEOUT_SECONDS,
+    settings,
+)
+from app.services.upstream_governor import GovernedAsyncTransport, GovernedTransport, upstream_governors
+
+logger = logging.getLogger(__name__)
+
+# Upstream quota (governor) each pool's requests count against
+POOL_UPSTREAMS = {"sambanova": "sambanova", "sambanova_sync": "whisper", "gemini": "gemini"}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_POOL_READ_TIMEOUT_SECONDS, connect=HTTP_POOL_CONNECT_TIMEOUT_SECONDS)
+
+
+class _RequestCounter:
+    """httpx event hooks counting requests and responses per pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+
+    def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+
+    def on_response(self, response: httpx.Response) -> None:
+        self.responses += 1
+
+    async def aon_request(self, request: httpx.Request) -> None:
+        self.on_request(request)
+
+    async def aon_response(self, response: httpx.Response) -> None:
+        self.on_response(response)
+
+
+class HttpPools:
+    """
+    Shared keep-alive HTTP connection pools for the upstream APIs.
+
+    - sambanova: async client used by the Llama agent (OpenAI-compatible API)
+    - sambanova_sync: sync client used by the SambaNova SDK for Whisper transcription
+      (called from the transcription thread pool)
+    - gemini: async client used by the PDF extraction agent
+
+    Requests go through the upstream's governor (see upstream_governor), which
+    paces them to the configured quota and retries throttled responses.
+    All clients are created once with the same tunable limits and HTTP/2 (when
+    enabled, concurrent requests multiplex over one TLS connection). warm_up()
+    pre-opens connections at startup so the first request after a cold start
+    doesn't pay for DNS + TCP + TLS; close() releases them on shutdown. Clients
+    are only constructed on first use, keeping SSL context setup out of import.
+    """
+
+    def __init__(self, http2: bool):
+        self.http2 = http2
+        self._counters = {name: _RequestCounter() for name in ("sambanova", "sambanova_sync", "gemini")}
+        # Clients (and their SSL contexts) are created on first use
+        self._clients: dict[str, httpx.Client | httpx.AsyncClient] = {}
+        # The sync client is first used from transcription worker threads
+        self._lock = threading.Lock()
+        self.warmed_up: dict[str, bool] = {name: False for name in self._counters}
+
+    def _async_client(self, name: str) -> httpx.AsyncClient:
+        with self._lock:
+            if name not in self._clients:
+                counter = self._counters[name]
+                transport = httpx.AsyncHTTPTransport(http2=self.http2, limits=_limits())
+                self._clients[name] = httpx.AsyncClient(
+                    transport=GovernedAsyncTransport(transport, upstream_governors[POOL_UPSTREAMS[name]]),
+                    timeout=_timeout(),
+                    event_hooks={"request": [counter.aon_request], "response": [counter.aon_response]},
+                )
+            return self._clients[name]
+
+    @property
+    def sambanova(self) -> httpx.AsyncClient:
+        return self._async_client("sambanova")
+
+    @property
+    def gemini(self) -> httpx.AsyncClient:
+        return self._async_client("gemini")
+
+    @property
+    def sambanova_sync(self) -> httpx.Client:
+        with self._lock:
+            if "sambanova_sync" not in self._clients:
+                counter = self._counters["sambanova_sync"]
+                transport = httpx.HTTPTransport(http2=self.http2, limits=_limits())
+                self._clients["sambanova_sync"] = httpx.Client(
+                    transport=GovernedTransport(transport, upstream_governors["whisper"]),
+                    timeout=_timeout(),
+                    event_hooks={"request": [counter.on_request], "response": [counter.on_response]},
+                )
+            return self._clients["sambanova_sync"]
+
+    async def warm_up(self, connections: int = HTTP_POOL_WARMUP_CONNECTIONS) -> None:
+        """
+        Open keep-alive connections to SambaNova and Gemini.
+
+        Any response (even 401/404) leaves a connection in the pool, so cheap
+        unauthenticated requests to the API roots are enough. Failures are
+        logged and ignored; requests then simply connect on demand.
+        """
+        # With HTTP/2 one connection carries concurrent requests, so one is enough
+        count = 1 if self.http2 else connections
+        targets = [
+            ("sambanova", self.sambanova.head, settings.sambanova_base_url),
+            ("gemini", self.gemini.head, settings.gemini_base_url),
+            (
+                "sambanova_sync",
+                lambda url: asyncio.to_thread(self.sambanova_sync.head, url),
+                settings.sambanova_base_url,
+            ),
+        ]
+
+        async def warm(name, head, url):
+            results = await asyncio.gather(*(head(url) for _ in range(count)), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, Exception)]
+            self.warmed_up[name] = len(errors) < len(results)
+            if errors:
+                logger.warning("Connection warm-up failed", extra={"pool": name, "error": repr(errors[0])})
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(warm(*target) for target in targets)),
+                timeout=HTTP_POOL_WARMUP_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Connection warm-up timed out", extra={"timeout_s": HTTP_POOL_WARMUP_TIMEOUT_SECONDS})
+        logger.info("Connection pools warmed up", extra={"warmed_up": self.warmed_up})
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        for client in self._clients.values():
+            if isinstance(client, httpx.AsyncClient):
+                await client.aclose()
+            else:
+                client.close()
+        self._clients.clear()
+
+    @staticmethod
+    def _pool_stats(client: httpx.Client | httpx.AsyncClient | None) -> dict:
+        # httpcore's connection pool is not part of httpx's public API; report what it exposes
+        transport = getattr(client, "_transport", None)
+        # Unwrap the governed transport to reach httpx's own
+        transport = getattr(transport, "transport", transport)
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "in_flight_requests": len(requests),
+            # Requests waiting for a connection because the pool is at max_connections
+            "queued_requests": sum(1 for request in requests if request.is_queued()),
+        }
+
+    def stats(self) -> dict:
+        """Pool limits and per-pool connection utilization for monitoring."""
+        return {
+            "http2": self.http2,
+            "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+            "pools": {
+                name: {
+                    "created": name in self._clients,
+                    "warmed_up": self.warmed_up[name],
+                    "requests": self._counters[name].requests,
+                    "responses": self._counters[name].responses,
+                    **self._pool_stats(self._clients.get(name)),
+                }
+                for name in self._counters
+            },
+        }
+
+
+# Global connection pools shared by the agent, transcription and PDF services
+http_pools = HttpPools(http2=settings.http2_enabled)
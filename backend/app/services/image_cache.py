@@ -0,0 +1,216 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from PIL import Image
+from app.core.config import (
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_CACHE_MAX_DISTANCE,
+    IMAGE_JPEG_OPTIMIZE,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_SIZE,
+)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    64-bit perceptual difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    re-compression, small exposure changes and sensor noise barely change it.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two perceptual hashes."""
+    return (a ^ b).bit_count()
+
+
+def _hash_bands(value: int, bands: int, bits: int = 64) -> list[int]:
+    """Split a hash into bands of near-equal width (low bits first)."""
+    result = []
+    for band in range(bands):
+        width = bits // bands + (band < bits % bands)
+        result.append(value & ((1 << width) - 1))
+        value >>= width
+    return result
+
+
+@dataclass
+class _CachedImage:
+    data_url: str
+    perceptual_hash: int
+    size: tuple[int, int]
+    # Sessions whose near-duplicate lookups may return this image
+    scopes: set[str] = field(default_factory=set)
+
+
+class ImageCache:
+    """
+    Byte-bounded LRU cache of preprocessed image data URLs.
+
+    Lookups try the exact content hash first (an identical upload yields an
+    identical data URL, whoever sent it), then fall back to the closest
+    near-duplicate with the same dimensions whose perceptual hash is within
+    max_distance bits. A near match returns a different photo, so it is only
+    looked for among the images of the same scope (the chat session): a user's
+    repeated photo of the same assembly step reuses the already-compressed
+    data URL, which also keeps the payload byte-identical for upstream prompt
+    caching, but nobody is ever answered about another user's picture.
+
+    Near matches are found through a band index instead of a scan: the 64-bit
+    hash is split into max_distance + 1 bands, and any hash within
+    max_distance bits agrees exactly with at least one band (pigeonhole), so
+    only images sharing a band with the query are compared.
+
+    Results depend on the output settings, so those are part of the content key.
+    Thread-safe: lookups happen in the image preprocessing thread pool.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_distance: int,
+        settings_key: str = f"{IMAGE_MAX_SIZE}:{IMAGE_JPEG_QUALITY}:{IMAGE_JPEG_OPTIMIZE}",
+    ):
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self._settings_key = settings_key.encode("ascii")
+        self._entries: OrderedDict[str, _CachedImage] = OrderedDict()
+        # (scope, band number, band value) -> content keys of the scope's images with that band
+        self._bands: dict[tuple[str, int, int], set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def content_key(self, image_bytes: bytes) -> str:
+        """SHA-256 of the encoded image and the output settings."""
+        digest = hashlib.sha256(self._settings_key)
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def _band_keys(self, scope: str, perceptual_hash: int) -> list[tuple[str, int, int]]:
+        bands = _hash_bands(perceptual_hash, self.max_distance + 1)
+        return [(scope, band, value) for band, value in enumerate(bands)]
+
+    def _index(self, key: str, entry: _CachedImage, scope: str) -> None:
+        if self.max_distance < 0 or scope in entry.scopes:
+            return
+        entry.scopes.add(scope)
+        for band_key in self._band_keys(scope, entry.perceptual_hash):
+            self._bands.setdefault(band_key, set()).add(key)
+
+    def _unindex(self, key: str, entry: _CachedImage) -> None:
+        for scope in entry.scopes:
+            for band_key in self._band_keys(scope, entry.perceptual_hash):
+                bucket = self._bands.get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._bands[band_key]
+
+    def get_exact(self, key: str, scope: str | None = None) -> str | None:
+        """
+        Return the data URL cached for an identical image, or None.
+
+        The image also becomes a near-duplicate candidate for scope.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            if scope is not None:
+                self._index(key, entry, scope)
+            self.exact_hits += 1
+            return entry.data_url
+
+    def get_similar(self, perceptual_hash: int, size: tuple[int, int], scope: str | None) -> str | None:
+        """
+        Return the data URL of the closest near-duplicate image of scope, or None (counted as a miss).
+
+        Without a scope (stateless requests) there is no near matching.
+        """
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            if scope is not None and self.max_distance >= 0:
+                candidates = set()
+                for band_key in self._band_keys(scope, perceptual_hash):
+                    candidates |= self._bands.get(band_key, set())
+                for key in candidates:
+                    entry = self._entries[key]
+                    if entry.size != size:
+                        continue
+                    distance = hamming_distance(entry.perceptual_hash, perceptual_hash)
+                    if distance < best_distance:
+                        best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.near_hits += 1
+            return self._entries[best_key].data_url
+
+    def put(
+        self, key: str, data_url: str, perceptual_hash: int, size: tuple[int, int], scope: str | None = None
+    ) -> None:
+        """Store a data URL, evicting the least recently used entries while over max_bytes."""
+        if len(data_url) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.data_url)
+                self._unindex(key, previous)
+            entry = _CachedImage(data_url, perceptual_hash, size)
+            self._entries[key] = entry
+            self._bytes += len(data_url)
+            if previous is not None:
+                for previous_scope in previous.scopes:
+                    self._index(key, entry, previous_scope)
+            if scope is not None:
+                self._index(key, entry, scope)
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data_url)
+                self._unindex(evicted_key, evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size for monitoring."""
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_distance": self.max_distance,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Global image cache instance
+image_cache = ImageCache(max_bytes=IMAGE_CACHE_MAX_BYTES, max_distance=IMAGE_CACHE_MAX_DISTANCE)
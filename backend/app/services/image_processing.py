@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from app.core.config import (
+    IMAGE_JPEG_OPTIMIZE,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_SIZE,
+    IMAGE_PROCESSING_WORKERS,
+)
+from app.services.image_cache import ImageCache, difference_hash, image_cache
+from app.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_IMAGE_TYPES = [
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+]
+
+# PIL releases the GIL while decoding, resizing and encoding, so a thread pool
+# gives real parallelism without pickling image bytes to worker processes
+_executor = ThreadPoolExecutor(max_workers=IMAGE_PROCESSING_WORKERS, thread_name_prefix="image")
+
+
+def _open_downscaled(image_bytes: bytes, max_size: int) -> tuple[Image.Image, tuple[int, int]]:
+    """Open an image, decoding JPEGs at reduced resolution (draft mode) when much larger than max_size."""
+    pil_image = Image.open(io.BytesIO(image_bytes))
+    original_size = pil_image.size
+    pil_image.draft("RGB", (max_size, max_size))
+    return pil_image, original_size
+
+
+def _encode_data_url(pil_image: Image.Image, max_size: int, quality: int, optimize: bool) -> str:
+    if pil_image.width > max_size or pil_image.height > max_size:
+        pil_image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    # JPEG only stores RGB and grayscale (CMYK, 16-bit, palette and alpha modes must be converted)
+    if pil_image.mode not in ("RGB", "L"):
+        pil_image = pil_image.convert("RGB")
+
+    img_byte_arr = io.BytesIO()
+    pil_image.save(img_byte_arr, format="JPEG", quality=quality, optimize=optimize)
+    base64_encoded = base64.b64encode(img_byte_arr.getbuffer()).decode("ascii")
+    return f"data:image/jpeg;base64,{base64_encoded}"
+
+
+def image_to_data_url(
+    image_bytes: bytes,
+    max_size: int = IMAGE_MAX_SIZE,
+    quality: int = IMAGE_JPEG_QUALITY,
+    optimize: bool = IMAGE_JPEG_OPTIMIZE,
+) -> str:
+    """
+    Downscale an image and return it as a base64 JPEG data URL.
+
+    JPEG inputs are decoded at reduced resolution (draft mode) when they are
+    much larger than max_size, which skips most of the decode work.
+
+    Args:
+        image_bytes: Encoded image (JPEG, PNG, GIF, WebP)
+        max_size: Maximum width/height of the output
+        quality: JPEG quality of the output
+        optimize: Whether to run the extra JPEG Huffman optimization pass
+
+    Returns:
+        "data:image/jpeg;base64,..." URL as required by SambaNova
+    """
+    pil_image, _ = _open_downscaled(image_bytes, max_size)
+    return _encode_data_url(pil_image, max_size, quality, optimize)
+
+
+def cached_image_to_data_url(
+    image_bytes: bytes, scope: str | None = None, cache: ImageCache = image_cache
+) -> str:
+    """
+    image_to_data_url with exact and near-duplicate caching.
+
+    An identical upload is answered from its content hash without decoding.
+    Otherwise the image is decoded once; its perceptual hash is checked against
+    the images cached for scope (the chat session) and only a real miss pays
+    for resizing and JPEG encoding.
+    """
+    key = cache.content_key(image_bytes)
+    data_url = cache.get_exact(key, scope)
+    if data_url is not None:
+        return data_url
+
+    pil_image, original_size = _open_downscaled(image_bytes, IMAGE_MAX_SIZE)
+    perceptual_hash = difference_hash(pil_image)
+    data_url = cache.get_similar(perceptual_hash, original_size, scope)
+    if data_url is None:
+        data_url = _encode_data_url(pil_image, IMAGE_MAX_SIZE, IMAGE_JPEG_QUALITY, IMAGE_JPEG_OPTIMIZE)
+        cache.put(key, data_url, perceptual_hash, original_size, scope)
+    return data_url
+
+
+async def preprocess_images(images: list[bytes], scope: str | None = None) -> list[str]:
+    """
+    Convert all images of a request to data URLs in parallel, off the event loop.
+
+    Args:
+        images: Encoded image bytes, in request order
+        scope: Session the images belong to; near-duplicate reuse only happens
+            within a session, and not at all for stateless requests
+
+    Returns:
+        Data URLs in the same order
+    """
+    loop = asyncio.get_running_loop()
+    with span("image_transcode", images=len(images)):
+        data_urls = await asyncio.gather(
+            *(
+                loop.run_in_executor(_executor, cached_image_to_data_url, image_bytes, scope)
+                for image_bytes in images
+            )
+        )
+    logger.debug(
+        "Images preprocessed",
+        extra={"input_bytes": [len(b) for b in images], "data_url_chars": [len(u) for u in data_urls]},
+    )
+    return list(data_urls)
@@ -1,7 +1,19 @@
-from pydantic_ai import Agent, BinaryContent, ImageUrl, ModelMessagesTypeAdapter
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
-from app.core.config import settings
+import logging
+from contextlib import asynccontextmanager
+from functools import cache
+from pydantic_ai import Agent, BinaryContent, ImageUrl
+from pydantic_ai.messages import ModelMessage
+from app.core.config import MANUAL_RETRIEVAL_TOP_K, settings
+from app.services.agent_cache import agent_cache, manual_content_hash
+from app.services.http_pools import http_pools
+from app.services.manual_index import ManualIndex
+from app.services.metrics import record_llm_usage, record_prompt_budget, span
+from app.services.prompt_budget import fit_history
+
+logger = logging.getLogger(__name__)
+
+# SambaNova model behind every agent
+MODEL_NAME = "Llama-4-Maverick-17B-128E-Instruct"
 
 
 # System instruction template with variable for manual text
@@ -19,73 +31,139 @@ IMPORTANT:
 - Always respond in English, regardless of the language used in the user's question or the manual."""
 
 
-# Create base model with SambaNova's Llama-4-Maverick
-model = OpenAIChatModel(
-    "Llama-4-Maverick-17B-128E-Instruct",
-    provider=OpenAIProvider(
-        base_url=settings.sambanova_base_url, api_key=settings.sambanova_api_key
-    ),
-)
+# System instruction used in retrieval mode: only the table of contents lives in the
+# system prompt, the relevant sections are attached to each question
+ASSEMBLY_RETRIEVAL_INSTRUCTION = """You are a helpful assembly guide assistant for a product manual with the following sections:
+
+---BEGIN TABLE OF CONTENTS---
+{table_of_contents}
+---END TABLE OF CONTENTS---
+
+Each question comes with the manual sections most relevant to it, below these instructions. Answer from those sections.
+
+Provide SHORT, CONVERSATIONAL responses like you're talking to someone. Use 1-2 sentences maximum, like oral conversation. Be direct and concise. Use simple language. If users ask about assembly steps, give brief, clear guidance from the manual.
+
+IMPORTANT:
+- Keep responses SHORT (1-2 sentences, like speaking)
+- Be conversational and friendly
+- Always respond in English, regardless of the language used in the user's question or the manual."""
+
 
 # Default agent with short, conversational system instruction
 DEFAULT_SYSTEM_INSTRUCTION = """You are a helpful assistant. Keep responses SHORT and CONVERSATIONAL, like oral conversation. Use 1-2 sentences maximum. Be direct, friendly, and concise. Always respond in English."""
 
-agent = Agent(model, system_prompt=DEFAULT_SYSTEM_INSTRUCTION)
 
+@cache
+def get_model():
+    """
+    Base model with SambaNova's Llama-4-Maverick, built on first use.
 
-async def run_agent_with_files(
+    The OpenAI SDK is imported here rather than at module level to keep it out
+    of the server's cold start.
+    """
+    from openai import AsyncOpenAI
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    client = AsyncOpenAI(
+        base_url=settings.sambanova_base_url,
+        api_key=settings.sambanova_api_key,
+        http_client=http_pools.sambanova,
+        # Rate-limit retries are handled by the upstream governor in the pool's transport
+        max_retries=0,
+    )
+    return OpenAIChatModel(MODEL_NAME, provider=OpenAIProvider(openai_client=client))
+
+
+@cache
+def get_default_agent() -> Agent:
+    """Agent used when no manual is attached, built on first use."""
+    return Agent(get_model(), system_prompt=DEFAULT_SYSTEM_INSTRUCTION)
+
+
+def build_system_prompt(manual_text: str | None, manual_index: ManualIndex | None = None) -> str:
+    """System prompt for a manual (its table of contents in retrieval mode), or the default one."""
+    if not manual_text:
+        return DEFAULT_SYSTEM_INSTRUCTION
+    if manual_index is not None:
+        return ASSEMBLY_RETRIEVAL_INSTRUCTION.format(table_of_contents=manual_index.table_of_contents())
+    return ASSEMBLY_SYSTEM_INSTRUCTION.format(manual_text=manual_text)
+
+
+def get_manual_agent(manual_text: str, manual_index: ManualIndex | None = None) -> Agent:
+    """
+    Return an agent whose system prompt carries the given manual.
+
+    Agents are cached per manual content hash so the (potentially very large)
+    system prompt is only formatted once per manual rather than on every turn.
+    When a manual index is given, the system prompt only carries its table of contents.
+    """
+    key = manual_content_hash(manual_text)
+    cached_agent = agent_cache.get(key)
+    if cached_agent is not None:
+        return cached_agent
+
+    system_prompt = build_system_prompt(manual_text, manual_index)
+    logger.info("Built manual system prompt", extra={"manual": key[:12], "prompt_chars": len(system_prompt)})
+    agent_with_manual = Agent(get_model(), system_prompt=system_prompt)
+    agent_cache.put(key, agent_with_manual)
+    return agent_with_manual
+
+
+def build_retrieval_instructions(message: str, manual_index: ManualIndex) -> str | None:
+    """
+    Per-run instructions carrying the manual sections most relevant to the user's message.
+
+    They are sent as run instructions rather than in the user prompt: the model
+    only gets the instructions of the latest request, so sections retrieved for
+    earlier turns are not resent with the history (and are not stored in it,
+    see append_conversation_messages).
+
+    Args:
+        message: The user's question
+        manual_index: Index of the session's manual
+
+    Returns:
+        Instructions carrying the top-k sections, or None if nothing matched
+    """
+    sections = manual_index.search(message, MANUAL_RETRIEVAL_TOP_K)
+    if not sections:
+        return None
+
+    context = "\n\n".join(f"[{section.title}]\n{section.text}" for section in sections)
+    return f"Relevant manual sections:\n---\n{context}\n---"
+
+
+def _prepare_agent_run(
     message: str,
     files: list[tuple[bytes, str, str]] | None = None,
     image_urls: list[str] | None = None,
     manual_text: str | None = None,
-    message_history: list[dict] | None = None,
+    message_history: list[ModelMessage] | None = None,
+    manual_index: ManualIndex | None = None,
 ):
     """
-    Run the agent with optional file attachments, image URLs, manual context, and conversation history.
+    Resolve the agent, user input and history for a single run.
 
-    Args:
-        message: The text message/prompt
-        files: List of tuples containing (file_bytes, filename, content_type) for binary files
-        image_urls: List of image URLs to include (preferred over binary for images)
-        manual_text: Optional product manual text from PDF extraction
-        message_history: Optional conversation history (serialized messages)
+    Shared by run_agent_with_files and stream_agent_with_files so both paths
+    build exactly the same request. The history is windowed to the most
+    recent turns that fit settings.prompt_token_budget.
 
     Returns:
-        Agent run result
+        Tuple of (active_agent, user_input, message_history, instructions)
     """
-    # Debug logging
-    print(f"[Agent] Message length: {len(message)} chars")
+    # Use the (cached) manual agent if manual text is provided
+    instructions = None
     if manual_text:
-        print(f"[Agent] Manual text length: {len(manual_text)} chars")
-    if files:
-        print(f"[Agent] Number of binary files: {len(files)}")
-        for i, (file_bytes, filename, content_type) in enumerate(files):
-            print(f"[Agent] File {i}: {filename}, type: {content_type}, size: {len(file_bytes)} bytes")
-    if image_urls:
-        print(f"[Agent] Number of image URLs: {len(image_urls)}")
-        for i, url in enumerate(image_urls):
-            print(f"[Agent] Image URL {i}: {url}")
-    if message_history:
-        print(f"[Agent] Message history entries: {len(message_history)}")
-
-    # Create agent with system instruction if manual text is provided
-    if manual_text:
-        system_prompt = ASSEMBLY_SYSTEM_INSTRUCTION.format(manual_text=manual_text)
-        print(f"[Agent] System prompt length: {len(system_prompt)} chars")
-        agent_with_manual = Agent(model, system_prompt=system_prompt)
-        active_agent = agent_with_manual
+        active_agent = get_manual_agent(manual_text, manual_index)
+        if manual_index is not None:
+            instructions = build_retrieval_instructions(message, manual_index)
     else:
-        active_agent = agent
-
-    # Deserialize message history if provided
-    deserialized_history = None
-    if message_history:
-        deserialized_history = ModelMessagesTypeAdapter.validate_python(message_history)
+        active_agent = get_default_agent()
 
     # Build the input (message or message + files/images)
     if not files and not image_urls:
         user_input = message
-        print("[Agent] User input: text only")
     else:
         # Build the input list with message and file contents
         input_parts = [message]
@@ -94,7 +172,6 @@ async def run_agent_with_files(
         if image_urls:
             for url in image_urls:
                 input_parts.append(ImageUrl(url=url))
-                print(f"[Agent] Added ImageUrl: {url}")
 
         # Add binary files (for non-image files)
         if files:
@@ -105,17 +182,99 @@ async def run_agent_with_files(
                     identifier=filename,
                 )
                 input_parts.append(binary_content)
-                print(f"[Agent] Added BinaryContent: {filename}, {content_type}, {len(file_bytes)} bytes")
 
         user_input = input_parts
-        print(f"[Agent] User input: {len(input_parts)} parts (1 text + {len(input_parts)-1} attachments)")
 
-    print("[Agent] About to call agent.run()...")
-    # Run agent with message history if available
-    if deserialized_history:
-        result = await active_agent.run(user_input, message_history=deserialized_history)
-    else:
-        result = await active_agent.run(user_input)
+    message_history, budget = fit_history(
+        message_history,
+        build_system_prompt(manual_text, manual_index),
+        message,
+        attachments=len(files or []) + len(image_urls or []),
+        budget=settings.prompt_token_budget,
+        instructions=instructions,
+    )
+    record_prompt_budget(budget)
+    logger.info("Prompt budget", extra=budget.as_fields())
+    logger.debug(
+        "Prepared agent run",
+        extra={
+            "message_chars": len(message),
+            "manual_chars": len(manual_text) if manual_text else 0,
+            "file_bytes": sum(len(file_bytes) for file_bytes, _, _ in files or []),
+        },
+    )
+    return active_agent, user_input, message_history, instructions
+
+
+async def run_agent_with_files(
+    message: str,
+    files: list[tuple[bytes, str, str]] | None = None,
+    image_urls: list[str] | None = None,
+    manual_text: str | None = None,
+    message_history: list[ModelMessage] | None = None,
+    manual_index: ManualIndex | None = None,
+):
+    """
+    Run the agent with optional file attachments, image URLs, manual context, and conversation history.
+
+    Args:
+        message: The text message/prompt
+        files: List of tuples containing (file_bytes, filename, content_type) for binary files
+        image_urls: List of image URLs to include (preferred over binary for images)
+        manual_text: Optional product manual text from PDF extraction
+        message_history: Optional conversation history (ModelMessage objects from the session)
+        manual_index: Optional index of the manual; when given, only relevant sections are sent
+
+    Returns:
+        Agent run result
+    """
+    active_agent, user_input, message_history, instructions = _prepare_agent_run(
+        message, files, image_urls, manual_text, message_history, manual_index
+    )
+
+    with span("agent_call", mode="run"):
+        # Run agent with message history if available
+        if message_history:
+            result = await active_agent.run(user_input, message_history=message_history, instructions=instructions)
+        else:
+            result = await active_agent.run(user_input, instructions=instructions)
 
-    print("[Agent] Agent.run() completed successfully")
+    record_llm_usage(MODEL_NAME, result.usage())
     return result
+
+
+@asynccontextmanager
+async def stream_agent_with_files(
+    message: str,
+    files: list[tuple[bytes, str, str]] | None = None,
+    image_urls: list[str] | None = None,
+    manual_text: str | None = None,
+    message_history: list[ModelMessage] | None = None,
+    manual_index: ManualIndex | None = None,
+):
+    """
+    Streaming variant of run_agent_with_files.
+
+    Usage:
+        async with stream_agent_with_files(message, ...) as result:
+            async for delta in result.stream_text(delta=True):
+                ...
+            new_messages = result.new_messages()
+
+    Args:
+        Same as run_agent_with_files
+
+    Yields:
+        Streamed run result (text deltas are available via stream_text(delta=True))
+    """
+    active_agent, user_input, message_history, instructions = _prepare_agent_run(
+        message, files, image_urls, manual_text, message_history, manual_index
+    )
+
+    with span("agent_call", mode="stream"):
+        async with active_agent.run_stream(
+            user_input, message_history=message_history or None, instructions=instructions
+        ) as result:
+            yield result
+
+    record_llm_usage(MODEL_NAME, result.usage())
@@ -0,0 +1,72 @@
+import asyncio
+import bisect
+import time
+from app.core.config import LOOP_LAG_BUCKETS_MS, LOOP_MONITOR_INTERVAL_SECONDS
+from app.services.metrics import histogram_lines, registry
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic sleep wakes up.
+
+    Anything that blocks the loop (CPU-bound work, sync IO in a handler)
+    delays every request being served, and shows up here as lag. Samples are
+    counted in cumulative histogram buckets, so callers can diff two
+    snapshots to get the lag distribution over any period (e.g. one
+    benchmark scenario).
+    """
+
+    def __init__(self, interval_seconds: float, buckets_ms: tuple[float, ...]):
+        self.interval_seconds = interval_seconds
+        self.buckets_ms = buckets_ms
+        # One count per bucket upper bound, plus the overflow bucket
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.samples = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, lag_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets_ms, lag_ms)] += 1
+        self.samples += 1
+        self.total_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    async def run(self) -> None:
+        """Sample lag every interval until cancelled."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_seconds)
+            lag = time.perf_counter() - start - self.interval_seconds
+            self.record(max(0.0, lag) * 1000)
+
+    def stats(self) -> dict:
+        """Sample count, mean/max lag and the lag histogram for monitoring."""
+        return {
+            "interval_ms": self.interval_seconds * 1000,
+            "samples": self.samples,
+            "mean_lag_ms": self.total_ms / self.samples if self.samples else 0.0,
+            "max_lag_ms": self.max_ms,
+            "buckets_ms": [*self.buckets_ms, "inf"],
+            "counts": list(self.counts),
+        }
+
+    def prometheus_lines(self) -> list[str]:
+        """The lag histogram in Prometheus exposition format (seconds)."""
+        name = "event_loop_lag_seconds"
+        return [
+            f"# HELP {name} Delay of the event loop in waking up a periodic sleep.",
+            f"# TYPE {name} histogram",
+            *histogram_lines(
+                name,
+                (),
+                (),
+                tuple(bound / 1000 for bound in self.buckets_ms),
+                list(self.counts),
+                self.total_ms / 1000,
+            ),
+        ]
+
+
+# Global event loop monitor, started by the app lifespan
+loop_monitor = LoopLagMonitor(LOOP_MONITOR_INTERVAL_SECONDS, LOOP_LAG_BUCKETS_MS)
+registry.add_collector(loop_monitor.prometheus_lines)
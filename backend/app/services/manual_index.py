@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from app.core.config import MANUAL_CHUNK_MAX_CHARS
+
+# Lines that start a new section: markdown headings, "Step 3", "Section 2", "Part list", numbered titles
+_HEADING_RE = re.compile(
+    r"^\s*(#{1,6}\s+.+|(step|section|chapter|part|warning|note)\b.{0,80}|\d+[.)]\s+[A-Z].{0,80})$",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or so that the this to what when where which with you your".split()
+)
+
+
+def _normalize_token(token: str) -> str:
+    """Very light stemming so "screws" matches "screw"."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, lightly stemmed word tokens with common stopwords removed."""
+    return [_normalize_token(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class ManualSection:
+    """A chunk of the manual with its heading."""
+
+    title: str
+    text: str
+
+
+@dataclass
+class ManualIndex:
+    """
+    BM25 lexical index over manual sections.
+
+    Built once per manual at session creation so each question only needs to
+    carry the top-k relevant sections instead of the whole manual.
+    """
+
+    sections: list[ManualSection]
+    k1: float = 1.5
+    b: float = 0.75
+    _term_freqs: list[Counter] = field(default_factory=list, repr=False)
+    _doc_lengths: list[int] = field(default_factory=list, repr=False)
+    _idf: dict[str, float] = field(default_factory=dict, repr=False)
+    _avg_doc_length: float = 0.0
+
+    def __post_init__(self):
+        doc_freqs: Counter = Counter()
+        for section in self.sections:
+            tokens = tokenize(f"{section.title}\n{section.text}")
+            term_freq = Counter(tokens)
+            self._term_freqs.append(term_freq)
+            self._doc_lengths.append(len(tokens))
+            doc_freqs.update(term_freq.keys())
+
+        n_docs = len(self.sections)
+        self._avg_doc_length = sum(self._doc_lengths) / n_docs if n_docs else 0.0
+        self._idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()
+        }
+
+    def search(self, query: str, top_k: int) -> list[ManualSection]:
+        """
+        Return the top_k sections most relevant to the query, in manual order.
+
+        Args:
+            query: The user's question
+            top_k: Maximum number of sections to return
+
+        Returns:
+            Matching sections (empty if nothing in the manual matches)
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.sections:
+            return []
+
+        scores = []
+        for i, term_freq in enumerate(self._term_freqs):
+            length_norm = 1 - self.b + self.b * self._doc_lengths[i] / (self._avg_doc_length or 1)
+            score = 0.0
+            for term in query_terms:
+                tf = term_freq.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            if score > 0:
+                scores.append((score, i))
+
+        top = sorted(scores, reverse=True)[:top_k]
+        return [self.sections[i] for i in sorted(i for _, i in top)]
+
+    def table_of_contents(self) -> str:
+        """Short newline-separated list of section titles (split sections are listed once)."""
+        titles = dict.fromkeys(section.title for section in self.sections)
+        return "\n".join(f"- {title}" for title in titles)
+
+
+def _split_sections(manual_text: str) -> list[ManualSection]:
+    """Split manual text into titled sections at heading-like lines."""
+    sections = []
+    title = "Introduction"
+    lines: list[str] = []
+    for line in manual_text.splitlines():
+        if _HEADING_RE.match(line):
+            if any(l.strip() for l in lines):
+                sections.append(ManualSection(title=title, text="\n".join(lines).strip()))
+                lines = []
+            title = line.strip().lstrip("#").strip()[:100]
+        lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append(ManualSection(title=title, text="\n".join(lines).strip()))
+    return sections
+
+
+def _split_long_section(section: ManualSection, max_chars: int) -> list[ManualSection]:
+    """Split an oversized section on paragraph boundaries into parts of at most ~max_chars."""
+    if len(section.text) <= max_chars:
+        return [section]
+
+    parts = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", section.text):
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+
+    return [ManualSection(title=section.title, text=text) for text in parts]
+
+
+def build_manual_index(manual_text: str, max_chars: int = MANUAL_CHUNK_MAX_CHARS) -> ManualIndex:
+    """
+    Chunk the manual into sections and build a BM25 index over them.
+
+    Args:
+        manual_text: The extracted manual text
+        max_chars: Target maximum size of a single section
+
+    Returns:
+        ManualIndex ready for search()
+    """
+    sections = []
+    for section in _split_sections(manual_text):
+        sections.extend(_split_long_section(section, max_chars))
+    return ManualIndex(sections=sections)
@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits to multi-second upstream calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        # Updated from the event loop and from worker threads (transcription)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. requests in flight)."""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, plus their sum and count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            lines.extend(histogram_lines(self.name, self.label_names, key, self.buckets, counts, total))
+        return lines
+
+
+def histogram_lines(
+    name: str,
+    label_names: tuple[str, ...],
+    label_values: tuple[str, ...],
+    buckets: tuple[float, ...],
+    counts: list[int],
+    total: float,
+) -> list[str]:
+    """Prometheus sample lines for one histogram series from per-bucket (non-cumulative) counts."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip([*buckets, "+Inf"], counts):
+        cumulative += count
+        le = f'le="{bound if bound == "+Inf" else _format_value(bound)}"'
+        lines.append(f"{name}_bucket{_format_labels(label_names, label_values, le)} {cumulative}")
+    labels = _format_labels(label_names, label_values)
+    lines.append(f"{name}_sum{labels} {_format_value(total)}")
+    lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-compatible metrics registry.
+
+    Metrics created through the registry are rendered in the text exposition
+    format by render(); collectors add metrics computed at scrape time from
+    state other components already keep (queue depths, the event loop monitor).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Register a function returning extra exposition lines (HELP/TYPE included) at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry served by GET /metrics
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is fully sent.", ("route",)
+)
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+STAGE_DURATION = registry.histogram(
+    "stage_duration_seconds", "Latency of request processing stages (upload read, transcription, ...).", ("stage",)
+)
+STAGE_IN_FLIGHT = registry.gauge("stage_in_flight", "Stages currently running.", ("stage",))
+STAGE_ERRORS = registry.counter("stage_errors_total", "Stages that raised, by exception type.", ("stage", "error"))
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total",
+    "Failed upstream calls by status code (or exception type; 'rejected' = not admitted by the governor).",
+    ("upstream", "status"),
+)
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens used, from the agents' run usage.", ("model", "kind"))
+LLM_REQUESTS = registry.counter("llm_requests_total", "LLM requests made by agent runs.", ("model",))
+PROMPT_TOKENS = registry.histogram(
+    "prompt_tokens",
+    "Estimated prompt tokens per agent run by component (system, history, message, attachments, total).",
+    ("component",),
+    buckets=(100, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000),
+)
+PROMPT_TRIMMED_MESSAGES = registry.counter(
+    "prompt_trimmed_messages_total", "History messages left out of prompts to stay within the token budget."
+)
+
+
+@contextmanager
+def span(stage: str, **fields) -> Iterator[None]:
+    """
+    Time a processing stage into stage_duration_seconds and log it.
+
+    Works in sync and async code alike (`with span("transcription"):`).
+    Extra keyword fields are added to the structured log line.
+    """
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        STAGE_ERRORS.inc(stage=stage, error=error)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_DURATION.observe(duration, stage=stage)
+        logger.debug(
+            "span",
+            extra={"stage": stage, "duration_ms": round(duration * 1000, 2), "error": error, **fields},
+        )
+
+
+def record_prompt_budget(report) -> None:
+    """Add an agent run's prompt component estimates (PromptBudget) to the prompt metrics."""
+    PROMPT_TOKENS.observe(report.system_tokens, component="system")
+    PROMPT_TOKENS.observe(report.history_tokens, component="history")
+    PROMPT_TOKENS.observe(report.message_tokens, component="message")
+    PROMPT_TOKENS.observe(report.attachment_tokens, component="attachments")
+    PROMPT_TOKENS.observe(report.total_tokens, component="total")
+    PROMPT_TRIMMED_MESSAGES.inc(report.trimmed_messages)
+
+
+def record_llm_usage(model: str, usage) -> None:
+    """Add an agent run's usage (pydantic-ai RunUsage) to the token counters."""
+    LLM_REQUESTS.inc(usage.requests, model=model)
+    LLM_TOKENS.inc(usage.input_tokens, model=model, kind="input")
+    LLM_TOKENS.inc(usage.output_tokens, model=model, kind="output")
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from app.core.config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES
+
+
+class PdfTextCache:
+    """
+    Content-addressed on-disk cache for extracted PDF text.
+
+    Entries are stored as <key>.txt files in a local directory so they survive
+    restarts. Writes go through a temp file + os.replace so readers never see a
+    partial entry, and the least recently used files are removed once the
+    entries exceed max_bytes.
+
+    Entry sizes and recency are tracked in memory, so a put doesn't have to
+    list the directory. The directory is only scanned once, on first use, to
+    pick up the entries of earlier runs in mtime order (refreshed on every
+    hit, so recency survives restarts).
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> file size, least recently used first; None until the directory is scanned
+        self._sizes: OrderedDict[str, int] | None = None
+        self._total_bytes = 0
+        # get/put run in worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(pdf_bytes: bytes, version: str) -> str:
+        """
+        Build the cache key for a PDF.
+
+        Args:
+            pdf_bytes: The PDF file as bytes
+            version: Identifier of the prompt/model used for extraction
+
+        Returns:
+            Hex digest combining the PDF content hash and the extraction version
+        """
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        return hashlib.sha256(f"{version}:{digest}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.txt"
+
+    def _entries(self) -> OrderedDict[str, int]:
+        """Entry sizes in LRU order, scanning the directory on first use. Call with the lock held."""
+        if self._sizes is None:
+            entries = []
+            for path in self.directory.glob("*.txt"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._sizes = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._sizes.values())
+        return self._sizes
+
+    def _track(self, key: str, size: int) -> None:
+        """Record key as the most recently used entry. Call with the lock held."""
+        entries = self._entries()
+        self._total_bytes += size - entries.pop(key, 0)
+        entries[key] = size
+
+    def get(self, key: str) -> str | None:
+        """Return cached text for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                # Evicted by another process sharing the directory
+                self._total_bytes -= self._entries().pop(key, 0)
+            return None
+        # Refresh mtime so the next startup's scan also sees this entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+            entries = self._entries()
+            if key in entries:
+                entries.move_to_end(key)
+            else:
+                # Written by another process sharing the directory
+                self._track(key, len(text.encode("utf-8")))
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Atomically store text under key, then evict old entries if over budget."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = text.encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._track(key, len(data))
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until they fit in max_bytes. Call with the lock held."""
+        entries = self._entries()
+        while self._total_bytes > self.max_bytes and entries:
+            key, size = entries.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self._total_bytes -= size
+            self.evictions += 1
+
+    async def aget(self, key: str) -> str | None:
+        """Async wrapper for get() that keeps file IO off the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, text: str) -> None:
+        """Async wrapper for put() that keeps file IO off the event loop."""
+        await asyncio.to_thread(self.put, key, text)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "directory": str(self.directory),
+            "max_bytes": self.max_bytes,
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+pdf_text_cache = PdfTextCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Literal
+from app.core.config import PDF_JOB_MAX_ACTIVE, PDF_JOB_RETENTION_SECONDS, PDF_JOB_WORKERS
+from app.services.gemini_pdf_agent import extract_text_from_pdf
+from app.services.metrics import registry
+from app.services.session_manager import create_pending_session, update_session_manual
+
+logger = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobCapacityError(Exception):
+    """Raised when too many PDF jobs are already queued or running."""
+
+
+class JobSessionExpiredError(Exception):
+    """Raised when a job's session expired or was evicted before its manual was stored."""
+
+
+@dataclass
+class PdfJob:
+    """State of one background PDF extraction, as reported to pollers and event streams."""
+
+    job_id: str
+    session_id: str
+    filename: str
+    pdf_bytes: int
+    status: JobStatus = "queued"
+    ranges_done: int = 0
+    ranges_total: int = 0
+    # Text extracted so far from the start of the manual; only ever grows
+    text: str = ""
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Bumped on every change, so watchers can tell whether they missed anything
+    version: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def _notify(self) -> None:
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, version: int) -> None:
+        """Wait until the job has changed since version."""
+        while self.version == version:
+            await self._changed.wait()
+
+    def snapshot(self, text_offset: int | None = 0) -> dict:
+        """
+        JSON-serializable job state.
+
+        Args:
+            text_offset: Include the extracted text from this character on
+                (pollers pass what they already have); None leaves it out
+        """
+        state = {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "filename": self.filename,
+            "status": self.status,
+            "ranges_done": self.ranges_done,
+            "ranges_total": self.ranges_total,
+            "text_length": len(self.text),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if text_offset is not None:
+            state["text"] = self.text[text_offset:]
+        return state
+
+
+class PdfJobManager:
+    """
+    Runs PDF extractions in the background for the job API.
+
+    A job gets its session up front (with an empty manual), so the client has
+    a session ID immediately; the session's manual is updated as soon as the
+    first page ranges are converted and again as more text arrives. Chat turns
+    always use the session's current manual (see fit_history), so turns taken
+    while the job runs don't pin a partial one. At most
+    workers extractions run at once, the rest wait in FIFO order, and submit
+    refuses new jobs once max_active are queued or running. Finished jobs are
+    kept for retention_seconds so clients can fetch the result.
+
+    Jobs live in this process (like the "memory" session backend); with
+    several uvicorn workers, clients must poll the worker that accepted the job.
+    """
+
+    def __init__(self, workers: int, max_active: int, retention_seconds: float):
+        self.max_active = max_active
+        self.retention_seconds = retention_seconds
+        self._workers = asyncio.Semaphore(workers)
+        self.workers = workers
+        self._jobs: OrderedDict[str, PdfJob] = OrderedDict()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = {"succeeded": 0, "failed": 0, "cancelled": 0}
+
+    def _count(self, status: JobStatus) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _prune(self) -> None:
+        """Forget finished jobs past their retention period."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def submit(self, pdf_bytes: bytes, filename: str) -> PdfJob:
+        """
+        Queue a PDF for extraction into a new session.
+
+        Raises:
+            JobCapacityError: If max_active jobs are already queued or running
+        """
+        self._prune()
+        if sum(1 for job in self._jobs.values() if not job.finished) >= self.max_active:
+            self.rejected += 1
+            raise JobCapacityError(f"Too many PDF jobs in progress (limit {self.max_active})")
+
+        job = PdfJob(
+            job_id=uuid.uuid4().hex,
+            session_id=await create_pending_session(filename),
+            filename=filename,
+            pdf_bytes=len(pdf_bytes),
+        )
+        self._jobs[job.job_id] = job
+        job._task = asyncio.create_task(self._run(job, pdf_bytes))
+        self.submitted += 1
+        logger.info("PDF job queued", extra={"job_id": job.job_id, "pdf_bytes": len(pdf_bytes)})
+        return job
+
+    def get(self, job_id: str) -> PdfJob | None:
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> PdfJob | None:
+        """
+        Cancel a queued or running job and wait until it has stopped.
+
+        Finished jobs are left as they are. The session keeps the text
+        extracted before the cancellation.
+
+        Returns:
+            The job, or None if unknown
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job._task is not None and not job._task.done():
+            job._task.cancel()
+            await asyncio.wait([job._task])
+        return job
+
+    async def _run(self, job: PdfJob, pdf_bytes: bytes) -> None:
+        # The latest session update; a newer one waits for it so they apply in order
+        session_update: asyncio.Task | None = None
+
+        def on_progress(done: int, total: int, text: str) -> None:
+            nonlocal session_update
+            job.ranges_done, job.ranges_total = done, total
+            if len(text) > len(job.text):
+                job.text = text
+                session_update = asyncio.create_task(self._update_session(job, text, session_update))
+            job._notify()
+
+        try:
+            async with self._workers:
+                job.status = "running"
+                job.started_at = time.time()
+                job._notify()
+                text = await extract_text_from_pdf(pdf_bytes, on_progress, cancel_if_abandoned=True)
+            if session_update is not None:
+                await session_update
+            if not await update_session_manual(job.session_id, text):
+                raise JobSessionExpiredError(f"Session expired before the manual was ready: {job.session_id}")
+            job.text = text
+            job.ranges_done = job.ranges_total
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            # A pending session update still runs, so the session keeps the text extracted so far
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception("PDF job failed", extra={"job_id": job.job_id})
+            job.status = "failed"
+            job.error = f"Error processing PDF: {str(e)}"
+        finally:
+            job.finished_at = time.time()
+            self.completed[job.status] += 1
+            job._notify()
+            logger.info(
+                "PDF job finished",
+                extra={
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "chars": len(job.text),
+                    "duration_ms": round((job.finished_at - job.created_at) * 1000, 1),
+                },
+            )
+
+    @staticmethod
+    async def _update_session(job: PdfJob, text: str, previous: asyncio.Task | None) -> None:
+        if previous is not None:
+            await previous
+        if not await update_session_manual(job.session_id, text):
+            logger.warning("PDF job session is gone", extra={"job_id": job.job_id, "session_id": job.session_id})
+
+    async def close(self) -> None:
+        """Cancel unfinished jobs (server shutdown)."""
+        tasks = [job._task for job in self._jobs.values() if job._task is not None and not job._task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Queue depth, capacity and outcome counters for monitoring."""
+        return {
+            "queued": self._count("queued"),
+            "running": self._count("running"),
+            "workers": self.workers,
+            "max_active": self.max_active,
+            "retained": len(self._jobs),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            **self.completed,
+        }
+
+
+# Global job manager for the PDF job API
+pdf_jobs = PdfJobManager(PDF_JOB_WORKERS, PDF_JOB_MAX_ACTIVE, PDF_JOB_RETENTION_SECONDS)
+
+
+def _job_metrics() -> list[str]:
+    return [
+        "# HELP pdf_jobs Background PDF extraction jobs by status.",
+        "# TYPE pdf_jobs gauge",
+        *(f'pdf_jobs{{status="{status}"}} {pdf_jobs._count(status)}' for status in ("queued", "running")),
+    ]
+
+
+registry.add_collector(_job_metrics)
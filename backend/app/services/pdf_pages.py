@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from io import BytesIO
+
+
+@dataclass
+class PageRange:
+    """A contiguous run of pages cut out of a PDF as a standalone document."""
+
+    first_page: int  # 1-based, inclusive
+    last_page: int
+    pdf_bytes: bytes
+
+    @property
+    def page_count(self) -> int:
+        return self.last_page - self.first_page + 1
+
+
+def split_pdf(
+    pdf_bytes: bytes, pages_per_range: int, min_pages: int = 1, first_page: int = 1
+) -> tuple[int, list[PageRange]]:
+    """
+    Split a PDF into standalone documents of up to pages_per_range pages.
+
+    CPU-bound (parses the whole file and re-serializes every range), so call
+    it from a worker thread. pypdf is imported here rather than at module
+    level to keep it out of the server's cold start.
+
+    Args:
+        pdf_bytes: The PDF file as bytes
+        pages_per_range: Maximum pages per range
+        min_pages: Documents with fewer pages are not split (an empty list is returned)
+        first_page: Page number of the document's first page, when splitting a range again
+
+    Returns:
+        Tuple of (page count, ranges in page order)
+
+    Raises:
+        pypdf.errors.PyPdfError: If the PDF can't be parsed (e.g. corrupt or encrypted)
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(BytesIO(pdf_bytes))
+    total_pages = len(reader.pages)
+    if total_pages < min_pages:
+        return total_pages, []
+
+    ranges = []
+    for start in range(0, total_pages, pages_per_range):
+        end = min(start + pages_per_range, total_pages)
+        writer = PdfWriter()
+        for index in range(start, end):
+            writer.add_page(reader.pages[index])
+        buffer = BytesIO()
+        writer.write(buffer)
+        ranges.append(PageRange(first_page + start, first_page + end - 1, buffer.getvalue()))
+    return total_pages, ranges
@@ -0,0 +1,69 @@
+import asyncio
+import importlib
+import logging
+import time
+from app.services.gemini_pdf_agent import get_pdf_agent
+from app.services.http_pools import http_pools
+from app.services.llama_assembly_agent import get_default_agent
+from app.services.transcription import get_transcriber
+
+logger = logging.getLogger(__name__)
+
+# Startup pre-warm state, for stats reporting
+prewarm_state: dict = {"started": False, "completed": False, "durations_ms": {}}
+
+
+# SDK modules imported on first use by the lazily built clients, per client
+SDK_MODULES = {
+    "llama_agent": ("openai", "pydantic_ai.models.openai", "pydantic_ai.providers.openai"),
+    "pdf_agent": ("pydantic_ai.models.google", "pydantic_ai.providers.google"),
+    "transcription_client": ("sambanova",),
+    "pdf_splitter": ("pypdf",),
+}
+
+
+def _import_sdks() -> dict[str, float]:
+    """Import the SDK modules of each client, returning the milliseconds spent per client."""
+    durations = {}
+    for name, modules in SDK_MODULES.items():
+        start = time.perf_counter()
+        for module in modules:
+            importlib.import_module(module)
+        durations[name] = round((time.perf_counter() - start) * 1000, 1)
+    return durations
+
+
+def _build_clients() -> None:
+    """Construct the model clients; cheap once their SDKs are imported."""
+    get_default_agent()
+    get_pdf_agent()
+    getattr(get_transcriber(), "client", None)
+
+
+async def prewarm_services() -> None:
+    """
+    Build the model clients and open upstream connections after startup.
+
+    The services construct their SDK clients on first use so the server starts
+    accepting requests (and answering /health) without importing them. This
+    task does that work in the background right after startup, so the first
+    real request usually finds everything ready; if it arrives earlier it just
+    builds what it needs itself.
+    """
+    prewarm_state["started"] = True
+    start = time.perf_counter()
+    try:
+        # SDK imports are CPU-bound; keep them off the event loop. The clients are
+        # built on the loop, like on first use, so the two can't race to build them.
+        prewarm_state["durations_ms"] = await asyncio.to_thread(_import_sdks)
+        _build_clients()
+        # Pre-open upstream connections so the first request doesn't pay for TLS handshakes
+        await http_pools.warm_up()
+    except Exception:
+        logger.exception("Service pre-warm failed")
+        return
+    prewarm_state["completed"] = True
+    logger.info(
+        "Services ready",
+        extra={"seconds": round(time.perf_counter() - start, 2), "durations_ms": prewarm_state["durations_ms"]},
+    )
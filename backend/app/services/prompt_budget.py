@@ -0,0 +1,194 @@
+import dataclasses
+import json
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+from pydantic_ai.messages import (
+    BinaryContent,
+    ImageUrl,
+    ModelMessage,
+    ModelRequest,
+    SystemPromptPart,
+    UserPromptPart,
+)
+from app.core.config import AGENT_CACHE_MAX_ENTRIES, PROMPT_IMAGE_TOKENS, PROMPT_MESSAGE_OVERHEAD_TOKENS
+
+# Words, numbers and single punctuation marks, roughly how BPE tokenizers split text
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Characters per token within one long word (identifiers, part numbers, URLs)
+_CHARS_PER_WORD_TOKEN = 6
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Fast local approximation of the Llama tokenizer's token count.
+
+    Common words and punctuation marks are one token each, long words are
+    split every few characters. Within ~15% of the real count for English
+    prose, which is enough for budgeting (there is no local tokenizer for
+    the hosted model).
+    """
+    return sum(1 + (len(token) - 1) // _CHARS_PER_WORD_TOKEN for token in _TOKEN_RE.findall(text))
+
+
+@lru_cache(maxsize=AGENT_CACHE_MAX_ENTRIES)
+def _estimate_system_tokens(text: str) -> int:
+    # System prompts carry the whole manual (or its table of contents) and are
+    # the same on every turn of a session, so their estimate is memoized like the agents
+    return estimate_text_tokens(text)
+
+
+def estimate_content_tokens(content: str | Sequence) -> int:
+    """Tokens of user prompt content: text plus a fixed cost per image or file."""
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    tokens = 0
+    for item in content:
+        if isinstance(item, str):
+            tokens += estimate_text_tokens(item)
+        elif isinstance(item, (ImageUrl, BinaryContent)):
+            tokens += PROMPT_IMAGE_TOKENS
+    return tokens
+
+
+def _part_tokens(part) -> int:
+    if isinstance(part, SystemPromptPart):
+        return _estimate_system_tokens(part.content)
+    if isinstance(part, UserPromptPart):
+        return estimate_content_tokens(part.content)
+    # Tool calls carry their arguments, tool returns their result
+    if hasattr(part, "model_response_str"):
+        return estimate_text_tokens(part.model_response_str())
+    if hasattr(part, "args_as_json_str"):
+        return estimate_text_tokens(part.tool_name) + estimate_text_tokens(part.args_as_json_str())
+    content = getattr(part, "content", "")
+    return estimate_text_tokens(content if isinstance(content, str) else json.dumps(content, default=str))
+
+
+def estimate_message_tokens(message: ModelMessage) -> int:
+    """Tokens of one history message, including the chat template's per-message overhead."""
+    return PROMPT_MESSAGE_OVERHEAD_TOKENS + sum(_part_tokens(part) for part in message.parts)
+
+
+def _system_parts(message: ModelMessage) -> list[SystemPromptPart]:
+    if not isinstance(message, ModelRequest):
+        return []
+    return [part for part in message.parts if isinstance(part, SystemPromptPart)]
+
+
+def _starts_turn(message: ModelMessage) -> bool:
+    """A turn starts with the user's prompt; tool returns continue the current turn."""
+    return isinstance(message, ModelRequest) and any(isinstance(part, UserPromptPart) for part in message.parts)
+
+
+def split_turns(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+    """
+    Group history into turns: a user prompt and every message up to the next one.
+
+    A turn holds the model's tool calls together with the requests carrying
+    their results, so dropping whole turns never leaves a tool call without
+    its return (or a return without its call), which the API would reject.
+    """
+    turns: list[list[ModelMessage]] = []
+    for message in messages:
+        if _starts_turn(message) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+@dataclass
+class PromptBudget:
+    """Estimated token count of each prompt component for one agent run."""
+
+    budget: int
+    system_tokens: int = 0
+    history_tokens: int = 0
+    message_tokens: int = 0
+    attachment_tokens: int = 0
+    history_messages: int = 0
+    trimmed_messages: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.history_tokens + self.message_tokens + self.attachment_tokens
+
+    def as_fields(self) -> dict:
+        """Component counts for structured log lines."""
+        return {**dataclasses.asdict(self), "total_tokens": self.total_tokens}
+
+
+def fit_history(
+    history: list[ModelMessage] | None,
+    system_prompt: str,
+    message: str,
+    attachments: int,
+    budget: int,
+    instructions: str | None = None,
+) -> tuple[list[ModelMessage] | None, PromptBudget]:
+    """
+    Window the conversation history so the whole prompt fits the token budget.
+
+    The system prompt, the new message and its attachments are always sent;
+    the remaining budget goes to the most recent whole turns of history.
+    Older turns are dropped. pydantic-ai only adds the agent's system prompt
+    to an empty history and otherwise sends the one recorded in the first
+    message, so that recorded prompt is replaced with the current one on the
+    first kept message: trimming never loses the manual, and a session whose
+    manual changed after the conversation started (a PDF job still
+    extracting it) gets the new manual.
+
+    Args:
+        history: Conversation history from the session (not modified)
+        system_prompt: The agent's current system prompt
+        message: The user's message as it will be sent
+        attachments: Number of images/files attached to the message
+        budget: Maximum prompt tokens; 0 disables trimming
+        instructions: Per-run instructions sent with the message (retrieved manual sections)
+
+    Returns:
+        Tuple of (history to send, or None when empty; the component token counts)
+    """
+    report = PromptBudget(
+        budget=budget,
+        system_tokens=_estimate_system_tokens(system_prompt),
+        message_tokens=estimate_text_tokens(message) + (estimate_text_tokens(instructions) if instructions else 0),
+        attachment_tokens=attachments * PROMPT_IMAGE_TOKENS,
+    )
+    if not history:
+        return None, report
+
+    recorded = _system_parts(history[0])
+    turns = split_turns(history)
+    turn_tokens = [sum(estimate_message_tokens(m) for m in turn) for turn in turns]
+    # The recorded prompt is replaced, not sent in addition
+    turn_tokens[0] -= sum(_estimate_system_tokens(part.content) for part in recorded)
+
+    kept = len(turns)
+    if budget:
+        available = budget - report.system_tokens - report.message_tokens - report.attachment_tokens
+        kept = 0
+        # Newest turns first; stop at the first one that doesn't fit so the window stays contiguous
+        for tokens in reversed(turn_tokens):
+            if tokens > available:
+                break
+            available -= tokens
+            kept += 1
+
+    report.history_tokens = sum(turn_tokens[len(turns) - kept :])
+    kept_messages = [m for turn in turns[len(turns) - kept :] for m in turn]
+    report.history_messages = len(kept_messages)
+    report.trimmed_messages = len(history) - len(kept_messages)
+    if not kept_messages:
+        # Nothing fits: the agent starts over from its own system prompt
+        return None, report
+    if not report.trimmed_messages and [part.content for part in recorded] == [system_prompt]:
+        return history, report
+
+    first = kept_messages[0]
+    if isinstance(first, ModelRequest):
+        parts = [part for part in first.parts if not isinstance(part, SystemPromptPart)]
+        kept_messages[0] = dataclasses.replace(first, parts=[SystemPromptPart(system_prompt), *parts])
+    return kept_messages, report
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from app.core.config import (
+    RECORDINGS_DIR,
+    RECORDINGS_MAX_AGE_HOURS,
+    RECORDINGS_MAX_BYTES,
+    RECORDINGS_QUEUE_MAX_BYTES,
+    RECORDINGS_RETENTION_INTERVAL_SECONDS,
+    settings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingArchiver:
+    """
+    Background writer that archives uploaded audio off the request path.
+
+    Handlers call submit(), which only enqueues the bytes; a single background
+    task writes them to disk. The queue is bounded by the audio bytes it holds
+    (not by count, since one upload can be tens of MB): a recording that
+    doesn't fit is dropped (and counted) rather than slowing requests down.
+
+    Files are named by content hash, so names never collide and re-uploads of
+    the same audio are stored once. Retention deletes files older than max_age
+    and then the oldest files until the directory fits in max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        enabled: bool,
+        sample_rate: float,
+        queue_max_bytes: int,
+        max_bytes: int,
+        max_age_seconds: float,
+        retention_interval_seconds: float,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.retention_interval_seconds = retention_interval_seconds
+        self.queue_max_bytes = queue_max_bytes
+        self._queue: asyncio.Queue[tuple[bytes, str, str]] = asyncio.Queue()
+        # Audio bytes queued or being written
+        self._queued_bytes = 0
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.deduplicated = 0
+        self.errors = 0
+        self.removed = 0
+        self.files = 0
+        self.bytes = 0
+
+    def submit(self, contents: bytes, filename: str | None, prefix: str = "recording") -> bool:
+        """
+        Queue a recording for archiving without waiting for disk IO.
+
+        Args:
+            contents: Audio file bytes
+            filename: Original upload filename (only its extension is kept)
+            prefix: File name prefix identifying the route ("recording", "recording_multimodal")
+
+        Returns:
+            True if queued, False if archiving is off, sampled out or the queue is full
+        """
+        if not self.enabled:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        if self._queued_bytes + len(contents) > self.queue_max_bytes:
+            self.dropped += 1
+            return False
+        extension = Path(filename).suffix if filename else ".mp3"
+        self._queue.put_nowait((contents, prefix, extension or ".mp3"))
+        self._queued_bytes += len(contents)
+        self.submitted += 1
+        return True
+
+    def _write(self, contents: bytes, prefix: str, extension: str) -> Path:
+        """Atomically write one recording under its content-addressed name."""
+        digest = hashlib.sha256(contents).hexdigest()[:32]
+        path = self.directory / f"{prefix}_{digest}{extension}"
+        if path.exists():
+            # Same audio already archived; refresh its age instead of writing a copy
+            os.utime(path)
+            self.deduplicated += 1
+            return path
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contents)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.written += 1
+        self.files += 1
+        self.bytes += len(contents)
+        return path
+
+    def enforce_retention(self) -> int:
+        """
+        Delete recordings older than max_age, then the oldest until under max_bytes.
+
+        Returns:
+            Number of files removed
+        """
+        entries = []
+        for path in self.directory.glob("*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        cutoff = time.time() - self.max_age_seconds
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        self.removed += removed
+        self.files = len(entries) - removed
+        self.bytes = total
+        return removed
+
+    async def run(self) -> None:
+        """Write queued recordings and periodically apply retention until cancelled."""
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self.enforce_retention)
+        last_retention = time.monotonic()
+        while True:
+            try:
+                contents, prefix, extension = await asyncio.wait_for(
+                    self._queue.get(), timeout=self.retention_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            else:
+                try:
+                    path = await asyncio.to_thread(self._write, contents, prefix, extension)
+                    logger.debug("Archived recording", extra={"bytes": len(contents), "path": str(path)})
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Failed to archive recording")
+                finally:
+                    self._queued_bytes -= len(contents)
+                    self._queue.task_done()
+
+            if (
+                self.bytes > self.max_bytes
+                or time.monotonic() - last_retention >= self.retention_interval_seconds
+            ):
+                removed = await asyncio.to_thread(self.enforce_retention)
+                last_retention = time.monotonic()
+                if removed:
+                    logger.info("Retention removed recordings", extra={"removed": removed})
+
+    async def flush(self, timeout: float) -> None:
+        """Wait (up to timeout seconds) for queued recordings to be written, e.g. on shutdown."""
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+
+    def stats(self) -> dict:
+        """Queue depth, write/drop counters and archive size for monitoring."""
+        return {
+            "enabled": self.enabled,
+            "directory": str(self.directory),
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            "queue_bytes": self._queued_bytes,
+            "queue_max_bytes": self.queue_max_bytes,
+            "submitted": self.submitted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "written": self.written,
+            "deduplicated": self.deduplicated,
+            "errors": self.errors,
+            "removed": self.removed,
+            "files": self.files,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Global recording archiver instance
+recording_archiver = RecordingArchiver(
+    RECORDINGS_DIR,
+    enabled=settings.recording_archive_enabled,
+    sample_rate=settings.recording_sample_rate,
+    queue_max_bytes=RECORDINGS_QUEUE_MAX_BYTES,
+    max_bytes=RECORDINGS_MAX_BYTES,
+    max_age_seconds=RECORDINGS_MAX_AGE_HOURS * 3600,
+    retention_interval_seconds=RECORDINGS_RETENTION_INTERVAL_SECONDS,
+)
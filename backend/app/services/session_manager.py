@@ -1,29 +1,60 @@
+import asyncio
+import dataclasses
+import logging
 import uuid
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from app.core.config import MAX_SESSION_AGE_HOURS, MAX_SESSIONS
-
-
-@dataclass
-class ManualSession:
-    """Session data for storing uploaded manual text and conversation history."""
-
-    session_id: str
-    manual_text: str
-    filename: str
-    created_at: datetime
-    conversation_history: list[dict] = field(default_factory=list)
+from datetime import datetime
+from pydantic_ai.messages import ModelMessage, ModelRequest
+from app.core.config import (
+    MAX_SESSION_AGE_HOURS,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_COUNT,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+    settings,
+)
+from app.services.agent_cache import manual_content_hash
+from app.services.manual_index import ManualIndex, build_manual_index
+from app.services.metrics import registry, span
+from app.services.session_store import (
+    ManualSession,
+    MemorySessionStore,
+    SessionStore,
+    SqliteSessionStore,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _create_store() -> SessionStore:
+    """Build the session store selected by SESSION_BACKEND."""
+    ttl_seconds = MAX_SESSION_AGE_HOURS * 3600
+    if settings.session_backend == "sqlite":
+        return SqliteSessionStore(
+            settings.session_db_path,
+            ttl_seconds=ttl_seconds,
+            max_entries=SESSION_MAX_COUNT,
+            max_bytes=SESSION_MAX_BYTES,
+            build_index=settings.manual_context_mode == "retrieval",
+        )
+    return MemorySessionStore(
+        ttl_seconds=ttl_seconds,
+        max_entries=SESSION_MAX_COUNT,
+        max_bytes=SESSION_MAX_BYTES,
+    )
 
 
-# In-memory storage for manual sessions
-# Key: session_id, Value: ManualSession
-_manual_sessions: dict[str, ManualSession] = {}
+# Storage for manual sessions
+# "memory" keeps sessions in this process; "sqlite" shares them between worker processes.
+# Store methods block, so the functions below call them through _store.run().
+_store: SessionStore = _create_store()
 
 
-def create_session(manual_text: str, filename: str) -> str:
+async def create_session(manual_text: str, filename: str) -> str:
     """
     Create a new session to store manual text.
 
+    In retrieval mode the manual's index is built in a worker thread, so
+    large manuals don't stall the event loop.
+
     Args:
         manual_text: The extracted manual text
         filename: Original PDF filename
@@ -31,14 +62,11 @@ def create_session(manual_text: str, filename: str) -> str:
     Returns:
         session_id: Unique identifier for this session
     """
-    # Clean up expired sessions before creating new one
-    cleanup_expired_sessions()
-
-    # If we're at max capacity, remove oldest session
-    if len(_manual_sessions) >= MAX_SESSIONS:
-        oldest_id = min(_manual_sessions.keys(), key=lambda k: _manual_sessions[k].created_at)
-        del _manual_sessions[oldest_id]
-
+    manual_index = (
+        await asyncio.to_thread(build_manual_index, manual_text)
+        if settings.manual_context_mode == "retrieval"
+        else None
+    )
     # Create new session
     session_id = str(uuid.uuid4())
     session = ManualSession(
@@ -46,13 +74,83 @@ def create_session(manual_text: str, filename: str) -> str:
         manual_text=manual_text,
         filename=filename,
         created_at=datetime.now(),
+        manual_hash=manual_content_hash(manual_text),
+        manual_index=manual_index,
     )
 
-    _manual_sessions[session_id] = session
+    # Storing may evict the least recently used sessions if over capacity
+    await _store.run(_store.create, session)
     return session_id
 
 
-def get_manual_text(session_id: str) -> str | None:
+async def create_pending_session(filename: str) -> str:
+    """
+    Create a session whose manual is still being extracted (see update_session_manual).
+
+    Until the first text arrives the manual is empty, under a hash of its
+    own: pending sessions must not share answer cache entries or manual
+    refcounts with each other, as every empty manual would.
+
+    Args:
+        filename: Original PDF filename
+
+    Returns:
+        session_id: Unique identifier for this session
+    """
+    session_id = str(uuid.uuid4())
+    await _store.run(
+        _store.create,
+        ManualSession(
+            session_id=session_id,
+            manual_text="",
+            filename=filename,
+            created_at=datetime.now(),
+            manual_hash=f"pending:{session_id}",
+        ),
+    )
+    return session_id
+
+
+async def update_session_manual(session_id: str, manual_text: str) -> bool:
+    """
+    Replace the manual of an existing session, e.g. with the text extracted so far by a PDF job.
+
+    The retrieval index is built in a worker thread, so growing manuals can be
+    updated several times without stalling the event loop.
+
+    Args:
+        session_id: The session identifier
+        manual_text: The (possibly partial) manual text
+
+    Returns:
+        True if update successful, False if session not found
+    """
+    manual_index = (
+        await asyncio.to_thread(build_manual_index, manual_text)
+        if settings.manual_context_mode == "retrieval"
+        else None
+    )
+    with span("session_update", manual_chars=len(manual_text)):
+        return await _store.run(
+            _store.update_manual, session_id, manual_text, manual_content_hash(manual_text), manual_index
+        )
+
+
+async def get_session(session_id: str) -> ManualSession | None:
+    """
+    Retrieve a full session (manual, index and history) in a single lookup.
+
+    Args:
+        session_id: The session identifier
+
+    Returns:
+        ManualSession if session exists and is valid, None otherwise
+    """
+    with span("session_load"):
+        return await _store.run(_store.get, session_id)
+
+
+async def get_manual_text(session_id: str) -> str | None:
     """
     Retrieve manual text for a given session ID.
 
@@ -62,41 +160,56 @@ def get_manual_text(session_id: str) -> str | None:
     Returns:
         Manual text if session exists and is valid, None otherwise
     """
-    session = _manual_sessions.get(session_id)
+    session = await _store.run(_store.get, session_id)
+    return session.manual_text if session else None
 
-    if not session:
-        return None
 
-    # Check if session has expired
-    age = datetime.now() - session.created_at
-    if age > timedelta(hours=MAX_SESSION_AGE_HOURS):
-        # Session expired, remove it
-        del _manual_sessions[session_id]
-        return None
+async def get_manual_index(session_id: str) -> ManualIndex | None:
+    """
+    Retrieve the manual section index for a given session ID.
 
-    return session.manual_text
+    Args:
+        session_id: The session identifier
 
+    Returns:
+        ManualIndex if the session exists and retrieval mode is enabled, None otherwise
+    """
+    session = await _store.run(_store.get, session_id)
+    return session.manual_index if session else None
 
-def cleanup_expired_sessions():
-    """Remove all expired sessions from storage."""
-    now = datetime.now()
-    expired_ids = [
-        sid
-        for sid, session in _manual_sessions.items()
-        if now - session.created_at > timedelta(hours=MAX_SESSION_AGE_HOURS)
-    ]
 
-    for sid in expired_ids:
-        del _manual_sessions[sid]
+async def cleanup_expired_sessions() -> int:
+    """
+    Remove all expired sessions from storage.
 
+    Returns:
+        Number of sessions removed
+    """
+    return await _store.run(_store.sweep)
 
-def get_session_count() -> int:
+
+async def get_session_count() -> int:
     """Get the current number of active sessions."""
-    cleanup_expired_sessions()
-    return len(_manual_sessions)
+    return await _store.run(_store.count)
+
+
+async def get_session_stats() -> dict:
+    """Session store size, capacity and eviction counters."""
+    return await _store.run(_store.stats)
+
+
+def _session_metrics() -> list[str]:
+    return [
+        "# HELP sessions_active Live manual sessions.",
+        "# TYPE sessions_active gauge",
+        f"sessions_active {_store.cached_count()}",
+    ]
 
 
-def get_conversation_history(session_id: str) -> list[dict] | None:
+registry.add_collector(_session_metrics)
+
+
+async def get_conversation_history(session_id: str) -> list[ModelMessage] | None:
     """
     Retrieve conversation history for a given session ID.
 
@@ -104,45 +217,42 @@ def get_conversation_history(session_id: str) -> list[dict] | None:
         session_id: The session identifier
 
     Returns:
-        Conversation history (list of serialized messages) if session exists and is valid, None otherwise
+        Conversation history (list of ModelMessage objects) if session exists and is valid, None otherwise
     """
-    session = _manual_sessions.get(session_id)
-
-    if not session:
-        return None
-
-    # Check if session has expired
-    age = datetime.now() - session.created_at
-    if age > timedelta(hours=MAX_SESSION_AGE_HOURS):
-        # Session expired, remove it
-        del _manual_sessions[session_id]
-        return None
+    session = await _store.run(_store.get, session_id)
+    return session.conversation_history if session else None
 
-    return session.conversation_history
 
-
-def update_conversation_history(session_id: str, messages: list[dict]) -> bool:
+async def append_conversation_messages(session_id: str, messages: list[ModelMessage]) -> bool:
     """
-    Update the conversation history for a given session.
+    Append one turn's messages to the conversation history for a given session.
+
+    Pass result.new_messages() from the agent run; the existing history is
+    neither re-serialized nor re-validated. Per-run instructions (the manual
+    sections retrieved for the question) are dropped: they only applied to
+    that run and would otherwise be stored with every turn.
 
     Args:
         session_id: The session identifier
-        messages: List of serialized messages to store as conversation history
+        messages: New messages produced by the latest agent run
 
     Returns:
         True if update successful, False if session not found
     """
-    session = _manual_sessions.get(session_id)
-
-    if not session:
-        return False
+    messages = [
+        dataclasses.replace(message, instructions=None)
+        if isinstance(message, ModelRequest) and message.instructions
+        else message
+        for message in messages
+    ]
+    with span("session_update", messages=len(messages)):
+        return await _store.run(_store.append_history, session_id, messages)
 
-    # Check if session has expired
-    age = datetime.now() - session.created_at
-    if age > timedelta(hours=MAX_SESSION_AGE_HOURS):
-        # Session expired, remove it
-        del _manual_sessions[session_id]
-        return False
 
-    session.conversation_history = messages
-    return True
+async def run_session_sweeper(interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS):
+    """Background task that periodically drops expired sessions."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        removed = await cleanup_expired_sessions()
+        if removed:
+            logger.info("Swept expired sessions", extra={"removed": removed})
@@ -0,0 +1,509 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+from app.services.agent_cache import agent_cache
+from app.services.expiring_lru import ExpiringLRU
+from app.services.manual_index import ManualIndex, build_manual_index
+from app.services.metrics import span
+
+
+@dataclass
+class ManualSession:
+    """Session data for storing uploaded manual text and conversation history."""
+
+    session_id: str
+    manual_text: str
+    filename: str
+    created_at: datetime
+    manual_hash: str = ""
+    manual_index: ManualIndex | None = None
+    conversation_history: list[ModelMessage] = field(default_factory=list)
+    history_bytes: int = 0
+
+
+class SessionStore(ABC):
+    """
+    Storage backend behind the session_manager functions.
+
+    Implementations expire sessions ttl_seconds after creation and evict the
+    least recently used sessions once max_entries or max_bytes is exceeded.
+    The methods are blocking; code on the event loop calls them through run().
+    """
+
+    async def run(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Call a store method from the event loop. Process-local stores answer inline."""
+        return method(*args)
+
+    def cached_count(self) -> int:
+        """Number of live sessions, cheap enough to call from the event loop."""
+        return self.count()
+
+    @abstractmethod
+    def create(self, session: ManualSession) -> None:
+        """Store a new session, evicting old sessions if over capacity."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> ManualSession | None:
+        """Return a live session, or None if missing or expired."""
+
+    @abstractmethod
+    def append_history(self, session_id: str, messages: list[ModelMessage]) -> bool:
+        """Append a turn's new messages to a session. Returns False if the session is gone."""
+
+    @abstractmethod
+    def update_manual(
+        self, session_id: str, manual_text: str, manual_hash: str, manual_index: ManualIndex | None
+    ) -> bool:
+        """Replace a session's manual (e.g. while a PDF job extracts it). Returns False if the session is gone."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired sessions and return how many were removed."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live sessions."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Size, capacity and eviction counters for monitoring."""
+
+
+def _estimate_messages_bytes(messages: list[ModelMessage]) -> int:
+    """Cheap size estimate of messages from their text content, without serializing them."""
+    total = 0
+    for message in messages:
+        for part in message.parts:
+            content = getattr(part, "content", None)
+            if isinstance(content, str):
+                total += len(content)
+            elif isinstance(content, list):
+                # User prompts with attachments: count text and image URLs, flat cost otherwise
+                for item in content:
+                    total += len(item) if isinstance(item, str) else len(getattr(item, "url", "")) or 1024
+            else:
+                total += 256
+    return total
+
+
+def _estimate_session_bytes(session: ManualSession) -> int:
+    """Approximate memory held by a session (manual text, its index and history)."""
+    manual_bytes = len(session.manual_text)
+    # The BM25 index holds roughly another copy of the manual plus term counts
+    index_bytes = 2 * manual_bytes if session.manual_index is not None else 0
+    return manual_bytes + index_bytes + session.history_bytes
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store. Fastest option, but sessions are only visible to one worker."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        # Number of live sessions per manual hash, so cached agents can be released in O(1)
+        self._manual_refcounts: Counter[str] = Counter()
+        self._sessions: ExpiringLRU[ManualSession] = ExpiringLRU(
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=_estimate_session_bytes,
+            on_evict=self._release_manual,
+        )
+
+    def _release_manual(self, session_id: str, session: ManualSession) -> None:
+        """Release the cached agent once the last session using a manual is gone."""
+        self._manual_refcounts[session.manual_hash] -= 1
+        if self._manual_refcounts[session.manual_hash] <= 0:
+            del self._manual_refcounts[session.manual_hash]
+            agent_cache.discard(session.manual_hash)
+
+    def create(self, session: ManualSession) -> None:
+        self._manual_refcounts[session.manual_hash] += 1
+        self._sessions.set(session.session_id, session)
+
+    def get(self, session_id: str) -> ManualSession | None:
+        return self._sessions.get(session_id)
+
+    def append_history(self, session_id: str, messages: list[ModelMessage]) -> bool:
+        session = self._sessions.get(session_id)
+        if not session:
+            return False
+        # Messages are kept as objects; nothing is re-serialized or re-validated per turn
+        session.conversation_history.extend(messages)
+        session.history_bytes += _estimate_messages_bytes(messages)
+        self._sessions.resize(session_id)
+        return True
+
+    def update_manual(
+        self, session_id: str, manual_text: str, manual_hash: str, manual_index: ManualIndex | None
+    ) -> bool:
+        session = self._sessions.get(session_id)
+        if not session:
+            return False
+        self._manual_refcounts[manual_hash] += 1
+        self._release_manual(session_id, session)
+        session.manual_text = manual_text
+        session.manual_hash = manual_hash
+        session.manual_index = manual_index
+        self._sessions.resize(session_id)
+        return True
+
+    def sweep(self) -> int:
+        return self._sessions.sweep()
+
+    def count(self) -> int:
+        self.sweep()
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        self.sweep()
+        return {"backend": "memory", **self._sessions.stats()}
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite (WAL mode) store shared by every worker process on the same machine.
+
+    Manual text is stored once per manual hash and zlib-compressed. History is
+    append-only: each message is serialized once, when its turn is persisted,
+    into its own compressed row. Decoded manuals (with their indexes) and
+    decoded histories are cached per process, so a read only decodes rows
+    written since this process last saw the session. Recency for LRU eviction
+    is updated on create and on every history append.
+
+    Every call from the event loop runs on one dedicated thread (see run()), so
+    waiting for another worker's write lock, or rebuilding a manual's index on
+    a cache miss, never stalls the loop.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS manuals (
+            manual_hash TEXT PRIMARY KEY,
+            manual_text BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            manual_hash TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            history_bytes INTEGER NOT NULL DEFAULT 0,
+            manual_bytes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+        CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+        CREATE INDEX IF NOT EXISTS sessions_manual_hash ON sessions (manual_hash);
+        CREATE TABLE IF NOT EXISTS session_messages (
+            session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            message BLOB NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        build_index: bool,
+        manual_cache_size: int = 32,
+        history_cache_size: int = 1024,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.build_index = build_index
+        self.expirations = 0
+        self.evictions = 0
+        self._manual_cache_size = manual_cache_size
+        # manual_hash -> (manual_text, manual_index), process-local
+        self._manuals: OrderedDict[str, tuple[str, ManualIndex | None]] = OrderedDict()
+        # session_id -> decoded messages, process-local
+        self._history_cache_size = history_cache_size
+        self._histories: OrderedDict[str, list[ModelMessage]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Manuals dropped by the store thread; their cached agents are released on the loop
+        self._released_manuals: list[str] = []
+        self._live_sessions = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            db_path, timeout=10.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self._SCHEMA)
+
+    async def run(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Call a store method on the store thread, then release agents of manuals it dropped."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+        finally:
+            with self._lock:
+                released, self._released_manuals = self._released_manuals, []
+            for manual_hash in released:
+                agent_cache.discard(manual_hash)
+
+    def cached_count(self) -> int:
+        """Live sessions as of the last sweep, count() or stats() call."""
+        return self._live_sessions
+
+    @staticmethod
+    def _compress(text: str) -> bytes:
+        return zlib.compress(text.encode("utf-8"), 6)
+
+    @staticmethod
+    def _decompress(blob: bytes | None) -> str:
+        return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+    def _load_history(self, session_id: str) -> list[ModelMessage]:
+        """Return the session's messages, decoding only rows not yet cached in this process."""
+        history = self._histories.pop(session_id, None) or []
+        rows = self._conn.execute(
+            "SELECT message FROM session_messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+            (session_id, len(history)),
+        ).fetchall()
+        with span("history_deserialize", messages=len(rows)):
+            for (blob,) in rows:
+                history.extend(ModelMessagesTypeAdapter.validate_json(zlib.decompress(blob)))
+        self._histories[session_id] = history
+        while len(self._histories) > self._history_cache_size:
+            self._histories.popitem(last=False)
+        return history
+
+    def _load_manual(self, manual_hash: str) -> tuple[str, ManualIndex | None] | None:
+        cached = self._manuals.get(manual_hash)
+        if cached is not None:
+            self._manuals.move_to_end(manual_hash)
+            return cached
+        row = self._conn.execute(
+            "SELECT manual_text FROM manuals WHERE manual_hash = ?", (manual_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        manual_text = self._decompress(row[0])
+        manual_index = build_manual_index(manual_text) if self.build_index else None
+        return self._remember_manual(manual_hash, manual_text, manual_index)
+
+    def _remember_manual(
+        self, manual_hash: str, manual_text: str, manual_index: ManualIndex | None
+    ) -> tuple[str, ManualIndex | None]:
+        self._manuals[manual_hash] = (manual_text, manual_index)
+        self._manuals.move_to_end(manual_hash)
+        while len(self._manuals) > self._manual_cache_size:
+            self._manuals.popitem(last=False)
+        return manual_text, manual_index
+
+    def _delete_orphan_manuals(self) -> None:
+        """Drop manuals no session references any more, and their cached agents."""
+        orphans = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT manual_hash FROM manuals WHERE manual_hash NOT IN "
+                "(SELECT DISTINCT manual_hash FROM sessions)"
+            )
+        ]
+        for manual_hash in orphans:
+            self._conn.execute("DELETE FROM manuals WHERE manual_hash = ?", (manual_hash,))
+            self._manuals.pop(manual_hash, None)
+            self._released_manuals.append(manual_hash)
+
+    def _evict_over_capacity(self) -> int:
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(manual_bytes + history_bytes), 0) FROM sessions"
+        ).fetchone()
+        evicted = 0
+        while count > self.max_entries or total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT session_id, manual_bytes + history_bytes FROM sessions "
+                "ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (row[0],))
+            count -= 1
+            total_bytes -= row[1]
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def create(self, session: ManualSession) -> None:
+        now = time.time()
+        manual_bytes = _estimate_session_bytes(session) - session.history_bytes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO manuals (manual_hash, manual_text) VALUES (?, ?)",
+                    (session.manual_hash, self._compress(session.manual_text)),
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, manual_hash, filename, created_at, "
+                    "expires_at, last_access, manual_bytes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        session.session_id,
+                        session.manual_hash,
+                        session.filename,
+                        session.created_at.timestamp(),
+                        now + self.ttl_seconds,
+                        now,
+                        manual_bytes,
+                    ),
+                )
+                if self._evict_over_capacity():
+                    self._delete_orphan_manuals()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._remember_manual(session.manual_hash, session.manual_text, session.manual_index)
+
+    def get(self, session_id: str) -> ManualSession | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT manual_hash, filename, created_at, expires_at, history_bytes "
+                "FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None or row[3] <= time.time():
+                self._histories.pop(session_id, None)
+                return None
+            manual_hash, filename, created_at, _, history_bytes = row
+            manual = self._load_manual(manual_hash)
+            if manual is None:
+                return None
+            history = self._load_history(session_id)
+        manual_text, manual_index = manual
+        return ManualSession(
+            session_id=session_id,
+            manual_text=manual_text,
+            filename=filename,
+            created_at=datetime.fromtimestamp(created_at),
+            manual_hash=manual_hash,
+            manual_index=manual_index,
+            conversation_history=history,
+            history_bytes=history_bytes,
+        )
+
+    def append_history(self, session_id: str, messages: list[ModelMessage]) -> bool:
+        # Serialize only this turn's messages, outside the lock
+        with span("history_serialize", messages=len(messages)):
+            blobs = [
+                zlib.compress(ModelMessagesTypeAdapter.dump_json([message]), 6) for message in messages
+            ]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET history_bytes = history_bytes + ?, last_access = ? "
+                    "WHERE session_id = ? AND expires_at > ?",
+                    (sum(len(blob) for blob in blobs), now, session_id, now),
+                )
+                if cursor.rowcount == 0:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                next_seq = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq) + 1, 0) FROM session_messages WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()[0]
+                self._conn.executemany(
+                    "INSERT INTO session_messages (session_id, seq, message) VALUES (?, ?, ?)",
+                    [(session_id, next_seq + i, blob) for i, blob in enumerate(blobs)],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return True
+
+    def update_manual(
+        self, session_id: str, manual_text: str, manual_hash: str, manual_index: ManualIndex | None
+    ) -> bool:
+        compressed = self._compress(manual_text)
+        manual_bytes = len(manual_text) * (3 if manual_index is not None else 1)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO manuals (manual_hash, manual_text) VALUES (?, ?)",
+                    (manual_hash, compressed),
+                )
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET manual_hash = ?, manual_bytes = ?, last_access = ? "
+                    "WHERE session_id = ? AND expires_at > ?",
+                    (manual_hash, manual_bytes, now, session_id, now),
+                )
+                if cursor.rowcount == 0:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._evict_over_capacity()
+                self._delete_orphan_manuals()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._remember_manual(manual_hash, manual_text, manual_index)
+            return True
+
+    def sweep(self) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)
+                )
+                removed = cursor.rowcount
+                if removed:
+                    self._delete_orphan_manuals()
+                self._live_sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.expirations += removed
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            self._live_sessions = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+            return self._live_sessions
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(manual_bytes + history_bytes), 0) "
+                "FROM sessions WHERE expires_at > ?",
+                (time.time(),),
+            ).fetchone()
+            self._live_sessions = count
+        return {
+            "backend": "sqlite",
+            "path": str(self.db_path),
+            "entries": count,
+            "max_entries": self.max_entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "cached_manuals": len(self._manuals),
+        }
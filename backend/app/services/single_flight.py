@@ -0,0 +1,86 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesce concurrent identical calls into one in-flight task.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task instead of starting their own, and all
+    get its result (or exception). Once it finishes the key is released, so
+    later calls start fresh work (results worth keeping belong in a cache).
+
+    Callers await the task through asyncio.shield: a caller that is cancelled
+    (client disconnect, a failed sibling stage) stops waiting without
+    cancelling the shared call for the others. The work then runs to
+    completion even if every caller has left, so e.g. an extracted PDF still
+    reaches the disk cache for the client's retry, unless the last caller to
+    leave asked for the work to stop (cancel_if_abandoned, e.g. a cancelled job).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: dict[str, asyncio.Task[T]] = {}
+        # Callers currently awaiting each task
+        self._waiters: dict[asyncio.Task[T], int] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def _release(self, key: str, task: asyncio.Task[T]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        self._waiters.pop(task, None)
+        # Mark the exception as retrieved in case every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]], cancel_if_abandoned: bool = False) -> T:
+        """
+        Run func() for key, or join the call already in flight for it.
+
+        Args:
+            key: Identity of the work (e.g. a content hash); equal keys must mean equal results
+            func: Coroutine function doing the work
+            cancel_if_abandoned: If this caller is cancelled while nobody else is
+                waiting, cancel the work instead of letting it finish
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self.abandoned += 1
+                if cancel_if_abandoned and self._waiters.get(task) == 1:
+                    task.cancel()
+            raise
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    def stats(self) -> dict:
+        """Executed vs coalesced call counters for monitoring."""
+        calls = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._tasks),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            # Callers that stopped waiting (e.g. disconnected) while the shared call kept running
+            "abandoned": self.abandoned,
+            "coalesced_rate": self.coalesced / calls if calls else 0.0,
+        }
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class StageGraph:
+    """
+    Small dependency graph of async request stages.
+
+    Each stage starts as soon as the stages it depends on have finished, so
+    independent work (saving a recording, preprocessing images, loading the
+    session) overlaps with slow work like transcription instead of waiting
+    behind it. Per-stage durations are recorded for the Server-Timing header.
+
+    Usage:
+        graph = StageGraph()
+        graph.add("transcribe", transcribe)
+        graph.add("session", load_session)
+        graph.add("agent", run_agent, after=("transcribe", "session"))
+        results = await graph.run()
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._started_at = time.perf_counter()
+        # Stage name -> duration in milliseconds, excluding time spent waiting on dependencies
+        self.timings: dict[str, float] = {}
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], after: tuple[str, ...] = ()) -> None:
+        """
+        Schedule a stage.
+
+        Args:
+            name: Stage name, used for dependencies and in Server-Timing
+            func: Async function called with the results of the `after` stages, in order
+            after: Names of previously added stages this one depends on
+        """
+        dependencies = [self._tasks[dependency] for dependency in after]
+        self._tasks[name] = asyncio.create_task(self._run_stage(name, func, dependencies))
+
+    async def _run_stage(self, name: str, func: Callable[..., Awaitable[Any]], dependencies: list[asyncio.Task]):
+        args = [await dependency for dependency in dependencies]
+        start = time.perf_counter()
+        try:
+            return await func(*args)
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    async def result(self, name: str) -> Any:
+        """Wait for one stage and return its result."""
+        return await self._tasks[name]
+
+    async def run(self) -> dict[str, Any]:
+        """
+        Wait for every stage.
+
+        If any stage fails, the stages still running are cancelled and the
+        first error is raised, so e.g. a missing session aborts transcription.
+
+        Returns:
+            Stage name -> result
+        """
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            await self.cancel()
+            raise
+        return {name: task.result() for name, task in self._tasks.items()}
+
+    async def cancel(self) -> None:
+        """Cancel unfinished stages and wait for them to unwind."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def server_timing(self, extra: dict[str, float] | None = None) -> str:
+        """
+        Format stage durations as a Server-Timing header value, with the elapsed total.
+
+        Args:
+            extra: Additional metric name -> milliseconds measured outside the graph
+        """
+        timings = {**self.timings, **(extra or {})}
+        timings["total"] = (time.perf_counter() - self._started_at) * 1000
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
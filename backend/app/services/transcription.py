@@ -1,13 +1,63 @@
-from sambanova import SambaNova
-from app.core.config import settings
+import asyncio
+import hashlib
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from app.core.config import (
+    TRANSCRIPTION_MAX_CONCURRENCY,
+    TRANSCRIPTION_TIMEOUT_SECONDS,
+    settings,
+)
+from app.services.http_pools import http_pools
+from app.services.metrics import span
+from app.services.single_flight import SingleFlight
+
+
+class TranscriptionTimeoutError(Exception):
+    """Raised when a transcription does not finish within the configured timeout."""
 
 
 class TranscriptionService:
-    def __init__(self):
-        self.client = SambaNova(
-            api_key=settings.sambanova_api_key,
-            base_url=settings.sambanova_base_url,
+    def __init__(
+        self,
+        max_concurrency: int = TRANSCRIPTION_MAX_CONCURRENCY,
+        timeout_seconds: float = TRANSCRIPTION_TIMEOUT_SECONDS,
+    ):
+        self._client = None
+        # Worker threads may build the client concurrently on first use
+        self._client_lock = threading.Lock()
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        # The SambaNova client is synchronous, so calls run in their own pool
+        # instead of the event loop (or the default executor shared with other work)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="transcription"
         )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        # Outcomes of transcriptions that got a slot; callers cancelled mid-call count in none
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    @property
+    def client(self):
+        """SambaNova SDK client, built on first use to keep the SDK import out of cold start."""
+        with self._client_lock:
+            if self._client is None:
+                from sambanova import SambaNova
+
+                self._client = SambaNova(
+                    api_key=settings.sambanova_api_key,
+                    base_url=settings.sambanova_base_url,
+                    timeout=self.timeout_seconds,
+                    http_client=http_pools.sambanova_sync,
+                    # Rate-limit retries are handled by the upstream governor in the pool's transport
+                    max_retries=0,
+                )
+            return self._client
 
     def transcribe(self, audio_path: str) -> str:
         """
@@ -32,6 +82,8 @@ class TranscriptionService:
         """
         Transcribe audio from bytes using SambaNova's Whisper-Large-v3 model.
 
+        Blocking; async handlers should use transcribe_async instead.
+
         Args:
             audio_bytes: Audio file bytes
             filename: Original filename for the audio
@@ -39,8 +91,6 @@ class TranscriptionService:
         Returns:
             Transcribed text
         """
-        import io
-
         audio_file = io.BytesIO(audio_bytes)
         audio_file.name = filename
 
@@ -52,5 +102,134 @@ class TranscriptionService:
         )
         return resp
 
+    async def transcribe_async(self, audio_bytes: bytes, filename: str) -> str:
+        """
+        Transcribe audio bytes without blocking the event loop.
+
+        At most max_concurrency transcriptions run at once; further calls wait
+        for a free slot. Each call is bounded by timeout_seconds once it starts.
+        The SDK call can't be interrupted, so a call that times out (or whose
+        caller goes away) keeps its slot until its worker thread is free again;
+        otherwise the next call would get a slot but wait in the executor queue,
+        on its own timeout.
+
+        Args:
+            audio_bytes: Audio file bytes
+            filename: Original filename for the audio
+
+        Returns:
+            Transcribed text
+
+        Raises:
+            TranscriptionTimeoutError: If the upstream call exceeds the timeout
+        """
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        job = self._executor.submit(self.transcribe_from_bytes, audio_bytes, filename)
+        try:
+            text = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise TranscriptionTimeoutError(
+                f"Transcription timed out after {self.timeout_seconds:.0f}s"
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._release_when_done(job)
+        self.completed += 1
+        return text
+
+    def _release_when_done(self, job: Future) -> None:
+        """Free the job's slot now if it has finished, otherwise once its thread returns."""
+        if job.done():
+            self._release_slot()
+            return
+        loop = asyncio.get_running_loop()
+
+        def release(_: Future) -> None:
+            # The loop may be gone by the time an abandoned call returns
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(self._release_slot)
+
+        job.add_done_callback(release)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        """Concurrency and outcome counters for monitoring."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+        }
+
 
 transcription_service = TranscriptionService()
+
+
+class StubTranscriptionService:
+    """
+    Local stand-in for TranscriptionService that never calls SambaNova.
+
+    Returns a deterministic description of the audio (its size), optionally
+    after a fixed delay, so streaming and load tests can run offline.
+    """
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.completed = 0
+
+    async def transcribe_async(self, audio_bytes: bytes, filename: str) -> str:
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        self.completed += 1
+        return f"stub transcription of {filename} ({len(audio_bytes)} bytes)"
+
+    def stats(self) -> dict:
+        return {"backend": "stub", "completed": self.completed}
+
+
+stub_transcription_service = StubTranscriptionService()
+
+
+def get_transcriber() -> TranscriptionService | StubTranscriptionService:
+    """Return the transcriber selected by TRANSCRIPTION_BACKEND."""
+    if settings.transcription_backend == "stub":
+        return stub_transcription_service
+    return transcription_service
+
+
+# Duplicate uploads of the same audio (client retries) share one transcription
+transcriptions: SingleFlight[str] = SingleFlight("transcription")
+
+
+async def transcribe_upload(audio_bytes: bytes, filename: str) -> str:
+    """
+    Transcribe an uploaded recording, coalescing identical in-flight uploads.
+
+    Args:
+        audio_bytes: Audio file bytes
+        filename: Original filename for the audio
+
+    Returns:
+        Transcribed text
+
+    Raises:
+        TranscriptionTimeoutError: If the upstream call exceeds the timeout
+    """
+    transcriber = get_transcriber()
+    key = f"{settings.transcription_backend}:{hashlib.sha256(audio_bytes).hexdigest()}"
+    with span("transcription", audio_bytes=len(audio_bytes)):
+        return await transcriptions.do(key, lambda: transcriber.transcribe_async(audio_bytes, filename))
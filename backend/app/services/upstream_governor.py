@@ -0,0 +1,442 @@
+import asyncio
+import email.utils
+import json
+import math
+import random
+import threading
+import time
+from collections.abc import Callable
+import httpx
+from app.core.config import (
+    UPSTREAM_ADMISSION_TIMEOUT_SECONDS,
+    UPSTREAM_BURST_SECONDS,
+    UPSTREAM_MAX_QUEUED,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_RETRY_BASE_SECONDS,
+    UPSTREAM_RETRY_MAX_SECONDS,
+    settings,
+)
+from app.services.metrics import UPSTREAM_ERRORS, registry
+
+# Upstream statuses that mean "slow down" rather than "this request is wrong"
+RETRYABLE_STATUS_CODES = {429, 503}
+# Warm-up and health probes are not API calls and don't count against quotas
+UNGOVERNED_METHODS = {"HEAD", "OPTIONS"}
+
+
+class UpstreamRejected(Exception):
+    """Raised when a request cannot be admitted before its deadline."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float):
+        super().__init__(f"Upstream {upstream} {reason}")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Continuously refilling token bucket; a rate of 0 means unlimited.
+
+    Holds at most burst_seconds worth of tokens, so an idle period can't turn
+    into a burst that exceeds a per-minute quota. A request larger than the
+    capacity (e.g. a big inline PDF) is admitted once the bucket is full and
+    is charged the full capacity, not its size: debt would hold up every
+    request behind it for minutes.
+    Not thread-safe; UpstreamGovernor serializes access.
+    """
+
+    def __init__(self, per_minute: int, burst_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens can be taken (0 if now)."""
+        if not self.per_minute:
+            return 0.0
+        self._refill()
+        needed = min(amount, self.capacity)
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.per_minute:
+            self.tokens -= min(amount, self.capacity)
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """
+    Rough token cost of a model request for tokens-per-minute pacing.
+
+    About 4 bytes of JSON body per prompt token plus the requested output
+    budget (max_tokens / maxOutputTokens) when the request sets one. Inline
+    files (base64 images, PDFs) are overestimated, which errs on the side of
+    staying under the quota; TokenBucket caps what a single request is charged.
+    """
+    if "json" not in request.headers.get("content-type", ""):
+        return 0
+    body = request.content
+    tokens = len(body) // 4
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return tokens
+    if isinstance(payload, dict):
+        generation_config = payload.get("generationConfig") or {}
+        max_output = (
+            payload.get("max_completion_tokens")
+            or payload.get("max_tokens")
+            or generation_config.get("maxOutputTokens")
+        )
+        if isinstance(max_output, int):
+            tokens += max_output
+    return tokens
+
+
+def parse_retry_after(headers: httpx.Headers) -> float | None:
+    """Seconds to wait from retry-after-ms or Retry-After (delta-seconds or HTTP date)."""
+    if (value := headers.get("retry-after-ms")) is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class UpstreamGovernor:
+    """
+    Admission control for one upstream API: pace, queue, then retry.
+
+    - Pacing: requests-per-minute and tokens-per-minute token buckets.
+    - Queueing: callers wait in FIFO order (the head of the queue waits for
+      tokens, everyone else waits behind it), so a burst is smoothed out to
+      the quota instead of being bounced. A request that can't be admitted
+      before its deadline, or arrives when max_queued are already waiting,
+      is rejected straight away.
+    - Retries: an upstream 429/503 is retried after Retry-After (or jittered
+      exponential backoff), and admission is paused for everyone until then
+      so waiting requests don't run into the same wall.
+
+    Async callers (the Llama and Gemini agents) and threads (the Whisper SDK)
+    share the same buckets.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        burst_seconds: float = UPSTREAM_BURST_SECONDS,
+        max_queued: int = UPSTREAM_MAX_QUEUED,
+        admission_timeout_seconds: float = UPSTREAM_ADMISSION_TIMEOUT_SECONDS,
+        max_retries: int = UPSTREAM_MAX_RETRIES,
+        retry_base_seconds: float = UPSTREAM_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = UPSTREAM_RETRY_MAX_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_queued = max_queued
+        self.admission_timeout_seconds = admission_timeout_seconds
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._clock = clock
+        self._requests = TokenBucket(requests_per_minute, burst_seconds, clock)
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds, clock)
+        self._paused_until = 0.0
+        # Bucket state and counters are shared by the event loop and transcription threads
+        self._lock = threading.Lock()
+        # FIFO admission queues; asyncio.Lock wakes waiters in arrival order
+        self._async_queue = asyncio.Lock()
+        self._sync_queue = threading.Lock()
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.retries = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def deadline(self) -> float:
+        return self._clock() + self.admission_timeout_seconds
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and tokens from the buckets if available; else return the wait."""
+        with self._lock:
+            wait = max(
+                self._paused_until - self._clock(),
+                self._requests.wait_time(1),
+                self._tokens.wait_time(tokens),
+            )
+            if wait <= 0:
+                self._requests.take(1)
+                self._tokens.take(tokens)
+                return 0.0
+            return wait
+
+    def _enter_queue(self) -> float:
+        with self._lock:
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise UpstreamRejected(self.name, "admission queue is full", self.retry_base_seconds)
+            self.queued += 1
+        return self._clock()
+
+    def _leave_queue(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def _reject_wait(self, wait: float) -> UpstreamRejected:
+        with self._lock:
+            self.rejected += 1
+        return UpstreamRejected(self.name, "quota exhausted until after the request deadline", wait)
+
+    def _admitted(self, started: float) -> None:
+        waited = self._clock() - started
+        with self._lock:
+            self.admitted += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    async def acquire(self, tokens: int, deadline: float) -> None:
+        """
+        Wait in line until the request fits the quota.
+
+        Raises:
+            UpstreamRejected: If the queue is full or the request can't be admitted before deadline
+        """
+        started = self._enter_queue()
+        try:
+            try:
+                await asyncio.wait_for(self._async_queue.acquire(), max(0.0, deadline - self._clock()))
+            except asyncio.TimeoutError:
+                raise self._reject_wait(self.retry_base_seconds)
+            try:
+                while (wait := self._reserve(tokens)) > 0:
+                    if self._clock() + wait > deadline:
+                        raise self._reject_wait(wait)
+                    await asyncio.sleep(wait)
+            finally:
+                self._async_queue.release()
+        finally:
+            self._leave_queue()
+        self._admitted(started)
+
+    def acquire_sync(self, tokens: int, deadline: float) -> None:
+        """Blocking acquire() for SDK calls made from worker threads."""
+        started = self._enter_queue()
+        try:
+            if not self._sync_queue.acquire(timeout=max(0.0, deadline - self._clock())):
+                raise self._reject_wait(self.retry_base_seconds)
+            try:
+                while (wait := self._reserve(tokens)) > 0:
+                    if self._clock() + wait > deadline:
+                        raise self._reject_wait(wait)
+                    time.sleep(wait)
+            finally:
+                self._sync_queue.release()
+        finally:
+            self._leave_queue()
+        self._admitted(started)
+
+    def retry_delay(self, response: httpx.Response, attempt: int, deadline: float) -> float | None:
+        """
+        Delay before retrying a throttled response, or None to return it as is.
+
+        Honors Retry-After when the upstream sends it (plus a little jitter so
+        retries don't arrive in lockstep), otherwise uses full-jitter exponential
+        backoff. Admission is paused until the retry time for all callers.
+        """
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        with self._lock:
+            self.throttled += 1
+        if attempt >= self.max_retries:
+            return None
+        retry_after = parse_retry_after(response.headers)
+        backoff = min(self.retry_max_seconds, self.retry_base_seconds * 2**attempt)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.retry_base_seconds)
+        else:
+            delay = random.uniform(self.retry_base_seconds / 2, backoff)
+        if self._clock() + delay > deadline:
+            return None
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            self.retries += 1
+        return delay
+
+    def stats(self) -> dict:
+        """Quota settings, queue depth and admission/retry counters for monitoring."""
+        return {
+            "requests_per_minute": self._requests.per_minute,
+            "tokens_per_minute": self._tokens.per_minute,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "upstream_throttled": self.throttled,
+            "retries": self.retries,
+            "avg_wait_ms": self.wait_seconds / self.admitted * 1000 if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+
+def _count_error(upstream: str, response: httpx.Response | None = None, error: Exception | None = None) -> None:
+    if error is not None:
+        UPSTREAM_ERRORS.inc(upstream=upstream, status=type(error).__name__)
+    elif response is not None and response.status_code >= 400:
+        UPSTREAM_ERRORS.inc(upstream=upstream, status=str(response.status_code))
+
+
+def _rejected_response(request: httpx.Request, rejection: UpstreamRejected) -> httpx.Response:
+    """
+    Local 429 for a request the governor gave up on.
+
+    Shaped like the upstream's own rate-limit errors so the SDKs raise their
+    usual exceptions (surfacing as ModelHTTPError 429 in the routes).
+    """
+    return httpx.Response(
+        429,
+        headers={"Retry-After": str(math.ceil(rejection.retry_after))},
+        json={
+            "error": {
+                "code": 429,
+                "status": "RESOURCE_EXHAUSTED",
+                "type": "rate_limit_exceeded",
+                "message": str(rejection),
+            }
+        },
+        request=request,
+    )
+
+
+class GovernedAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx transport that admits requests through an UpstreamGovernor and retries throttled ones."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, governor: UpstreamGovernor):
+        self.transport = transport
+        self.governor = governor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method in UNGOVERNED_METHODS:
+            return await self.transport.handle_async_request(request)
+        # Buffer the body so it can be resent on retry
+        await request.aread()
+        deadline = self.governor.deadline()
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            try:
+                await self.governor.acquire(tokens, deadline)
+            except UpstreamRejected as rejection:
+                UPSTREAM_ERRORS.inc(upstream=self.governor.name, status="rejected")
+                return _rejected_response(request, rejection)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                _count_error(self.governor.name, error=e)
+                raise
+            _count_error(self.governor.name, response)
+            delay = self.governor.retry_delay(response, attempt, deadline)
+            if delay is None:
+                return response
+            await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """Synchronous GovernedAsyncTransport, for SDKs called from worker threads."""
+
+    def __init__(self, transport: httpx.BaseTransport, governor: UpstreamGovernor):
+        self.transport = transport
+        self.governor = governor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method in UNGOVERNED_METHODS:
+            return self.transport.handle_request(request)
+        request.read()
+        deadline = self.governor.deadline()
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            try:
+                self.governor.acquire_sync(tokens, deadline)
+            except UpstreamRejected as rejection:
+                UPSTREAM_ERRORS.inc(upstream=self.governor.name, status="rejected")
+                return _rejected_response(request, rejection)
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                _count_error(self.governor.name, error=e)
+                raise
+            _count_error(self.governor.name, response)
+            delay = self.governor.retry_delay(response, attempt, deadline)
+            if delay is None:
+                return response
+            response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+# One governor per upstream quota, shared by every client that calls it
+upstream_governors = {
+    "sambanova": UpstreamGovernor(
+        "sambanova",
+        requests_per_minute=settings.sambanova_requests_per_minute,
+        tokens_per_minute=settings.sambanova_tokens_per_minute,
+    ),
+    "whisper": UpstreamGovernor("whisper", requests_per_minute=settings.whisper_requests_per_minute),
+    "gemini": UpstreamGovernor(
+        "gemini",
+        requests_per_minute=settings.gemini_requests_per_minute,
+        tokens_per_minute=settings.gemini_tokens_per_minute,
+    ),
+}
+
+
+def get_upstream_stats() -> dict:
+    """Admission stats of every upstream governor."""
+    return {name: governor.stats() for name, governor in upstream_governors.items()}
+
+
+def _upstream_metrics() -> list[str]:
+    lines = [
+        "# HELP upstream_queued Requests waiting for admission by the upstream governor.",
+        "# TYPE upstream_queued gauge",
+    ]
+    lines += [f'upstream_queued{{upstream="{name}"}} {g.queued}' for name, g in upstream_governors.items()]
+    lines += [
+        "# HELP upstream_retries_total Throttled upstream responses retried by the governor.",
+        "# TYPE upstream_retries_total counter",
+    ]
+    lines += [f'upstream_retries_total{{upstream="{name}"}} {g.retries}' for name, g in upstream_governors.items()]
+    return lines
+
+
+registry.add_collector(_upstream_metrics)
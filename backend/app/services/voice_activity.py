@@ -0,0 +1,142 @@
+import io
+import math
+import sys
+import wave
+from array import array
+from collections import deque
+from app.core.config import (
+    VAD_ENERGY_THRESHOLD,
+    VAD_MAX_SEGMENT_MS,
+    VAD_MIN_SPEECH_MS,
+    VAD_SEGMENT_SILENCE_MS,
+)
+
+
+def frame_rms(frame: bytes) -> float:
+    """Root-mean-square energy of a little-endian 16-bit PCM frame."""
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap raw mono 16-bit PCM in a WAV container for Whisper."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class UtteranceSegmenter:
+    """
+    Energy-based voice activity detector that cuts a PCM stream into utterances.
+
+    Audio is processed in fixed frames; a frame is speech when its RMS energy is
+    above energy_threshold. A segment ends after silence_ms of non-speech (or
+    when it reaches max_segment_ms), so each segment can be transcribed while
+    the user is still talking. Segments shorter than min_speech_ms of actual
+    speech are treated as noise and dropped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        energy_threshold: float = VAD_ENERGY_THRESHOLD,
+        silence_ms: int = VAD_SEGMENT_SILENCE_MS,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        max_segment_ms: int = VAD_MAX_SEGMENT_MS,
+        preroll_ms: int = 150,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.energy_threshold = energy_threshold
+        self.silence_ms = silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.max_segment_ms = max_segment_ms
+        self._frame_bytes = sample_rate * frame_ms // 1000 * 2
+        if self._frame_bytes <= 0:
+            # feed() would never consume the buffer
+            raise ValueError(f"Frames of {frame_ms} ms at {sample_rate} Hz hold no samples")
+        self._buffer = bytearray()
+        # Keep a little audio before speech onset so the first syllable isn't clipped
+        self._preroll: deque[bytes] = deque(maxlen=max(preroll_ms // frame_ms, 1))
+        self._segment: bytearray | None = None
+        self._segment_ms = 0
+        self._speech_ms = 0
+        self._silence_run_ms = 0
+        # Silence since the last speech frame, used by callers to detect end of turn
+        self.trailing_silence_ms = 0
+
+    @property
+    def in_speech(self) -> bool:
+        """Whether a segment is currently open."""
+        return self._segment is not None
+
+    def feed(self, pcm: bytes) -> list[bytes]:
+        """
+        Add PCM audio and return any segments completed by it.
+
+        Args:
+            pcm: Little-endian 16-bit mono PCM at sample_rate
+
+        Returns:
+            Completed utterances as raw PCM (possibly empty)
+        """
+        self._buffer.extend(pcm)
+        segments = []
+        while len(self._buffer) >= self._frame_bytes:
+            frame = bytes(self._buffer[: self._frame_bytes])
+            del self._buffer[: self._frame_bytes]
+            segment = self._process_frame(frame)
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> bytes | None:
+        """Close the current segment (e.g. when the client signals end of speech)."""
+        if self._buffer and self._segment is not None:
+            self._segment.extend(self._buffer)
+        self._buffer.clear()
+        return self._finish_segment()
+
+    def _process_frame(self, frame: bytes) -> bytes | None:
+        if frame_rms(frame) >= self.energy_threshold:
+            if self._segment is None:
+                self._segment = bytearray(b"".join(self._preroll))
+                self._preroll.clear()
+            self._segment.extend(frame)
+            self._segment_ms += self.frame_ms
+            self._speech_ms += self.frame_ms
+            self._silence_run_ms = 0
+            self.trailing_silence_ms = 0
+        else:
+            self.trailing_silence_ms += self.frame_ms
+            if self._segment is None:
+                self._preroll.append(frame)
+                return None
+            self._segment.extend(frame)
+            self._segment_ms += self.frame_ms
+            self._silence_run_ms += self.frame_ms
+            if self._silence_run_ms >= self.silence_ms:
+                return self._finish_segment()
+
+        if self._segment_ms >= self.max_segment_ms:
+            return self._finish_segment()
+        return None
+
+    def _finish_segment(self) -> bytes | None:
+        segment, speech_ms = self._segment, self._speech_ms
+        self._segment = None
+        self._segment_ms = 0
+        self._speech_ms = 0
+        self._silence_run_ms = 0
+        if segment is None or speech_ms < self.min_speech_ms:
+            return None
+        return bytes(segment)
@@ -0,0 +1,121 @@
+"""
+Per-turn conversation history overhead: full re-serialize/re-validate vs append-only.
+
+The legacy path serialized all messages after every turn with
+to_jsonable_python(result.all_messages()) and re-validated all of them on the
+next turn with ModelMessagesTypeAdapter.validate_python, so its cost grows with
+the conversation. The session stores now append result.new_messages() only.
+
+Usage:
+    python -m benchmarks.history_overhead_benchmark [--turns 100]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from pydantic_ai.messages import (  # noqa: E402
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic_core import to_jsonable_python  # noqa: E402
+
+from app.services.session_store import (  # noqa: E402
+    ManualSession,
+    MemorySessionStore,
+    SqliteSessionStore,
+)
+
+REPORT_AT = (1, 10, 25, 50, 75, 100, 150, 200)
+
+
+def make_turn(turn: int) -> list:
+    """One user question (with retrieved manual context) and one short answer."""
+    question = f"Relevant manual sections:\n---\n{'Insert dowel 104 into panel A. ' * 60}\n---\n\nQuestion: step {turn}?"
+    return [
+        ModelRequest(parts=[UserPromptPart(content=question)]),
+        ModelResponse(parts=[TextPart(content=f"For step {turn}, attach the panel with screws.")]),
+    ]
+
+
+def time_legacy(turns: int) -> list[float]:
+    stored: list[dict] = []
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        history = ModelMessagesTypeAdapter.validate_python(stored)
+        all_messages = history + make_turn(turn)
+        stored = to_jsonable_python(all_messages)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_store(store, turns: int) -> list[float]:
+    store.create(
+        ManualSession(
+            session_id="bench",
+            manual_text="# Manual\nStep 1: attach legs.",
+            filename="bench.pdf",
+            created_at=datetime.now(),
+            manual_hash="bench",
+        )
+    )
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        session = store.get("bench")
+        assert session is not None and len(session.conversation_history) == 2 * turn
+        store.append_history("bench", make_turn(turn))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    # make_turn() cost is the same for every path, so subtract it
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        make_turn(turn)
+    baseline = (time.perf_counter() - start) / args.turns
+
+    results = {"legacy": time_legacy(args.turns)}
+    results["memory"] = time_store(
+        MemorySessionStore(ttl_seconds=3600, max_entries=10, max_bytes=1 << 30), args.turns
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        results["sqlite"] = time_store(
+            SqliteSessionStore(
+                Path(tmp) / "sessions.db",
+                ttl_seconds=3600,
+                max_entries=10,
+                max_bytes=1 << 30,
+                build_index=False,
+            ),
+            args.turns,
+        )
+
+    turns_shown = [t for t in REPORT_AT if t <= args.turns]
+    print("Per-turn history overhead in ms (excluding message construction)")
+    print(f"{'turn':>6} " + " ".join(f"{name:>10}" for name in results))
+    for turn in turns_shown:
+        row = " ".join(
+            f"{max(timings[turn - 1] - baseline, 0) * 1000:>10.3f}" for timings in results.values()
+        )
+        print(f"{turn:>6} {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Per-request image preprocessing cost: serial inline processing vs the parallel service.
+
+The legacy multimodal route decoded, resized and re-encoded every image one
+after another on the event loop. preprocess_images() runs them concurrently
+in a thread pool and uses JPEG draft mode. For each image count this reports
+wall time (what the request waits for) and CPU time (what the server pays),
+with a cold image cache and with every image already cached.
+
+Usage:
+    python -m benchmarks.image_preprocessing_benchmark [--images ../test_example/step1.png ...] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from PIL import Image  # noqa: E402
+
+from app.services.image_cache import image_cache  # noqa: E402
+from app.services.image_processing import preprocess_images  # noqa: E402
+
+DEFAULT_IMAGES = sorted(Path(__file__).resolve().parents[2].joinpath("test_example").glob("*.png"))
+
+
+def legacy_data_url(image_bytes: bytes) -> str:
+    """The inline conversion previously done in the multimodal route."""
+    pil_image = Image.open(io.BytesIO(image_bytes))
+    max_size = 1024
+    if pil_image.width > max_size or pil_image.height > max_size:
+        pil_image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if pil_image.mode in ("RGBA", "LA", "P"):
+        pil_image = pil_image.convert("RGB")
+    img_byte_arr = io.BytesIO()
+    pil_image.save(img_byte_arr, format="JPEG", quality=85, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')}"
+
+
+def run_cold(images: list[bytes]) -> None:
+    """Preprocess with an empty image cache, as for never-seen photos."""
+    image_cache.clear()
+    asyncio.run(preprocess_images(images))
+
+
+def measure(run, repeat: int) -> tuple[float, float]:
+    """Best-of-repeat wall time and matching CPU time, in ms."""
+    best = None
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        run()
+        sample = (time.perf_counter() - wall_start, time.process_time() - cpu_start)
+        if best is None or sample[0] < best[0]:
+            best = sample
+    return best[0] * 1000, best[1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=Path, nargs="+", default=DEFAULT_IMAGES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sources = [path.read_bytes() for path in args.images]
+    if not sources:
+        parser.error("no images found; pass --images")
+
+    # Warm the thread pool so the first row isn't charged for thread startup
+    asyncio.run(preprocess_images(sources[:1]))
+
+    print(f"Images: {', '.join(path.name for path in args.images)} (reused round-robin)")
+    print(
+        f"{'count':>6} {'serial wall':>12} {'serial cpu':>11} {'parallel wall':>14} {'parallel cpu':>13}"
+        f" {'cached wall':>12} {'cached cpu':>11}"
+    )
+    for count in range(1, 6):
+        images = [sources[i % len(sources)] for i in range(count)]
+        serial = measure(lambda: [legacy_data_url(image) for image in images], args.repeat)
+        parallel = measure(lambda: run_cold(images), args.repeat)
+        cached = measure(lambda: asyncio.run(preprocess_images(images)), args.repeat)
+        print(
+            f"{count:>6} {serial[0]:>10.1f}ms {serial[1]:>9.1f}ms {parallel[0]:>12.1f}ms {parallel[1]:>11.1f}ms"
+            f" {cached[0]:>10.1f}ms {cached[1]:>9.1f}ms"
+        )
+    print(f"Image cache: {image_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
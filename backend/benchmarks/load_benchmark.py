@@ -0,0 +1,356 @@
+"""
+Throughput and tail latency of every upload endpoint against stub upstreams.
+
+Starts benchmarks.stub_upstreams and the backend (uvicorn, in a scratch
+working directory so caches, uploads and recordings don't touch the repo),
+uploads test_example/sample.pdf once to get a manual session, then drives
+each scenario with --concurrency closed-loop clients for --requests requests:
+
+- chat, chat_stream: /api/chat with the manual session (JSON / SSE)
+- voice_chat: /api/voice-chat with sample.mp3
+- voice_chat_multimodal: /api/voice-chat-multimodal with sample.mp3 + sample.png
+- pdf_to_text: /api/pdf-to-text with sample.pdf
+- transcribe: /api/transcribe with sample.mp3
+
+Uploaded files get a per-request suffix so content-hash caches and request
+coalescing don't short-circuit the work (--reuse-inputs measures the cached
+path instead). Per scenario the report has p50/p95/p99 latency and time to
+first byte, RPS, error counts, event-loop lag (from the backend's lag
+histogram in /api/stats) and backend RSS, written as JSON to diff between
+commits (--compare prints the deltas against an earlier report).
+
+Usage:
+    python -m benchmarks.load_benchmark [--concurrency 8] [--requests 40] [--json load.json]
+        [--scenarios chat,transcribe] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = BACKEND_DIR.parent / "test_example"
+SCENARIOS = ["chat", "chat_stream", "voice_chat", "voice_chat_multimodal", "pdf_to_text", "transcribe"]
+
+
+def read_memory_kb(pid: int) -> dict[str, int]:
+    """Current (VmRSS) and peak (VmHWM) resident memory of a process."""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} process exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        cuts = ordered * 99
+    else:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+    return {
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+        "max": ordered[-1],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def lag_percentiles(before: dict, after: dict) -> dict:
+    """Lag quantiles (bucket upper bounds) from two snapshots of the backend's lag histogram."""
+    counts = [b - a for a, b in zip(before["counts"], after["counts"])]
+    total = sum(counts)
+    if not total:
+        return {"samples": 0}
+    result = {"samples": total}
+    for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        seen = 0
+        for bound, count in zip(after["buckets_ms"], counts):
+            seen += count
+            if seen >= q * total:
+                result[name] = bound
+                break
+    sum_ms = after["mean_lag_ms"] * after["samples"] - before["mean_lag_ms"] * before["samples"]
+    result["mean"] = sum_ms / total
+    return result
+
+
+class Inputs:
+    """Example files, optionally made unique per request."""
+
+    def __init__(self, unique: bool):
+        self.unique = unique
+        self.files = {name: (EXAMPLES_DIR / name).read_bytes() for name in ("sample.mp3", "sample.pdf", "sample.png")}
+
+    def get(self, name: str) -> bytes:
+        data = self.files[name]
+        # Trailing bytes are ignored by MP3/PDF/PNG readers but change the content hash
+        return data + uuid.uuid4().bytes if self.unique else data
+
+
+def build_request(scenario: str, inputs: Inputs, session_id: str, n: int) -> dict:
+    question = f"How do I attach the side panel? (request {n})"
+    if scenario in ("chat", "chat_stream"):
+        return {
+            "url": "/api/chat",
+            "params": {"message": question, "session_id": session_id, "stream": scenario == "chat_stream"},
+        }
+    if scenario == "voice_chat":
+        return {
+            "url": "/api/voice-chat",
+            "params": {"session_id": session_id},
+            "files": {"file": ("sample.mp3", inputs.get("sample.mp3"), "audio/mpeg")},
+        }
+    if scenario == "voice_chat_multimodal":
+        return {
+            "url": "/api/voice-chat-multimodal",
+            "files": [
+                ("audio", ("sample.mp3", inputs.get("sample.mp3"), "audio/mpeg")),
+                ("images", ("sample.png", inputs.get("sample.png"), "image/png")),
+            ],
+        }
+    if scenario == "pdf_to_text":
+        return {"url": "/api/pdf-to-text", "files": {"file": ("sample.pdf", inputs.get("sample.pdf"), "application/pdf")}}
+    if scenario == "transcribe":
+        return {"url": "/api/transcribe", "files": {"file": ("sample.mp3", inputs.get("sample.mp3"), "audio/mpeg")}}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: str, args: argparse.Namespace, inputs: Inputs, session_id: str, pid: int
+) -> dict:
+    latencies: list[float] = []
+    ttfbs: list[float] = []
+    statuses: dict[str, int] = {}
+    next_request = 0
+    rss_samples: list[int] = []
+
+    async def sample_rss():
+        while True:
+            rss_samples.append(read_memory_kb(pid)["VmRSS"])
+            await asyncio.sleep(0.1)
+
+    async def worker():
+        nonlocal next_request
+        while next_request < args.requests:
+            n = next_request
+            next_request += 1
+            request = build_request(scenario, inputs, session_id, n)
+            start = time.perf_counter()
+            try:
+                async with client.stream("POST", **request) as response:
+                    ttfb = None
+                    async for _ in response.aiter_raw():
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - start
+                    status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                ttfb = None
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed * 1000)
+                if ttfb is not None:
+                    ttfbs.append(ttfb * 1000)
+
+    lag_before = (await client.get("/api/stats")).json()["event_loop"]
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    lag_after = (await client.get("/api/stats")).json()["event_loop"]
+
+    return {
+        "requests": args.requests,
+        "ok": statuses.get("200", 0),
+        "errors": args.requests - statuses.get("200", 0),
+        "status_counts": statuses,
+        "seconds": elapsed,
+        "rps": statuses.get("200", 0) / elapsed,
+        "latency_ms": percentiles(latencies),
+        "ttfb_ms": percentiles(ttfbs),
+        "event_loop_lag_ms": lag_percentiles(lag_before, lag_after),
+        "rss_mb": {
+            "start": rss_samples[0] / 1024 if rss_samples else None,
+            "peak": max(rss_samples) / 1024 if rss_samples else None,
+            "end": read_memory_kb(pid)["VmRSS"] / 1024,
+        },
+    }
+
+
+async def run(args: argparse.Namespace, backend: subprocess.Popen) -> dict:
+    inputs = Inputs(unique=not args.reuse_inputs)
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        # Let the background pre-warm finish so it doesn't count against the first scenario
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            prewarm = (await client.get("/api/stats")).json()["prewarm"]
+            if not prewarm["started"] or prewarm["completed"]:
+                break
+            await asyncio.sleep(0.2)
+
+        response = await client.post(
+            "/api/pdf-to-text", files={"file": ("sample.pdf", inputs.get("sample.pdf"), "application/pdf")}
+        )
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+
+        results = {}
+        for scenario in args.scenarios:
+            result = await run_scenario(client, scenario, args, inputs, session_id, backend.pid)
+            results[scenario] = result
+            latency = result["latency_ms"]
+            print(
+                f"{scenario:>22} {result['ok']:>4}/{result['requests']:<4} {result['rps']:>7.1f}"
+                f" {latency.get('p50', 0):>8.0f} {latency.get('p95', 0):>8.0f} {latency.get('p99', 0):>8.0f}"
+                f" {result['event_loop_lag_ms'].get('p99', 0):>8} {result['rss_mb']['peak'] or 0:>8.0f}"
+            )
+        results["_final_rss_mb"] = read_memory_kb(backend.pid)["VmHWM"] / 1024
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline.get('revision')}):")
+    print(f"{'scenario':>22} {'rps':>16} {'p95 ms':>18} {'p99 ms':>18}")
+    for scenario, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(scenario)
+        if not old:
+            continue
+
+        def delta(new_value, old_value):
+            if not old_value:
+                return f"{new_value:.0f}"
+            return f"{new_value:.0f} ({(new_value - old_value) / old_value:+.0%})"
+
+        print(
+            f"{scenario:>22} {delta(result['rps'], old['rps']):>16}"
+            f" {delta(result['latency_ms'].get('p95', 0), old['latency_ms'].get('p95')):>18}"
+            f" {delta(result['latency_ms'].get('p99', 0), old['latency_ms'].get('p99')):>18}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), type=lambda value: value.split(","))
+    parser.add_argument("--reuse-inputs", action="store_true", help="Send identical files (cache hits)")
+    parser.add_argument("--port", type=int, default=8789)
+    parser.add_argument("--stub-port", type=int, default=8790)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Stub chat time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Stub chat token rate")
+    parser.add_argument("--whisper-ms", type=float, default=400, help="Stub transcription latency")
+    parser.add_argument("--gemini-ms", type=float, default=2000, help="Stub PDF extraction latency")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Earlier report to print deltas against")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    workdir = tempfile.TemporaryDirectory(prefix="load-benchmark-")
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "SAMBANOVA_API_KEY": "benchmark",
+        "SAMBANOVA_BASE_URL": f"{stub_url}/v1",
+        "GOOGLE_API_KEY": "benchmark",
+        "GEMINI_BASE_URL": stub_url,
+        "TRANSCRIPTION_BACKEND": "sambanova",
+    }
+    stub = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.stub_upstreams", "--port", str(args.stub_port),
+            "--ttft-ms", str(args.ttft_ms), "--tokens-per-second", str(args.tokens_per_second),
+            "--whisper-ms", str(args.whisper_ms), "--gemini-ms", str(args.gemini_ms),
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )  # fmt: skip
+    backend = None
+    try:
+        wait_for(f"{stub_url}/docs", stub)
+        backend = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=workdir.name,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        wait_for(f"http://127.0.0.1:{args.port}/health", backend)
+
+        print(f"{args.concurrency} concurrent clients, {args.requests} requests per scenario")
+        print(
+            f"{'scenario':>22} {'ok':>9} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            f" {'lag p99':>8} {'RSS MB':>8}"
+        )
+        results = asyncio.run(run(args, backend))
+    finally:
+        for process in (backend, stub):
+            if process is not None:
+                process.terminate()
+                process.wait()
+        workdir.cleanup()
+
+    report = {
+        "revision": git_revision(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("concurrency", "requests", "reuse_inputs", "ttft_ms", "tokens_per_second", "whisper_ms", "gemini_ms")
+        },
+        "peak_rss_mb": results.pop("_final_rss_mb"),
+        "scenarios": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compare prompt size and latency between full-manual and retrieval context modes.
+
+Usage:
+    python -m benchmarks.manual_context_benchmark [--manual manual.txt] [--live]
+
+Without --live only local work is measured (prompt construction, index build and
+search). With --live each question is also sent to the model in both modes,
+which requires real API keys in .env.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.services.agent_cache import agent_cache, manual_content_hash  # noqa: E402
+from app.services.llama_assembly_agent import (  # noqa: E402
+    ASSEMBLY_RETRIEVAL_INSTRUCTION,
+    ASSEMBLY_SYSTEM_INSTRUCTION,
+    build_retrieval_instructions,
+    run_agent_with_files,
+)
+from app.services.manual_index import build_manual_index  # noqa: E402
+
+QUESTIONS = [
+    "What do I do in step 3?",
+    "Which screw is part 104?",
+    "How many dowels do I need for the side panels?",
+    "What tools do I need?",
+    "How do I attach the back panel?",
+]
+
+
+def synthetic_manual(steps: int) -> str:
+    """Generate an IKEA-style manual with a parts list and `steps` assembly steps."""
+    lines = ["# Assembly Manual", "", "## Tools", "Allen key, Phillips screwdriver, hammer.", ""]
+    lines.append("## Parts list")
+    for part in range(100, 100 + steps):
+        lines.append(f"Part {part}: {'screw' if part % 3 == 0 else 'dowel'} x{part % 7 + 2}")
+    for step in range(1, steps + 1):
+        lines += [
+            "",
+            f"Step {step}: Attach panel {chr(65 + step % 26)}",
+            f"Insert parts {100 + step} into the pre-drilled holes of panel {chr(65 + step % 26)}. "
+            "Align the edges carefully and tighten with the Allen key. "
+            "Do not over-tighten, as this can damage the particle board. " * 3,
+        ]
+    return "\n".join(lines)
+
+
+async def time_live(manual_text: str, manual_index) -> list[float]:
+    latencies = []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        await run_agent_with_files(question, manual_text=manual_text, manual_index=manual_index)
+        latencies.append(time.perf_counter() - start)
+    # Mode switches reuse the same cache key, so drop the cached agent between runs
+    agent_cache.discard(manual_content_hash(manual_text))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manual", help="Path to an extracted manual text file (default: synthetic)")
+    parser.add_argument("--steps", type=int, default=80, help="Steps in the synthetic manual")
+    parser.add_argument("--live", action="store_true", help="Also call the model and time both modes")
+    args = parser.parse_args()
+
+    if args.manual:
+        with open(args.manual, encoding="utf-8") as f:
+            manual_text = f.read()
+    else:
+        manual_text = synthetic_manual(args.steps)
+
+    start = time.perf_counter()
+    manual_index = build_manual_index(manual_text)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    full_system = ASSEMBLY_SYSTEM_INSTRUCTION.format(manual_text=manual_text)
+    retrieval_system = ASSEMBLY_RETRIEVAL_INSTRUCTION.format(
+        table_of_contents=manual_index.table_of_contents()
+    )
+
+    search_ms = []
+    retrieval_prompts = []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        instructions = build_retrieval_instructions(question, manual_index) or ""
+        search_ms.append((time.perf_counter() - start) * 1000)
+        retrieval_prompts.append(len(retrieval_system) + len(instructions) + len(question))
+
+    full_prompt = len(full_system) + statistics.mean(len(q) for q in QUESTIONS)
+    retrieval_prompt = statistics.mean(retrieval_prompts)
+
+    print(f"Manual: {len(manual_text)} chars, {len(manual_index.sections)} sections")
+    print(f"Index build: {build_ms:.2f} ms")
+    print(f"Retrieval search: mean {statistics.mean(search_ms):.3f} ms, max {max(search_ms):.3f} ms")
+    print()
+    print(f"{'mode':<10} {'prompt chars':>14} {'~tokens':>10}")
+    print(f"{'full':<10} {full_prompt:>14.0f} {int(full_prompt) // 4:>10}")
+    print(f"{'retrieval':<10} {retrieval_prompt:>14.0f} {int(retrieval_prompt) // 4:>10}")
+    print(f"Reduction: {100 * (1 - retrieval_prompt / full_prompt):.1f}%")
+
+    if args.live:
+        full_latency = asyncio.run(time_live(manual_text, None))
+        retrieval_latency = asyncio.run(time_live(manual_text, manual_index))
+        print()
+        print(f"Live latency full:      p50 {statistics.median(full_latency):.2f}s")
+        print(f"Live latency retrieval: p50 {statistics.median(retrieval_latency):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
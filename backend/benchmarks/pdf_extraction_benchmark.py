@@ -0,0 +1,151 @@
+"""
+PDF extraction latency against page count: one Gemini call vs parallel page ranges.
+
+Starts benchmarks.stub_upstreams with a Gemini whose latency and output grow
+with the pages of the inline PDF (--gemini-ms + --page-ms per page, --page-chars
+of text per page) and that stops at --max-output-chars like a real output
+limit. For each page count in --pages, a blank PDF of that many pages is
+converted twice, below the PDF text cache:
+
+- single: the whole PDF in one call (extract_single)
+- ranges: split locally and converted in concurrent page ranges
+  (PDF_PAGES_PER_RANGE pages each, PDF_RANGE_CONCURRENCY at a time)
+
+and the benchmark reports wall time, Gemini calls, and whether the text is
+complete or was cut off at the output limit. --error-rate makes the stub fail
+a share of calls to exercise the per-range retries.
+
+Usage:
+    python -m benchmarks.pdf_extraction_benchmark [--pages 4,12,24,48,80] [--page-ms 200]
+        [--max-output-chars 150000] [--error-rate 0.1] [--json pdf.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from benchmarks.load_benchmark import BACKEND_DIR, wait_for
+
+STUB_PORT = 8791
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_BASE_URL", f"http://127.0.0.1:{STUB_PORT}")
+
+from pypdf import PdfWriter  # noqa: E402
+
+from app.core.config import PDF_PAGES_PER_RANGE, PDF_RANGE_CONCURRENCY  # noqa: E402
+from app.core.logging import configure_logging  # noqa: E402
+from app.services.gemini_pdf_agent import (  # noqa: E402
+    PDF_MODEL_NAME,
+    extract_page_ranges,
+    extract_single,
+)
+from app.services.http_pools import http_pools  # noqa: E402
+from app.services.metrics import LLM_REQUESTS, STAGE_ERRORS  # noqa: E402
+from app.services.pdf_pages import split_pdf  # noqa: E402
+
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def failed_range_calls() -> float:
+    return STAGE_ERRORS.value(stage="pdf_range_extraction", error="ModelHTTPError")
+
+
+async def measure(mode: str, pdf_bytes: bytes) -> dict:
+    calls_before = LLM_REQUESTS.value(model=PDF_MODEL_NAME)
+    failed_before = failed_range_calls()
+    start = time.perf_counter()
+    ranges = 1
+    try:
+        if mode == "single":
+            text = await extract_single(pdf_bytes)
+        else:
+            total_pages, page_ranges = await asyncio.to_thread(split_pdf, pdf_bytes, PDF_PAGES_PER_RANGE)
+            ranges = len(page_ranges)
+            text = await extract_page_ranges(page_ranges, total_pages)
+        error = None
+    except Exception as e:
+        text, error = "", repr(e)
+    return {
+        "seconds": time.perf_counter() - start,
+        "ranges": ranges,
+        "calls": LLM_REQUESTS.value(model=PDF_MODEL_NAME) - calls_before,
+        "failed_calls": failed_range_calls() - failed_before,
+        "output_chars": len(text),
+        "error": error,
+    }
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    results = []
+    try:
+        for pages in args.pages:
+            pdf_bytes = blank_pdf(pages)
+            for mode in ("single", "ranges"):
+                result = await measure(mode, pdf_bytes)
+                # The stub writes at least page_chars per page; anything shorter was cut off
+                result["complete"] = result["error"] is None and result["output_chars"] >= pages * args.page_chars
+                results.append({"pages": pages, "mode": mode, **result})
+                print(
+                    f"{pages:>6} {mode:>7} {result['ranges']:>7} {result['calls']:>6.0f} {result['failed_calls']:>7.0f}"
+                    f" {result['seconds']:>8.2f} {result['output_chars']:>9} "
+                    + ("complete" if result["complete"] else result["error"] or "CUT OFF at output limit")
+                )
+    finally:
+        await http_pools.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="4,12,24,48,80", help="Comma-separated page counts")
+    parser.add_argument("--gemini-ms", type=float, default=1500, help="Stub Gemini base latency per call")
+    parser.add_argument("--page-ms", type=float, default=200, help="Stub Gemini latency per page")
+    parser.add_argument("--page-chars", type=int, default=3000, help="Stub Gemini output per page")
+    parser.add_argument("--max-output-chars", type=int, default=150000, help="Stub output limit (0 = none)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub Gemini calls that fail with 500")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    args.pages = [int(p) for p in args.pages.split(",")]
+    # Show range retries and output-limit splits
+    configure_logging("INFO")
+
+    stub = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.stub_upstreams", "--port", str(STUB_PORT),
+            "--gemini-ms", str(args.gemini_ms), "--gemini-page-ms", str(args.page_ms),
+            "--gemini-page-chars", str(args.page_chars), "--gemini-max-output-chars", str(args.max_output_chars),
+            "--gemini-error-rate", str(args.error_rate),
+        ],
+        cwd=BACKEND_DIR,
+    )  # fmt: skip
+    try:
+        wait_for(f"http://127.0.0.1:{STUB_PORT}/docs", stub)
+        print(f"ranges of {PDF_PAGES_PER_RANGE} pages, {PDF_RANGE_CONCURRENCY} concurrent")
+        print(f"{'pages':>6} {'mode':>7} {'ranges':>7} {'calls':>6} {'failed':>7} {'seconds':>8} {'chars':>9} result")
+        results = asyncio.run(run(args))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
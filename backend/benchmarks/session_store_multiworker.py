@@ -0,0 +1,127 @@
+"""
+Multi-process load test for the shared SQLite session store.
+
+Simulates N uvicorn workers: sessions are created in one process, then every
+conversation turn is handled by whichever worker process picks it up. At the
+end each session's history must contain exactly one entry per turn, in order,
+with the manual text intact, and the turns must have been served by more than
+one process.
+
+Usage:
+    python -m benchmarks.session_store_multiworker [--workers 4] [--sessions 200] [--turns 10]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from pathlib import Path
+
+_session_manager = None
+
+
+def _init_worker(db_path: str):
+    global _session_manager
+    os.environ["SESSION_BACKEND"] = "sqlite"
+    os.environ["SESSION_DB_PATH"] = db_path
+    os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+    os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    from app.services import session_manager
+
+    _session_manager = session_manager
+
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+
+def _manual_for(i: int) -> str:
+    # A handful of distinct manuals shared by many sessions, like real uploads
+    return f"# Manual {i % 7}\n" + "\n".join(
+        f"Step {step}: attach part {100 + step} to panel {i % 7}." for step in range(1, 200)
+    )
+
+
+def _create(i: int) -> tuple[str, str]:
+    manual_text = _manual_for(i)
+    session_id = asyncio.run(_session_manager.create_session(manual_text, f"manual_{i}.pdf"))
+    return session_id, hashlib.sha256(manual_text.encode()).hexdigest()
+
+
+def _turn(args: tuple[str, str, int]) -> tuple[str, bool, str]:
+    session_id, manual_hash, turn = args
+    session = asyncio.run(_session_manager.get_session(session_id))
+    if session is None:
+        return session_id, False, "session missing"
+    if hashlib.sha256(session.manual_text.encode()).hexdigest() != manual_hash:
+        return session_id, False, "manual text mismatch"
+    if len(session.conversation_history) != turn:
+        return session_id, False, f"expected {turn} messages, found {len(session.conversation_history)}"
+    from pydantic_ai.messages import ModelRequest, UserPromptPart
+
+    message = ModelRequest(parts=[UserPromptPart(content=f"{turn}:{os.getpid()}")])
+    if not asyncio.run(_session_manager.append_conversation_messages(session_id, [message])):
+        return session_id, False, "update failed"
+    return session_id, True, ""
+
+
+def _verify(args: tuple[str, int]) -> tuple[str, bool, str, set[int]]:
+    session_id, turns = args
+    history = asyncio.run(_session_manager.get_conversation_history(session_id)) or []
+    entries = [message.parts[0].content.split(":") for message in history]
+    ok = [int(turn) for turn, _ in entries] == list(range(turns))
+    return session_id, ok, "" if ok else f"history {entries}", {int(pid) for _, pid in entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "sessions.db")
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(args.workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+            # Wait until every worker has started and imported the app
+            pool.map(_ping, range(args.workers * 4), chunksize=1)
+
+            start = time.perf_counter()
+            created = pool.map(_create, range(args.sessions), chunksize=1)
+            create_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            failures = []
+            for turn in range(args.turns):
+                jobs = [(session_id, manual_hash, turn) for session_id, manual_hash in created]
+                for session_id, ok, error in pool.imap_unordered(_turn, jobs, chunksize=1):
+                    if not ok:
+                        failures.append((session_id, turn, error))
+            turn_seconds = time.perf_counter() - start
+
+            results = pool.map(_verify, [(session_id, args.turns) for session_id, _ in created])
+
+    failures += [(session_id, "final", error) for session_id, ok, error, _ in results if not ok]
+    pids = set().union(*(pids for *_, pids in results))
+    total_turns = args.sessions * args.turns
+
+    print(f"Workers: {args.workers}, sessions: {args.sessions}, turns/session: {args.turns}")
+    print(f"Create: {args.sessions / create_seconds:.0f} sessions/s")
+    print(f"Turns:  {total_turns / turn_seconds:.0f} get+update/s")
+    print(f"Distinct worker processes serving turns: {len(pids)}")
+    if failures:
+        print(f"FAILED: {len(failures)} inconsistencies, first: {failures[:3]}")
+        raise SystemExit(1)
+    if len(pids) < 2 and args.workers > 1:
+        print("FAILED: all turns were served by a single process")
+        raise SystemExit(1)
+    print("OK: every session stayed consistent across workers")
+
+
+if __name__ == "__main__":
+    main()
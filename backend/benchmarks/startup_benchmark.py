@@ -0,0 +1,138 @@
+"""
+Cold-start cost of the backend: import time and time to first /health.
+
+Runs `python -X importtime -c "import app.main"` in fresh subprocesses and
+reports the total import time and the packages with the largest cumulative
+cost. pydantic_ai, httpx, PIL and the model SDKs should not appear: the API
+route modules load in the background after startup, and the SDKs on first
+use. With --serve it also starts uvicorn and measures the time until /health
+first answers, and until the background pre-warm has finished (per
+/api/stats).
+
+Usage:
+    python -m benchmarks.startup_benchmark [--runs 5] [--top 15] [--serve] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+
+
+def import_profile(module: str = "app.main") -> tuple[int, dict[str, int]]:
+    """
+    Import a module in a fresh interpreter and profile it.
+
+    -X importtime writes one line per import to stderr:
+        import time: self [us] | cumulative | imported package
+    Nested imports are indented under the module that triggered them.
+
+    Returns:
+        Total microseconds, and the cumulative microseconds of each top-level
+        package (fastapi, pydantic_ai, ...) at the point it was first imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    packages: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumul, name = line[len("import time:") :].split("|")
+        # Only unindented entries add up to the total
+        if not name.startswith("  "):
+            total += int(cumul)
+        package = name.strip().split(".")[0]
+        # A package's own line is printed after its submodules, so keep the largest
+        packages[package] = max(packages.get(package, 0), int(cumul))
+    return total, packages
+
+
+def time_to_health(port: int, timeout: float = 60) -> tuple[float, float | None]:
+    """Seconds from process start until /health answers, and until the pre-warm completes."""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "RECORDING_ARCHIVE_ENABLED": "false"},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        health = prewarmed = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if health is None:
+                    httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).raise_for_status()
+                    health = time.perf_counter() - start
+                stats = httpx.get(f"http://127.0.0.1:{port}/api/stats", timeout=1).json()
+                if not stats["prewarm"]["started"] or stats["prewarm"]["completed"]:
+                    prewarmed = time.perf_counter() - start
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        if health is None:
+            raise RuntimeError("server did not start")
+        return health, prewarmed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Number of top-level imports to list")
+    parser.add_argument("--serve", action="store_true", help="Also measure time to first /health via uvicorn")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    totals = [total / 1000 for total, _ in profiles]
+    packages = {
+        name: statistics.median(p.get(name, 0) for _, p in profiles) / 1000 for name in profiles[0][1]
+    }
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]
+
+    print(f"import app.main over {args.runs} runs: median {statistics.median(totals):.0f} ms")
+    print(f"{'package':>45} {'cumulative ms':>14}")
+    for name, ms in top:
+        print(f"{name:>45} {ms:>14.1f}")
+
+    results = {
+        "import_ms": {"median": statistics.median(totals), "min": min(totals), "max": max(totals)},
+        "top_imports_ms": dict(top),
+    }
+
+    if args.serve:
+        runs = [time_to_health(args.port) for _ in range(args.runs)]
+        health = [h for h, _ in runs]
+        prewarmed = [p for _, p in runs if p is not None]
+        print(f"time to first /health: median {statistics.median(health) * 1000:.0f} ms")
+        if prewarmed:
+            print(f"time to pre-warm done: median {statistics.median(prewarmed) * 1000:.0f} ms")
+        results["health_ms"] = [h * 1000 for h in health]
+        results["prewarmed_ms"] = [p * 1000 for p in prewarmed]
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
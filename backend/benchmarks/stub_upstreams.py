@@ -0,0 +1,257 @@
+"""
+Local stand-ins for the upstream APIs, for load tests without real quota.
+
+One server answers all three upstreams the backend calls:
+
+- POST /v1/chat/completions: OpenAI-compatible chat (SambaNova Llama), streamed
+  or not, answering after --ttft-ms and then at --tokens-per-second
+- POST /v1/audio/transcriptions: Whisper, plain-text transcription after --whisper-ms
+- POST /v1beta/models/{model}:generateContent (and :streamGenerateContent):
+  Gemini, returning a generated "manual" after --gemini-ms. With
+  --gemini-page-ms / --gemini-page-chars, latency and output grow with the
+  pages of the inline PDF; --gemini-max-output-chars cuts the output off
+  (finishReason MAX_TOKENS) and --gemini-error-rate fails a share of calls
+
+Point the backend at it with:
+    SAMBANOVA_BASE_URL=http://127.0.0.1:<port>/v1 GEMINI_BASE_URL=http://127.0.0.1:<port>
+
+Usage:
+    python -m benchmarks.stub_upstreams [--port 8790] [--ttft-ms 300] [--tokens-per-second 200]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    ttft_ms: float = 300
+    tokens_per_second: float = 200
+    output_tokens: int = 60
+    whisper_ms: float = 400
+    gemini_ms: float = 2000
+    manual_chars: int = 20000
+    # Per-page cost of the inline PDF (0 = fixed latency and manual_chars output)
+    gemini_page_ms: float = 0
+    gemini_page_chars: int = 0
+    gemini_max_output_chars: int = 0
+    gemini_error_rate: float = 0.0
+
+
+config = StubConfig()
+app = FastAPI()
+
+WORDS = "Attach the side panel with two cam screws and tighten them clockwise until snug".split()
+MANUAL_STEP = (
+    "Step {n}: Align panel {n} with the pre-drilled holes, insert two M6 screws (part 10{n}) "
+    "and tighten with the hex key. Check that the panel is flush before continuing.\n"
+)
+
+
+def _tokens(count: int) -> list[str]:
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def _usage(prompt_chars: int) -> dict:
+    prompt_tokens = prompt_chars // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": config.output_tokens,
+        "total_tokens": prompt_tokens + config.output_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.body()
+    payload = json.loads(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = payload.get("model", "stub")
+    tokens = _tokens(config.output_tokens)
+    await asyncio.sleep(config.ttft_ms / 1000)
+
+    if not payload.get("stream"):
+        await asyncio.sleep(len(tokens) / config.tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": _usage(len(body)),
+        }
+
+    def chunk(delta: dict, finish_reason: str | None = None, **extra) -> str:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    async def events():
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            await asyncio.sleep(1 / config.tokens_per_second)
+            yield chunk({"content": token})
+        yield chunk({}, "stop")
+        yield (
+            "data: "
+            + json.dumps(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": _usage(len(body)),
+                }
+            )
+            + "\n\n"
+        )
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    form = await request.form()
+    audio = form["file"]
+    size = len(await audio.read())
+    await asyncio.sleep(config.whisper_ms / 1000)
+    return PlainTextResponse(f"How do I attach the side panel? ({size} bytes of audio)")
+
+
+# Page objects in the PDFs pypdf writes (and most others): "/Type /Page", not "/Pages"
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def _pdf_pages(payload: dict) -> int:
+    """Page count of the PDFs inlined in a generateContent request (at least 1)."""
+    pages = 0
+    for content in payload.get("contents", []):
+        for part in content.get("parts", []):
+            inline = part.get("inlineData") or part.get("inline_data")
+            if inline and inline.get("mimeType", inline.get("mime_type")) == "application/pdf":
+                # The Gemini API carries bytes as URL-safe base64
+                data = inline["data"]
+                pages += len(_PDF_PAGE_RE.findall(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))))
+    return max(1, pages)
+
+
+def _gemini_response(text: str, finish_reason: str = "STOP") -> dict:
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": finish_reason,
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": 258,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": 258 + len(text) // 4,
+        },
+        "modelVersion": "gemini-2.5-flash",
+        "responseId": uuid.uuid4().hex,
+    }
+
+
+def _manual_text(chars: int) -> str:
+    steps = []
+    n = 1
+    while sum(map(len, steps)) < chars:
+        steps.append(MANUAL_STEP.format(n=n))
+        n += 1
+    return "# Assembly Manual\n\n" + "".join(steps)
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate(model_action: str, request: Request):
+    payload = json.loads(await request.body())
+    if random.random() < config.gemini_error_rate:
+        await asyncio.sleep(config.gemini_ms / 1000)
+        return JSONResponse(
+            {"error": {"code": 500, "message": "Internal error encountered.", "status": "INTERNAL"}},
+            status_code=500,
+        )
+
+    if config.gemini_page_ms or config.gemini_page_chars:
+        pages = _pdf_pages(payload)
+        output_pages = pages
+        finish_reason = "STOP"
+        # Generation stops at the output limit, so a cut-off answer also takes less time
+        if config.gemini_max_output_chars and pages * config.gemini_page_chars > config.gemini_max_output_chars:
+            output_pages = config.gemini_max_output_chars / config.gemini_page_chars
+            finish_reason = "MAX_TOKENS"
+        await asyncio.sleep((config.gemini_ms + output_pages * config.gemini_page_ms) / 1000)
+        text = _manual_text(int(output_pages * config.gemini_page_chars))
+    else:
+        await asyncio.sleep(config.gemini_ms / 1000)
+        text = _manual_text(config.manual_chars)
+        finish_reason = "STOP"
+
+    if model_action.endswith(":streamGenerateContent"):
+
+        async def events():
+            yield f"data: {json.dumps(_gemini_response(text, finish_reason))}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+    return JSONResponse(_gemini_response(text, finish_reason))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--ttft-ms", type=float, default=config.ttft_ms, help="Chat time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=config.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=config.output_tokens)
+    parser.add_argument("--whisper-ms", type=float, default=config.whisper_ms)
+    parser.add_argument("--gemini-ms", type=float, default=config.gemini_ms)
+    parser.add_argument("--manual-chars", type=int, default=config.manual_chars)
+    parser.add_argument("--gemini-page-ms", type=float, default=config.gemini_page_ms, help="Added latency per PDF page")
+    parser.add_argument("--gemini-page-chars", type=int, default=config.gemini_page_chars, help="Output per PDF page")
+    parser.add_argument("--gemini-max-output-chars", type=int, default=config.gemini_max_output_chars)
+    parser.add_argument("--gemini-error-rate", type=float, default=config.gemini_error_rate)
+    args = parser.parse_args()
+
+    config.ttft_ms = args.ttft_ms
+    config.tokens_per_second = args.tokens_per_second
+    config.output_tokens = args.output_tokens
+    config.whisper_ms = args.whisper_ms
+    config.gemini_ms = args.gemini_ms
+    config.manual_chars = args.manual_chars
+    config.gemini_page_ms = args.gemini_page_ms
+    config.gemini_page_chars = args.gemini_page_chars
+    config.gemini_max_output_chars = args.gemini_max_output_chars
+    config.gemini_error_rate = args.gemini_error_rate
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
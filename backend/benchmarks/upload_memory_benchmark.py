@@ -0,0 +1,142 @@
+"""
+Peak server RSS under concurrent large uploads.
+
+Starts the backend with uvicorn in a subprocess (stub transcription, recording
+archive off) and sends concurrent uploads to /api/transcribe in three scenarios:
+
+- within_limit: files just under UPLOAD_MAX_AUDIO_BYTES, accepted
+- over_limit: files over the limit with a Content-Length, rejected before the body is read
+- over_limit_chunked: the same files sent without a Content-Length, cut off while streaming
+
+Each scenario runs against a fresh server process so its peak RSS (VmHWM) is
+not inflated by the previous one. Linux only (reads /proc).
+
+Usage:
+    python -m benchmarks.upload_memory_benchmark [--concurrency 16] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+
+from app.core.config import UPLOAD_MAX_AUDIO_BYTES  # noqa: E402
+
+BOUNDARY = uuid.uuid4().hex
+
+
+def read_memory_kb(pid: int) -> dict[str, int]:
+    """Current (VmRSS) and peak (VmHWM) resident memory of a process."""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def multipart_parts(size: int, chunk_size: int = 1024 * 1024):
+    """Yield a multipart body with one audio file of the given size, in chunks."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.mp3"\r\n'
+        "Content-Type: audio/mpeg\r\n\r\n"
+    ).encode()
+    chunk = b"\0" * chunk_size
+    remaining = size
+    while remaining > 0:
+        yield chunk[: min(chunk_size, remaining)]
+        remaining -= chunk_size
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def upload(client: httpx.AsyncClient, size: int, chunked: bool) -> int:
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    if chunked:
+
+        async def body():
+            for part in multipart_parts(size):
+                yield part
+
+        content = body()
+    else:
+        content = b"".join(multipart_parts(size))
+    try:
+        response = await client.post("/api/transcribe", content=content, headers=headers)
+    except httpx.HTTPError:
+        # The server may close the connection after an early 413
+        return 413
+    return response.status_code
+
+
+async def run_scenario(base_url: str, size: int, concurrency: int, chunked: bool) -> tuple[dict, float]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(upload(client, size, chunked) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    counts: dict[int, int] = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return counts, elapsed
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {**os.environ, "TRANSCRIPTION_BACKEND": "stub", "RECORDING_ARCHIVE_ENABLED": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("within_limit", UPLOAD_MAX_AUDIO_BYTES - 1024 * 1024, False),
+        ("over_limit", 2 * UPLOAD_MAX_AUDIO_BYTES, False),
+        ("over_limit_chunked", 2 * UPLOAD_MAX_AUDIO_BYTES, True),
+    ]
+    print(f"{args.concurrency} concurrent uploads per scenario")
+    print(f"{'scenario':>20} {'file MB':>8} {'statuses':>22} {'seconds':>8} {'idle RSS MB':>12} {'peak RSS MB':>12}")
+    for name, size, chunked in scenarios:
+        server = start_server(args.port)
+        try:
+            idle = read_memory_kb(server.pid)["VmRSS"]
+            counts, elapsed = asyncio.run(
+                run_scenario(f"http://127.0.0.1:{args.port}", size, args.concurrency, chunked)
+            )
+            peak = read_memory_kb(server.pid)["VmHWM"]
+        finally:
+            server.terminate()
+            server.wait()
+        statuses = ", ".join(f"{status}x{count}" for status, count in sorted(counts.items()))
+        print(
+            f"{name:>20} {size / 2**20:>8.0f} {statuses:>22} {elapsed:>8.2f}"
+            f" {idle / 1024:>12.1f} {peak / 1024:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
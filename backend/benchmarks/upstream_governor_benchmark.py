@@ -0,0 +1,139 @@
+"""
+Upstream admission control against a local stub that enforces a quota.
+
+The stub is an OpenAI-style chat endpoint (served in-process through
+httpx.ASGITransport) that enforces --quota-rpm over a sliding --window
+(shorter than a minute to keep runs short) and answers everything over it
+with 429 + Retry-After, like SambaNova does. A burst of --requests concurrent
+calls is sent through three client setups:
+
+- direct: no governor, every 429 reaches the caller (the previous behavior)
+- retry_only: Retry-After-aware retries (which also pause admission), no pacing
+- governed: token-bucket pacing at the quota plus retries
+
+and the benchmark reports how many calls succeeded, how many 429s reached the
+caller, the upstream 429s provoked, and the achieved rate vs the quota.
+
+Usage:
+    python -m benchmarks.upstream_governor_benchmark [--quota-rpm 600] [--window 5] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import time
+
+os.environ.setdefault("SAMBANOVA_API_KEY", "benchmark")
+os.environ.setdefault("SAMBANOVA_BASE_URL", "http://localhost:9/v1")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+
+from app.services.upstream_governor import GovernedAsyncTransport, UpstreamGovernor  # noqa: E402
+
+
+class QuotaStub:
+    """ASGI app allowing quota_rpm requests per minute, counted over a sliding window."""
+
+    def __init__(self, quota_rpm: int, window_seconds: float, latency_seconds: float):
+        self.limit = max(1, int(quota_rpm * window_seconds / 60))
+        self.window_seconds = window_seconds
+        self.latency_seconds = latency_seconds
+        self.accepted: collections.deque[float] = collections.deque()
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        now = time.monotonic()
+        while self.accepted and self.accepted[0] <= now - self.window_seconds:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.limit:
+            self.rejected += 1
+            retry_after = self.accepted[0] + self.window_seconds - now
+            status, headers = 429, [(b"retry-after", f"{retry_after:.3f}".encode())]
+            body = {"error": {"message": "Rate limit exceeded", "type": "rate_limit_exceeded"}}
+        else:
+            self.accepted.append(now)
+            await asyncio.sleep(self.latency_seconds)
+            status, headers = 200, []
+            body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}}]}
+        payload = json.dumps(body).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"), *headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+
+async def run(setup: str, args: argparse.Namespace) -> dict:
+    stub = QuotaStub(args.quota_rpm, args.window, args.latency)
+    transport: httpx.AsyncBaseTransport = httpx.ASGITransport(app=stub)
+    governor = None
+    if setup != "direct":
+        governor = UpstreamGovernor(
+            "stub",
+            requests_per_minute=args.quota_rpm if setup == "governed" else 0,
+            # Keep the bucket's burst within the stub's window
+            burst_seconds=args.window / 2,
+            max_queued=args.requests,
+            admission_timeout_seconds=args.timeout,
+            max_retries=10,
+        )
+        transport = GovernedAsyncTransport(transport, governor)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+
+        async def call() -> tuple[int, float]:
+            start = time.perf_counter()
+            response = await client.post("/v1/chat/completions", json={"messages": [], "max_tokens": 16})
+            return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    ok_latencies = sorted(latency for status, latency in results if status == 200)
+    succeeded = len(ok_latencies)
+    return {
+        "setup": setup,
+        "succeeded": succeeded,
+        "caller_429": sum(1 for status, _ in results if status == 429),
+        "upstream_429": stub.rejected,
+        "seconds": elapsed,
+        "achieved_rpm": succeeded / elapsed * 60,
+        "p95_latency": ok_latencies[int(0.95 * (succeeded - 1))] if ok_latencies else None,
+        "governor": governor.stats() if governor else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota-rpm", type=int, default=600)
+    parser.add_argument("--window", type=float, default=5, help="Stub quota window in seconds")
+    parser.add_argument("--requests", type=int, default=200, help="Concurrent calls in the burst")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response time in seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="Admission timeout per call")
+    args = parser.parse_args()
+
+    print(f"burst of {args.requests} calls against a {args.quota_rpm} rpm quota")
+    print(
+        f"{'setup':>12} {'ok':>5} {'caller 429':>11} {'upstream 429':>13}"
+        f" {'seconds':>8} {'rpm':>7} {'p95 s':>7}"
+    )
+    for setup in ("direct", "retry_only", "governed"):
+        result = asyncio.run(run(setup, args))
+        p95 = f"{result['p95_latency']:.2f}" if result["p95_latency"] is not None else "-"
+        print(
+            f"{setup:>12} {result['succeeded']:>5} {result['caller_429']:>11} {result['upstream_429']:>13}"
+            f" {result['seconds']:>8.2f} {result['achieved_rpm']:>7.0f} {p95:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
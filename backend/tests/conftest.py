@@ -0,0 +1,104 @@
+"""
+Request-level tests run the app in-process against benchmarks.stub_upstreams.
+
+The stub answers for SambaNova (chat) and Gemini on a free local port, and
+Whisper is replaced by the stub transcriber, so no API keys or network are
+needed. Settings are read at import time, so the environment is set here,
+before the app is imported; runtime files (uploads, caches) go to a
+temporary working directory.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = BACKEND_DIR.parent / "test_example"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+STUB_URL = f"http://127.0.0.1:{_free_port()}"
+
+os.environ.update(
+    {
+        "SAMBANOVA_API_KEY": "test",
+        "SAMBANOVA_BASE_URL": f"{STUB_URL}/v1",
+        "GOOGLE_API_KEY": "test",
+        "GEMINI_BASE_URL": STUB_URL,
+        "TRANSCRIPTION_BACKEND": "stub",
+        "RECORDING_ARCHIVE_ENABLED": "false",
+        "PREWARM_SERVICES": "false",
+    }
+)
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
+
+
+@pytest.fixture(scope="session")
+def stub_upstreams():
+    from benchmarks.load_benchmark import wait_for
+
+    port = STUB_URL.rsplit(":", 1)[1]
+    stub = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.stub_upstreams", "--port", port,
+            "--ttft-ms", "0", "--tokens-per-second", "10000", "--gemini-ms", "0",
+        ],
+        cwd=BACKEND_DIR,
+    )  # fmt: skip
+    try:
+        wait_for(f"{STUB_URL}/docs", stub)
+        yield STUB_URL
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+@pytest.fixture(scope="session")
+def client(stub_upstreams):
+    # One app lifespan for the whole run, as in production: shutdown closes
+    # the shared upstream pools that cached model clients hold on to
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def sample_audio() -> bytes:
+    return (EXAMPLES_DIR / "sample.mp3").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def sample_image() -> bytes:
+    return (EXAMPLES_DIR / "sample.png").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def sample_pdf() -> bytes:
+    return (EXAMPLES_DIR / "sample.pdf").read_bytes()
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Split a text/event-stream body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture(scope="session")
+def sse_events():
+    return parse_sse
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from app.services import llama_assembly_agent
+from app.services.agent_cache import AgentCache, agent_cache, manual_content_hash
+from app.services.llama_assembly_agent import get_manual_agent
+from app.services.session_store import ManualSession, MemorySessionStore
+
+
+def make_session(session_id: str, manual_hash: str) -> ManualSession:
+    return ManualSession(
+        session_id=session_id,
+        manual_text="Step 1: attach the leg.",
+        filename="manual.pdf",
+        created_at=datetime.now(),
+        manual_hash=manual_hash,
+    )
+
+
+def test_least_recently_used_agent_is_evicted():
+    cache = AgentCache(max_entries=2)
+    cache.put("a", "agent-a")
+    cache.put("b", "agent-b")
+    assert cache.get("a") == "agent-a"
+    cache.put("c", "agent-c")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("agent-a", "agent-c")
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+    assert cache.stats()["entries"] == 2
+
+
+def test_system_prompt_is_built_once_per_manual(monkeypatch):
+    built = []
+    build_system_prompt = llama_assembly_agent.build_system_prompt
+    monkeypatch.setattr(
+        llama_assembly_agent, "build_system_prompt", lambda *args: built.append(args) or build_system_prompt(*args)
+    )
+    manual = "Agent cache manual. Step 1: attach the leg."
+
+    first = get_manual_agent(manual)
+    assert get_manual_agent(manual) is first
+    assert get_manual_agent(manual + " Step 2: attach the seat.") is not first
+    assert len(built) == 2
+
+
+def test_agent_is_released_with_the_last_session_of_its_manual():
+    manual_hash = manual_content_hash("Shared manual for the release test")
+    store = MemorySessionStore(ttl_seconds=3600, max_entries=2, max_bytes=1 << 20)
+    store.create(make_session("s1", manual_hash))
+    store.create(make_session("s2", manual_hash))
+    agent_cache.put(manual_hash, "agent")
+
+    # Each new session evicts the least recently used one
+    store.create(make_session("s3", "other-manual"))
+    assert agent_cache.get(manual_hash) == "agent"
+    store.create(make_session("s4", "other-manual"))
+    assert agent_cache.get(manual_hash) is None
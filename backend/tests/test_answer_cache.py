@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services.answer_cache import AnswerCache
+from app.services.session_manager import create_session, get_session
+
+MANUAL = "manual-hash"
+
+
+def new_cache() -> AnswerCache:
+    return AnswerCache(ttl_seconds=60, max_entries=10, max_bytes=1 << 20, min_similarity=0.6)
+
+
+def test_reworded_question_shares_the_answer():
+    cache = new_cache()
+    cache.put(MANUAL, "Which screw is part 104?", "The M4 screw.", [])
+
+    assert cache.get(MANUAL, "which screw is part 104").answer == "The M4 screw."
+    assert cache.get(MANUAL, "What screw is part 104?").answer == "The M4 screw."
+    assert (cache.exact_hits, cache.similar_hits) == (1, 1)
+
+
+def test_different_numbers_or_manuals_miss():
+    cache = new_cache()
+    cache.put(MANUAL, "What do I do in step 3?", "Attach the legs.", [])
+
+    assert cache.get(MANUAL, "What do I do in step 4?") is None
+    assert cache.get("other-manual", "What do I do in step 3?") is None
+    assert cache.misses == 2
+
+
+@pytest.fixture
+def answer_cache_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "answer_cache_enabled", True)
+
+
+async def two_sessions() -> tuple[str, str]:
+    # Same manual content, so both sessions share cached answers
+    manual = f"Assembly manual {uuid.uuid4()}. Step 1: attach the legs with four M4 screws."
+    return await create_session(manual, "manual.pdf"), await create_session(manual, "manual.pdf")
+
+
+def test_repeated_question_is_answered_from_the_cache(client, answer_cache_enabled):
+    first, second = asyncio.run(two_sessions())
+    params = {"message": "How do I attach the legs?"}
+
+    fresh = client.post("/api/chat", params={**params, "session_id": first}).json()
+    cached = client.post("/api/chat", params={**params, "session_id": second}).json()
+
+    assert fresh["cached"] is False
+    assert cached == {"response": fresh["response"], "cached": True}
+    # The cached turn is recorded like a model run, so follow-ups have its context
+    history = asyncio.run(get_session(second)).conversation_history
+    assert len(history) == len(asyncio.run(get_session(first)).conversation_history) > 0
+
+
+def test_streamed_answers_fill_and_replay_the_cache(client, answer_cache_enabled, sse_events):
+    first, second = asyncio.run(two_sessions())
+    params = {"message": "Which screws hold the legs?", "stream": "true"}
+
+    fresh = sse_events(client.post("/api/chat", params={**params, "session_id": first}).text)
+    cached = sse_events(client.post("/api/chat", params={**params, "session_id": second}).text)
+
+    assert fresh[-1][0] == "done" and fresh[-1][1]["cached"] is False
+    answer = fresh[-1][1]["response"]
+    assert cached == [("delta", {"text": answer}), ("done", {"response": answer, "cached": True})]
+    assert asyncio.run(get_session(second)).conversation_history
+
+
+def test_voice_chat_shares_the_cache(client, sample_audio, answer_cache_enabled, sse_events):
+    first, second = asyncio.run(two_sessions())
+    files = {"file": ("sample.mp3", sample_audio, "audio/mpeg")}
+
+    fresh = client.post("/api/voice-chat", params={"session_id": first}, files=files).json()
+    streamed = client.post("/api/voice-chat", params={"session_id": second, "stream": "true"}, files=files)
+
+    assert fresh["cached"] is False
+    done = sse_events(streamed.text)[-1]
+    assert done == ("done", {**fresh, "cached": True})
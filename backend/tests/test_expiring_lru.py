@@ -0,0 +1,76 @@
+from app.services.expiring_lru import ExpiringLRU
+
+
+def make_lru(now: list[float], evicted: list, max_entries: int = 10, max_bytes: int = 1 << 20) -> ExpiringLRU:
+    return ExpiringLRU(
+        ttl_seconds=10,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        sizeof=len,
+        on_evict=lambda key, value: evicted.append(key),
+        clock=lambda: now[0],
+    )
+
+
+def test_entries_expire_after_the_ttl_even_when_read():
+    now, evicted = [0.0], []
+    lru = make_lru(now, evicted)
+    lru.set("a", "value")
+
+    now[0] = 9.9
+    assert lru.get("a") == "value"
+    now[0] = 10.0
+    assert lru.get("a") is None
+    assert evicted == ["a"]
+    assert (lru.expirations, lru.total_bytes) == (1, 0)
+
+
+def test_least_recently_used_entries_are_evicted_by_count_and_bytes():
+    now, evicted = [0.0], []
+    lru = make_lru(now, evicted, max_entries=2, max_bytes=10)
+    lru.set("a", "aaa")
+    lru.set("b", "bbb")
+    lru.get("a")
+    lru.set("c", "ccc")
+    assert evicted == ["b"]
+
+    lru.set("d", "dddddd")
+    # Over both limits; "a" is now the least recently used
+    assert evicted == ["b", "a"]
+    assert ("c" in lru, "d" in lru) == (True, True)
+    assert (lru.evictions, lru.total_bytes) == (2, 9)
+
+
+def test_resize_evicts_when_an_entry_grows():
+    now, evicted = [0.0], []
+    lru = make_lru(now, evicted, max_bytes=10)
+    lru.set("a", ["x"] * 4)
+    lru.set("b", ["y"] * 4)
+
+    # Values mutated in place (like a session's history) are re-measured by resize()
+    lru.get("b").extend(["y"] * 4)
+    lru.resize("b")
+
+    assert evicted == ["a"]
+    assert lru.total_bytes == 8
+
+
+def test_sweep_only_removes_expired_entries_and_skips_replaced_ones():
+    now, evicted = [0.0], []
+    lru = make_lru(now, evicted)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    now[0] = 5
+    lru.set("b", "3")  # replaced: its first expiry is stale
+    lru.set("c", "4")
+    assert lru.pop("c") == "4"  # popped entries are not reported as evicted
+
+    now[0] = 12
+    assert lru.sweep() == 1
+    assert evicted == ["a"]
+    assert lru.get("b") == "3"
+
+    now[0] = 15
+    assert lru.sweep() == 1
+    assert evicted == ["a", "b"]
+    assert len(lru) == 0
@@ -0,0 +1,128 @@
+import asyncio
+import base64
+import io
+
+from PIL import Image, ImageDraw
+
+from app.services.frame_pipeline import DecodedFrame, FramePipeline, FrameStage, LatestSlot
+from app.services.frame_stages import outline_frame
+
+
+def jpeg_frame(box: tuple[int, int, int, int] | None = None, size: tuple[int, int] = (320, 240)) -> bytes:
+    image = Image.new("RGB", size, "black")
+    if box:
+        ImageDraw.Draw(image).rectangle(box, fill="white")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def data_url(frame: bytes) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(frame).decode()
+
+
+async def wait_until(condition, timeout: float = 5.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_latest_slot_keeps_newest_and_counts_replaced():
+    async def scenario():
+        slot = LatestSlot()
+        for item in (1, 2, 3):
+            slot.put(item)
+        return await slot.get(), slot.dropped
+
+    assert asyncio.run(scenario()) == (3, 2)
+
+
+def test_slow_stage_only_sees_latest_frames():
+    analyzed = []
+    gate = asyncio.Event()
+
+    async def analyze(frame: DecodedFrame) -> dict:
+        analyzed.append(frame.client_timestamp)
+        await gate.wait()
+        gate.clear()
+        return {"timestamp": frame.client_timestamp}
+
+    async def scenario():
+        sent = []
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+
+        pipeline = FramePipeline(send, stages=[FrameStage("slow", "sam", "segmentation", analyze)], queue_size=1)
+        pipeline.start()
+        frame = jpeg_frame()
+
+        # Frame 1 reaches the stage, which then blocks
+        pipeline.submit("sam", frame, 1)
+        await wait_until(lambda: analyzed == [1])
+        # Frames 2-4 replace each other in the channel slot before the decoder sees them
+        for timestamp in (2, 3, 4):
+            pipeline.submit("sam", frame, timestamp)
+        await wait_until(lambda: pipeline._stage_queues["slow"].full())
+        # Frame 5 pushes the queued frame 4 out of the full stage queue
+        pipeline.submit("sam", frame, 5)
+        await wait_until(lambda: pipeline.stats()["stages"]["slow"]["dropped"] == 1)
+
+        gate.set()
+        await wait_until(lambda: analyzed == [1, 5])
+        gate.set()
+        await wait_until(lambda: len(sent) == 2)
+        stats = pipeline.stats()
+        await pipeline.close()
+        return sent, stats
+
+    sent, stats = asyncio.run(scenario())
+
+    assert [message["payload"]["timestamp"] for message in sent] == [1, 5]
+    assert stats["received"] == 5
+    assert stats["channels"]["sam"]["dropped"] == 2
+    assert stats["stages"]["slow"]["dropped"] == 1
+    assert stats["stages"]["slow"]["processed"] == 2
+
+
+def test_frames_without_a_stage_are_ignored():
+    async def scenario():
+        async def send(message: dict) -> None:
+            pass
+
+        pipeline = FramePipeline(send, stages=[])
+        pipeline.submit("sam", jpeg_frame())
+        return pipeline.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert (stats["received"], stats["ignored"]) == (1, 1)
+
+
+def test_outline_is_reported_in_sent_frame_coordinates():
+    image = Image.open(io.BytesIO(jpeg_frame(box=(80, 60, 159, 119), size=(640, 480))))
+    frame = DecodedFrame(image.convert("RGB").resize((320, 240)), (640, 480), 42, 0.0)
+
+    payload = outline_frame(frame)
+
+    assert payload["timestamp"] == 42
+    [box] = payload["boxes"]
+    assert abs(box["x"] - 80) <= 6 and abs(box["y"] - 60) <= 6
+    assert abs(box["width"] - 80) <= 12 and abs(box["height"] - 60) <= 12
+
+
+def test_video_socket_answers_both_channels(client):
+    frame = data_url(jpeg_frame(box=(100, 80, 200, 160)))
+
+    with client.websocket_connect("/ws/video") as websocket:
+        websocket.send_json({"type": "frame", "timestamp": 1, "data": {"type": "sam", "frame": frame}})
+        segmentation = websocket.receive_json()
+        websocket.send_json({"type": "frame", "timestamp": 2, "data": {"type": "dinov3", "frame": frame}})
+        descriptor = websocket.receive_json()
+
+    assert segmentation["type"] == "segmentation"
+    assert len(segmentation["payload"]["boxes"]) == 1
+    assert descriptor["type"] == "dinov3"
+    assert len(descriptor["payload"]["hash"]) == 16
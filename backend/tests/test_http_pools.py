@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services.http_pools import HttpPools
+
+
+def test_clients_are_built_once_on_first_use():
+    pools = HttpPools(http2=False)
+    assert not any(pool["created"] for pool in pools.stats()["pools"].values())
+
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(pools.sambanova_sync)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    assert pools.sambanova is pools.sambanova
+    assert {name for name, pool in pools.stats()["pools"].items() if pool["created"]} == {"sambanova", "sambanova_sync"}
+    asyncio.run(pools.close())
+
+
+def test_warm_up_leaves_idle_connections_for_later_requests(stub_upstreams):
+    pools = HttpPools(http2=False)
+
+    async def scenario():
+        await pools.warm_up(connections=2)
+        warmed = pools.stats()["pools"]
+        await pools.sambanova.get(f"{stub_upstreams}/docs")
+        after_request = pools.stats()["pools"]
+        await pools.close()
+        return warmed, after_request
+
+    warmed, after_request = asyncio.run(scenario())
+
+    assert all(pool["warmed_up"] for pool in warmed.values())
+    assert (warmed["sambanova"]["connections"], warmed["sambanova"]["idle"]) == (2, 2)
+    assert warmed["sambanova_sync"]["requests"] == warmed["sambanova_sync"]["responses"] == 2
+    # The request reused a warm connection instead of opening a third
+    assert after_request["sambanova"]["connections"] == 2
+    assert after_request["sambanova"]["requests"] == 3
+
+
+def test_failed_warm_up_is_reported_not_raised(monkeypatch):
+    monkeypatch.setattr(settings, "sambanova_base_url", "http://127.0.0.1:9/v1")
+    monkeypatch.setattr(settings, "gemini_base_url", "http://127.0.0.1:9")
+    pools = HttpPools(http2=False)
+
+    async def scenario():
+        await pools.warm_up(connections=1)
+        await pools.close()
+
+    asyncio.run(scenario())
+
+    assert pools.warmed_up == {"sambanova": False, "sambanova_sync": False, "gemini": False}
@@ -0,0 +1,68 @@
+import random
+
+from app.services.image_cache import ImageCache, hamming_distance
+
+SIZE = (640, 480)
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def test_near_duplicate_found_within_session_only():
+    cache = ImageCache(max_bytes=1 << 20, max_distance=3)
+    cache.put("photo-a", "data:a", 0b1011, SIZE, scope="session-1")
+
+    assert cache.get_similar(0b1010, SIZE, "session-1") == "data:a"
+    assert cache.get_similar(0b1010, SIZE, "session-2") is None
+    assert cache.get_similar(0b1010, SIZE, None) is None
+
+
+def test_exact_match_is_shared_and_joins_the_session():
+    cache = ImageCache(max_bytes=1 << 20, max_distance=3)
+    cache.put("photo-a", "data:a", 0b1011, SIZE, scope="session-1")
+
+    assert cache.get_exact("photo-a", "session-2") == "data:a"
+    assert cache.get_similar(0b1010, SIZE, "session-2") == "data:a"
+
+
+def test_near_duplicate_requires_same_size():
+    cache = ImageCache(max_bytes=1 << 20, max_distance=3)
+    cache.put("photo-a", "data:a", 0b1011, SIZE, scope="session-1")
+
+    assert cache.get_similar(0b1011, (480, 640), "session-1") is None
+
+
+def test_band_index_matches_a_full_scan():
+    rng = random.Random(7)
+    cache = ImageCache(max_bytes=1 << 30, max_distance=3)
+    hashes = {f"photo-{i}": rng.getrandbits(64) for i in range(200)}
+    for key, value in hashes.items():
+        cache.put(key, f"data:{key}", value, SIZE, scope="session")
+
+    for key, value in list(hashes.items())[:50]:
+        for distance in range(5):
+            query = flip_bits(value, distance, rng)
+            closest = min(hashes, key=lambda k: hamming_distance(hashes[k], query))
+            expected = f"data:{closest}" if hamming_distance(hashes[closest], query) <= 3 else None
+            assert cache.get_similar(query, SIZE, "session") == expected
+
+
+def test_eviction_removes_index_entries():
+    cache = ImageCache(max_bytes=10, max_distance=3)
+    cache.put("photo-a", "data:aaaa", 0, SIZE, scope="session")
+    cache.put("photo-b", "data:bbbb", (1 << 64) - 1, SIZE, scope="session")
+
+    assert cache.get_similar(0, SIZE, "session") is None
+    assert cache.get_similar((1 << 64) - 1, SIZE, "session") == "data:bbbb"
+    assert all("photo-a" not in keys for keys in cache._bands.values())
+
+
+def test_near_matching_disabled():
+    cache = ImageCache(max_bytes=1 << 20, max_distance=-1)
+    cache.put("photo-a", "data:a", 0b1011, SIZE, scope="session-1")
+
+    assert cache.get_similar(0b1011, SIZE, "session-1") is None
+    assert cache.get_exact("photo-a", "session-1") == "data:a"
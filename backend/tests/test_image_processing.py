@@ -0,0 +1,62 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.services.image_cache import ImageCache
+from app.services.image_processing import cached_image_to_data_url, image_to_data_url
+
+
+def encode(image: Image.Image, format: str) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def decode_data_url(data_url: str) -> Image.Image:
+    prefix = "data:image/jpeg;base64,"
+    assert data_url.startswith(prefix)
+    return Image.open(BytesIO(base64.b64decode(data_url[len(prefix) :])))
+
+
+@pytest.mark.parametrize(
+    ("mode", "format"),
+    [
+        ("RGB", "PNG"),
+        ("L", "PNG"),
+        ("RGBA", "PNG"),
+        ("LA", "PNG"),
+        ("P", "GIF"),
+        ("I;16", "PNG"),
+        ("I", "PNG"),
+        ("1", "PNG"),
+        ("CMYK", "JPEG"),
+        ("RGBA", "WEBP"),
+    ],
+)
+def test_any_image_mode_becomes_jpeg(mode, format):
+    image_bytes = encode(Image.new(mode, (64, 48)), format)
+
+    result = decode_data_url(image_to_data_url(image_bytes))
+
+    assert result.format == "JPEG"
+    assert result.mode in ("RGB", "L")
+    assert result.size == (64, 48)
+
+
+def test_palette_image_with_transparency_becomes_jpeg():
+    image = Image.new("P", (32, 32))
+    image.info["transparency"] = 0
+
+    result = decode_data_url(image_to_data_url(encode(image, "PNG")))
+
+    assert result.mode == "RGB"
+
+
+def test_large_images_are_downscaled():
+    image_bytes = encode(Image.new("RGB", (3000, 1500), "white"), "JPEG")
+
+    result = decode_data_url(cached_image_to_data_url(image_bytes, cache=ImageCache(1 << 20, 3)))
+
+    assert max(result.size) == 1024
@@ -0,0 +1,61 @@
+import asyncio
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from app.core.config import settings
+from app.services import llama_assembly_agent
+from app.services.llama_assembly_agent import run_agent_with_files
+from app.services.session_manager import append_conversation_messages, create_session, get_session
+
+MANUAL = """# Chair manual
+
+## Tools
+Allen key and a Phillips screwdriver.
+
+## Step 1: Legs
+Attach the four legs to the seat with the M6 bolts.
+
+## Step 2: Backrest
+Slide the backrest onto the rear legs and tighten the two M4 screws.
+"""
+
+
+def test_retrieved_sections_are_neither_stored_nor_resent(monkeypatch):
+    sent = []
+
+    def model(messages: list, info: AgentInfo) -> ModelResponse:
+        sent.append((messages, info.instructions))
+        return ModelResponse(parts=[TextPart("Use the Allen key.")])
+
+    monkeypatch.setattr(settings, "manual_context_mode", "retrieval")
+    monkeypatch.setattr(llama_assembly_agent, "get_model", lambda: FunctionModel(model))
+
+    async def two_turns():
+        session_id = await create_session(MANUAL, "chair.pdf")
+        for question in ("Which bolts hold the legs?", "How do I attach the backrest?"):
+            session = await get_session(session_id)
+            result = await run_agent_with_files(
+                question,
+                manual_text=session.manual_text,
+                message_history=session.conversation_history,
+                manual_index=session.manual_index,
+            )
+            await append_conversation_messages(session_id, result.new_messages())
+        return (await get_session(session_id)).conversation_history
+
+    history = asyncio.run(two_turns())
+
+    # Each run gets the sections for its own question as instructions
+    assert "M6 bolts" in sent[0][1]
+    assert "backrest" in sent[1][1]
+    # The second request carries the first question as asked, without its sections
+    prompts = [
+        part.content
+        for message in sent[1][0]
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, UserPromptPart)
+    ]
+    assert prompts == ["Which bolts hold the legs?", "How do I attach the backrest?"]
+    assert all(message.instructions is None for message in history if isinstance(message, ModelRequest))
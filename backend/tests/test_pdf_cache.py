@@ -0,0 +1,58 @@
+import os
+
+from app.services.pdf_cache import PdfTextCache
+
+
+def test_hit_and_miss(tmp_path):
+    cache = PdfTextCache(tmp_path, max_bytes=1 << 20)
+    key = cache.make_key(b"%PDF-1.7 manual", "v1")
+
+    assert cache.get(key) is None
+    cache.put(key, "Step 1: attach the legs.")
+
+    assert cache.get(key) == "Step 1: attach the legs."
+    # Another extraction version is another entry
+    assert cache.get(cache.make_key(b"%PDF-1.7 manual", "v2")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PdfTextCache(tmp_path, max_bytes=25)
+    cache.put("a", "a" * 10)
+    cache.put("b", "b" * 10)
+    cache.get("a")
+    cache.put("c", "c" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+    assert cache.get("c") == "c" * 10
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.txt", "c.txt"]
+    assert cache.stats()["bytes"] == 20
+    assert cache.evictions == 1
+
+
+def test_put_does_not_list_the_directory(tmp_path, monkeypatch):
+    cache = PdfTextCache(tmp_path, max_bytes=1 << 20)
+    cache.put("a", "text")
+
+    def fail(*args):
+        raise AssertionError("directory scanned again")
+
+    monkeypatch.setattr(type(tmp_path), "glob", fail)
+    for index in range(5):
+        cache.put(f"entry-{index}", "text")
+    assert cache.stats()["bytes"] == 24
+
+
+def test_entries_of_earlier_runs_are_loaded_in_mtime_order(tmp_path):
+    for age, key in enumerate(["newest", "middle", "oldest"]):
+        path = tmp_path / f"{key}.txt"
+        path.write_text("x" * 10)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    cache = PdfTextCache(tmp_path, max_bytes=35)
+    cache.put("new", "x" * 10)
+
+    assert not (tmp_path / "oldest.txt").exists()
+    assert cache.get("middle") is not None
+    assert cache.stats()["bytes"] == 30
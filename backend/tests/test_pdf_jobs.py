@@ -0,0 +1,99 @@
+import asyncio
+import json
+from io import BytesIO
+
+from pypdf import PdfWriter
+
+from app.services.pdf_jobs import pdf_jobs
+from app.services.session_manager import create_pending_session, get_session
+
+
+def blank_pdf(pages: int, width: int = 595) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=width, height=842)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def submit(client, pdf_bytes: bytes):
+    return client.post("/api/pdf-jobs", files={"file": ("manual.pdf", pdf_bytes, "application/pdf")})
+
+
+def read_events(client, url: str) -> list[tuple[str, dict]]:
+    events = []
+    with client.stream("GET", url) as response:
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: ") :])))
+                if event == "done":
+                    break
+    return events
+
+
+def test_pdf_job_streams_text_into_session(client):
+    response = submit(client, blank_pdf(24))
+    assert response.status_code == 202
+    job = response.json()
+
+    events = read_events(client, job["events_url"])
+
+    event, done = events[-1]
+    assert event == "done"
+    assert done["status"] == "succeeded"
+    streamed = "".join(data["delta"] for event, data in events if event == "text")
+    assert len(streamed) == done["text_length"] > 0
+    assert asyncio.run(get_session(job["session_id"])).manual_text == streamed
+
+    polled = client.get(job["status_url"], params={"offset": 10}).json()
+    assert polled["text"] == streamed[10:]
+
+    chat = client.post("/api/chat", params={"message": "What is step 1?", "session_id": job["session_id"]})
+    assert chat.status_code == 200
+
+
+def test_pdf_job_rejects_non_pdf(client):
+    response = client.post("/api/pdf-jobs", files={"file": ("notes.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 400
+
+
+def test_pdf_job_unknown(client):
+    assert client.get("/api/pdf-jobs/missing").status_code == 404
+    assert client.delete("/api/pdf-jobs/missing").status_code == 404
+
+
+def test_pdf_job_capacity(client, monkeypatch):
+    monkeypatch.setattr(pdf_jobs, "max_active", 0)
+
+    response = submit(client, blank_pdf(2))
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"]
+
+
+def test_pdf_job_cancel_while_queued(client, monkeypatch):
+    # No free workers, so the job stays queued until cancelled
+    monkeypatch.setattr(pdf_jobs, "_workers", asyncio.Semaphore(0))
+    job = submit(client, blank_pdf(3, width=600)).json()
+
+    cancelled = client.delete(f"/api/pdf-jobs/{job['job_id']}").json()
+
+    assert cancelled["status"] == "cancelled"
+    assert client.get(job["status_url"]).json()["status"] == "cancelled"
+
+
+def test_pending_sessions_do_not_share_manual_hash():
+    async def scenario():
+        first = await get_session(await create_pending_session("a.pdf"))
+        second = await get_session(await create_pending_session("b.pdf"))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.manual_text == second.manual_text == ""
+    assert first.manual_hash != second.manual_hash
@@ -0,0 +1,74 @@
+import asyncio
+import re
+from io import BytesIO
+
+import pytest
+from pydantic_ai.exceptions import ModelHTTPError
+from pypdf import PdfWriter
+
+from app.services import gemini_pdf_agent
+from app.services.gemini_pdf_agent import extract_page_ranges
+from app.services.pdf_pages import split_pdf
+
+PAGES_RE = re.compile(r"pages (\d+)-(\d+) of a")
+
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_split_pdf_cuts_page_ranges_in_order():
+    total, ranges = split_pdf(blank_pdf(14), pages_per_range=6)
+
+    assert total == 14
+    assert [(r.first_page, r.last_page) for r in ranges] == [(1, 6), (7, 12), (13, 14)]
+    # Small documents are not split
+    assert split_pdf(blank_pdf(5), pages_per_range=6, min_pages=12) == (5, [])
+
+
+def test_ranges_are_joined_in_page_order_and_truncated_ones_split(monkeypatch):
+    async def fake_extraction(prompt, pdf_bytes):
+        first, last = map(int, PAGES_RE.search(prompt).groups())
+        # Later ranges answer first; ranges over 3 pages hit the output limit
+        await asyncio.sleep((20 - first) / 1000)
+        return f"pages {first}-{last}", last - first + 1 > 3
+
+    monkeypatch.setattr(gemini_pdf_agent, "_run_extraction", fake_extraction)
+    _, ranges = split_pdf(blank_pdf(14), pages_per_range=6)
+    progress = []
+
+    text = asyncio.run(extract_page_ranges(ranges, 14, on_progress=lambda *args: progress.append(args)))
+
+    assert text.split("\n\n") == ["pages 1-3", "pages 4-6", "pages 7-9", "pages 10-12", "pages 13-14"]
+    assert [(done, total) for done, total, _ in progress] == [(1, 3), (2, 3), (3, 3)]
+    assert progress[-1][2] == text
+
+
+def test_failed_range_cancels_and_waits_for_the_others(monkeypatch):
+    running = set()
+
+    async def fake_extraction(prompt, pdf_bytes):
+        first = int(PAGES_RE.search(prompt).group(1))
+        running.add(first)
+        try:
+            if first == 7:
+                raise ModelHTTPError(400, "gemini", {"message": "bad range"})
+            await asyncio.sleep(10)
+            return "text", False
+        finally:
+            await asyncio.sleep(0.01)
+            running.discard(first)
+
+    monkeypatch.setattr(gemini_pdf_agent, "_run_extraction", fake_extraction)
+    _, ranges = split_pdf(blank_pdf(18), pages_per_range=6)
+
+    with pytest.raises(ModelHTTPError):
+        asyncio.run(asyncio.wait_for(extract_page_ranges(ranges, 18), timeout=5))
+
+    # The other ranges unwound before the error was raised
+    assert running == set()
@@ -0,0 +1,14 @@
+import asyncio
+
+from app.services.session_manager import get_session
+
+
+def test_pdf_to_text_creates_session(client, sample_pdf):
+    response = client.post("/api/pdf-to-text", files={"file": ("sample.pdf", sample_pdf, "application/pdf")})
+
+    assert response.status_code == 200
+    body = response.json()
+    session = asyncio.run(get_session(body["session_id"]))
+    assert session.manual_text == body["text"]
+    # The default context mode sends the whole manual, so no index is built
+    assert session.manual_index is None
@@ -0,0 +1,52 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from app.services.prompt_budget import fit_history
+
+
+def turn(question: str, answer: str, system_prompt: str | None = None) -> list:
+    parts = [SystemPromptPart(system_prompt)] if system_prompt else []
+    return [ModelRequest(parts=[*parts, UserPromptPart(question)]), ModelResponse(parts=[TextPart(answer)])]
+
+
+def system_prompts(history) -> list[str]:
+    return [part.content for part in history[0].parts if isinstance(part, SystemPromptPart)]
+
+
+def test_history_kept_as_is_when_it_fits():
+    history = [*turn("hi", "hello", "manual v1"), *turn("next?", "step 2")]
+
+    kept, report = fit_history(history, "manual v1", "and then?", attachments=0, budget=0)
+
+    assert kept is history
+    assert report.trimmed_messages == 0
+
+
+def test_recorded_system_prompt_is_replaced_with_current_one():
+    # The session's manual grew (PDF job) after the first turn was recorded
+    history = [*turn("hi", "hello", "partial manual"), *turn("next?", "step 2")]
+
+    kept, report = fit_history(history, "full manual", "and then?", attachments=0, budget=0)
+
+    assert system_prompts(kept) == ["full manual"]
+    assert len(kept) == len(history)
+    assert system_prompts(history) == ["partial manual"]
+
+
+def test_trimming_keeps_newest_turns_and_system_prompt():
+    history = [*turn("first " * 50, "a", "manual"), *turn("second", "b"), *turn("third", "c")]
+
+    kept, report = fit_history(history, "manual", "fourth", attachments=0, budget=30)
+
+    assert [part.content for part in kept[-2].parts if isinstance(part, UserPromptPart)] == ["third"]
+    assert system_prompts(kept) == ["manual"]
+    assert report.trimmed_messages > 0
+    assert report.total_tokens <= 30
+
+
+def test_nothing_fits():
+    history = turn("long question " * 100, "long answer " * 100, "manual")
+
+    kept, report = fit_history(history, "manual", "short", attachments=0, budget=20)
+
+    assert kept is None
+    assert report.trimmed_messages == len(history)
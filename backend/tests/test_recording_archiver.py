@@ -0,0 +1,45 @@
+import asyncio
+
+from app.services.recording_archiver import RecordingArchiver
+
+
+def make_archiver(directory, queue_max_bytes: int) -> RecordingArchiver:
+    return RecordingArchiver(
+        directory,
+        enabled=True,
+        sample_rate=1.0,
+        queue_max_bytes=queue_max_bytes,
+        max_bytes=1 << 20,
+        max_age_seconds=3600,
+        retention_interval_seconds=60,
+    )
+
+
+def test_queue_is_bounded_by_bytes(tmp_path):
+    archiver = make_archiver(tmp_path, queue_max_bytes=10)
+
+    assert archiver.submit(b"a" * 6, "first.mp3")
+    assert not archiver.submit(b"b" * 6, "second.mp3")
+    assert archiver.submit(b"c" * 4, "third.wav")
+
+    stats = archiver.stats()
+    assert stats["queue_bytes"] == 10
+    assert stats["dropped"] == 1
+
+
+def test_written_recordings_free_queue_space(tmp_path):
+    archiver = make_archiver(tmp_path, queue_max_bytes=10)
+
+    async def scenario():
+        writer = asyncio.create_task(archiver.run())
+        assert archiver.submit(b"a" * 8, "first.mp3")
+        await archiver.flush(timeout=5)
+        assert archiver.submit(b"b" * 8, "second.mp3")
+        await archiver.flush(timeout=5)
+        writer.cancel()
+
+    asyncio.run(scenario())
+
+    assert archiver.stats()["queue_bytes"] == 0
+    assert archiver.written == 2
+    assert len(list(tmp_path.glob("recording_*.mp3"))) == 2
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+
+from app.services.session_store import ManualSession, SqliteSessionStore
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Runs in a separate process: reads the session, then appends a turn to it
+OTHER_WORKER = """
+import sys
+from pathlib import Path
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+from app.services.session_store import SqliteSessionStore
+
+store = SqliteSessionStore(Path(sys.argv[1]), ttl_seconds=3600, max_entries=100, max_bytes=1 << 30, build_index=False)
+session = store.get(sys.argv[2])
+print(session.manual_text, len(session.conversation_history))
+store.append_history(sys.argv[2], [ModelRequest(parts=[UserPromptPart(content="from the other worker")])])
+"""
+
+
+def make_store(db_path: Path, ttl_seconds: float = 3600) -> SqliteSessionStore:
+    return SqliteSessionStore(
+        db_path, ttl_seconds=ttl_seconds, max_entries=100, max_bytes=1 << 30, build_index=False
+    )
+
+
+def make_session(session_id: str, manual_text: str = "Step 1: attach the leg.") -> ManualSession:
+    return ManualSession(
+        session_id=session_id,
+        manual_text=manual_text,
+        filename="manual.pdf",
+        created_at=datetime.now(),
+        manual_hash=f"hash-{manual_text}",
+    )
+
+
+def user_message(content: str) -> ModelRequest:
+    return ModelRequest(parts=[UserPromptPart(content=content)])
+
+
+def test_sessions_are_shared_between_processes(tmp_path):
+    db_path = tmp_path / "sessions.db"
+    store = make_store(db_path)
+    store.create(make_session("s1"))
+    store.append_history("s1", [user_message("first turn")])
+
+    result = subprocess.run(
+        [sys.executable, "-c", OTHER_WORKER, str(db_path), "s1"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": str(BACKEND_DIR)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "Step 1: attach the leg. 1"
+    # This process decodes only the turn written by the other worker
+    history = store.get("s1").conversation_history
+    assert [message.parts[0].content for message in history] == ["first turn", "from the other worker"]
+
+
+def test_expired_sessions_are_hidden_and_swept(tmp_path):
+    db_path = tmp_path / "sessions.db"
+    store = make_store(db_path, ttl_seconds=0.2)
+    other_worker = make_store(db_path, ttl_seconds=0.2)
+    store.create(make_session("s1"))
+    assert other_worker.get("s1") is not None
+
+    time.sleep(0.3)
+
+    assert other_worker.get("s1") is None
+    assert not other_worker.append_history("s1", [user_message("too late")])
+    assert store.sweep() == 1
+    assert other_worker.stats()["entries"] == 0
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM manuals").fetchone()[0] == 0
+
+
+def test_calls_run_on_the_store_thread(tmp_path):
+    store = make_store(tmp_path / "sessions.db")
+
+    thread_name = asyncio.run(store.run(lambda: threading.current_thread().name))
+
+    assert thread_name.startswith("session-store")
+
+
+def test_waiting_for_another_writer_does_not_block_the_loop(tmp_path):
+    db_path = tmp_path / "sessions.db"
+    store = make_store(db_path)
+    store.create(make_session("s1"))
+    # Another worker holds the write lock for a while
+    other_worker = sqlite3.connect(db_path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        append = asyncio.create_task(store.run(store.append_history, "s1", [user_message("hello")]))
+        ticks = 0
+        while ticks < 10:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not append.done()
+        other_worker.execute("COMMIT")
+        return await append
+
+    assert asyncio.run(scenario())
+    assert len(store.get("s1").conversation_history) == 1
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def counting_work(calls: list, release: asyncio.Event, result="text"):
+    async def work():
+        calls.append(1)
+        await release.wait()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return work
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+        callers = [asyncio.create_task(flight.do("pdf", counting_work(calls, release))) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+        # Once finished, the key is released and the next call runs again
+        release_again = asyncio.Event()
+        release_again.set()
+        return results, await flight.do("pdf", counting_work(calls, release_again, "fresh"))
+
+    results, later = asyncio.run(scenario())
+
+    assert results == ["text"] * 5
+    assert later == "fresh"
+    assert len(calls) == 2
+    assert (flight.executed, flight.coalesced, flight.abandoned) == (2, 4, 0)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_every_caller_gets_the_error():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        release = asyncio.Event()
+        work = counting_work([], release, ValueError("corrupt PDF"))
+        callers = [asyncio.create_task(flight.do("pdf", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+
+    assert [str(error) for error in errors] == ["corrupt PDF"] * 3
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+        leaving = asyncio.create_task(flight.do("pdf", counting_work(calls, release)))
+        staying = asyncio.create_task(flight.do("pdf", counting_work(calls, release)))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return leaving, await staying
+
+    leaving, result = asyncio.run(scenario())
+
+    assert leaving.cancelled()
+    assert result == "text"
+    assert (len(calls), flight.abandoned) == (1, 1)
+
+
+@pytest.mark.parametrize("cancel_if_abandoned, finished", [(False, True), (True, False)])
+def test_abandoned_call(cancel_if_abandoned, finished):
+    flight = SingleFlight("test")
+    done = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        done.append(1)
+        return "text"
+
+    async def scenario():
+        caller = asyncio.create_task(flight.do("pdf", work, cancel_if_abandoned))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+        return flight.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 0
+    # Without cancel_if_abandoned the work still finishes (e.g. to fill the PDF cache)
+    assert bool(done) is finished
@@ -0,0 +1,77 @@
+from contextlib import asynccontextmanager
+
+from pydantic_ai.exceptions import ModelHTTPError
+
+from app.api import llama_assembly_chat, llama_assembly_voice_chat
+
+
+def failing_stream(error: Exception):
+    @asynccontextmanager
+    async def stream_agent_with_files(*args, **kwargs):
+        raise error
+        yield
+
+    return stream_agent_with_files
+
+
+def test_chat_stream_sends_deltas_then_done(client, sse_events):
+    response = client.post("/api/chat", params={"message": "Hello", "stream": "true"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    names = [name for name, _ in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"delta"}
+    done = events[-1][1]
+    assert done["cached"] is False
+    assert "".join(data["text"] for _, data in events[:-1]) == done["response"]
+
+
+def test_voice_chat_stream_sends_transcription_first(client, sample_audio, sse_events):
+    response = client.post(
+        "/api/voice-chat", params={"stream": "true"}, files={"file": ("sample.mp3", sample_audio, "audio/mpeg")}
+    )
+
+    assert response.status_code == 200
+    assert "transcribe;dur=" in response.headers["server-timing"]
+    events = sse_events(response.text)
+    assert events[0] == ("transcription", {"transcription": events[0][1]["transcription"], "filename": "sample.mp3"})
+    assert "stub transcription" in events[0][1]["transcription"]
+    assert {name for name, _ in events[1:-1]} == {"delta"}
+    name, done = events[-1]
+    assert name == "done"
+    assert done["transcription"] == events[0][1]["transcription"]
+    assert "".join(data["text"] for _, data in events[1:-1]) == done["response"]
+
+
+def test_chat_stream_reports_model_errors_in_band(client, sse_events, monkeypatch):
+    error = ModelHTTPError(429, "Llama-4-Maverick", {"message": "rate limited"})
+    monkeypatch.setattr(llama_assembly_chat, "stream_agent_with_files", failing_stream(error))
+
+    response = client.post("/api/chat", params={"message": "Hello", "stream": "true"})
+
+    # The status line is sent before the agent runs; the error follows in the stream
+    assert response.status_code == 200
+    assert sse_events(response.text) == [
+        ("error", {"status_code": 429, "detail": "SambaNova API rate limit exceeded. Please wait a moment and try again."})
+    ]
+
+
+def test_voice_chat_stream_reports_errors_after_the_transcription(client, sample_audio, sse_events, monkeypatch):
+    error = ModelHTTPError(503, "Llama-4-Maverick", {"message": "overloaded"})
+    monkeypatch.setattr(llama_assembly_voice_chat, "stream_agent_with_files", failing_stream(error))
+
+    response = client.post(
+        "/api/voice-chat", params={"stream": "true"}, files={"file": ("sample.mp3", sample_audio, "audio/mpeg")}
+    )
+
+    events = sse_events(response.text)
+    assert [name for name, _ in events] == ["transcription", "error"]
+    assert events[1][1] == {"status_code": 503, "detail": "AI model error: overloaded"}
+
+
+def test_errors_before_the_stream_starts_keep_their_status(client):
+    response = client.post("/api/chat", params={"message": "Hello", "stream": "true", "session_id": "missing"})
+
+    assert response.status_code == 404
+    assert not response.headers["content-type"].startswith("text/event-stream")
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.stage_graph import StageGraph
+
+
+def test_independent_stages_overlap_and_dependents_get_results():
+    async def scenario():
+        graph = StageGraph()
+
+        async def slow(value):
+            await asyncio.sleep(0.2)
+            return value
+
+        async def combine(a, b):
+            return a + b
+
+        start = time.perf_counter()
+        graph.add("a", lambda: slow(1))
+        graph.add("b", lambda: slow(2))
+        graph.add("sum", combine, after=("a", "b"))
+        results = await graph.run()
+        return results, time.perf_counter() - start, graph
+
+    results, elapsed, graph = asyncio.run(scenario())
+
+    assert results == {"a": 1, "b": 2, "sum": 3}
+    assert elapsed < 0.35
+    # Durations exclude the time a stage spent waiting on its dependencies
+    assert graph.timings["sum"] < 50
+    assert [part.split(";")[0] for part in graph.server_timing().split(", ")] == ["a", "b", "sum", "total"]
+
+
+def test_failed_stage_cancels_the_others():
+    cancelled = []
+
+    async def scenario():
+        graph = StageGraph()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def fail():
+            raise LookupError("no session")
+
+        graph.add("slow", slow)
+        graph.add("fail", fail)
+        graph.add("after_slow", lambda _: asyncio.sleep(0), after=("slow",))
+        await graph.run()
+
+    start = time.perf_counter()
+    with pytest.raises(LookupError):
+        asyncio.run(scenario())
+
+    assert cancelled == ["slow"]
+    assert time.perf_counter() - start < 1
+
+
+def test_missing_session_is_reported_without_waiting_for_transcription(client, sample_audio, monkeypatch):
+    from app.api import llama_assembly_voice_chat
+
+    async def slow_transcription(contents, filename):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(llama_assembly_voice_chat, "transcribe_upload", slow_transcription)
+    start = time.perf_counter()
+    response = client.post(
+        "/api/voice-chat",
+        params={"session_id": "missing"},
+        files={"file": ("sample.mp3", sample_audio, "audio/mpeg")},
+    )
+
+    assert response.status_code == 404
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.lazy_routes import LazyRouters, WaitForRoutesMiddleware
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_defers_heavy_modules():
+    heavy = ["pydantic_ai", "httpx", "PIL", "openai", "sambanova", "google.genai", "pypdf"]
+    script = f"import sys, app.main; print([m for m in {heavy!r} if m in sys.modules])"
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": str(BACKEND_DIR)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_requests_wait_for_lazily_loaded_routes():
+    app = FastAPI()
+    routers = LazyRouters([("app.api.stats", "/api", "Stats")])
+    app.add_middleware(WaitForRoutesMiddleware, routers=routers, exempt_paths=("/health",))
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            assert (await http.get("/health")).status_code == 200
+            stats = asyncio.create_task(http.get("/api/stats"))
+            await asyncio.sleep(0.05)
+            assert not stats.done()
+
+            await routers.load(app)
+            return await stats
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert "sessions" in response.json()
+    assert any(route.path == "/api/stats" for route in app.routes)
+
+
+def test_failed_route_import_is_reported():
+    routers = LazyRouters([("app.api.no_such_module", "/api", "Missing")])
+
+    with pytest.raises(ImportError):
+        asyncio.run(routers.load(FastAPI()))
+    with pytest.raises(RuntimeError, match="failed to load"):
+        asyncio.run(routers.wait())
+    assert not routers.loaded
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.transcription import TranscriptionService, TranscriptionTimeoutError
+
+
+class FakeWhisperService(TranscriptionService):
+    """TranscriptionService whose blocking upstream call is replaced by a scripted one."""
+
+    def __init__(self, behaviour, **kwargs):
+        super().__init__(**kwargs)
+        self.behaviour = behaviour
+
+    def transcribe_from_bytes(self, audio_bytes: bytes, filename: str) -> str:
+        return self.behaviour()
+
+
+def run(service: TranscriptionService):
+    return asyncio.run(service.transcribe_async(b"audio", "clip.wav"))
+
+
+def test_success_counts_as_completed():
+    service = FakeWhisperService(lambda: "hello", max_concurrency=1, timeout_seconds=5)
+
+    assert run(service) == "hello"
+    assert (service.completed, service.failed, service.timed_out) == (1, 0, 0)
+
+
+def test_error_counts_as_failed():
+    def fail():
+        raise ConnectionError("upstream down")
+
+    service = FakeWhisperService(fail, max_concurrency=1, timeout_seconds=5)
+
+    with pytest.raises(ConnectionError):
+        run(service)
+    assert (service.completed, service.failed, service.timed_out) == (0, 1, 0)
+
+
+def test_timeout_counts_as_timed_out():
+    service = FakeWhisperService(lambda: time.sleep(0.5) or "late", max_concurrency=1, timeout_seconds=0.05)
+
+    with pytest.raises(TranscriptionTimeoutError):
+        run(service)
+    stats = service.stats()
+    assert (stats["completed"], stats["failed"], stats["timed_out"]) == (0, 0, 1)
+
+
+def test_timed_out_call_keeps_its_slot_until_its_thread_returns():
+    behaviours = [lambda: time.sleep(0.3) or "late", lambda: "next"]
+    service = FakeWhisperService(lambda: behaviours.pop(0)(), max_concurrency=1, timeout_seconds=0.2)
+
+    async def scenario():
+        with pytest.raises(TranscriptionTimeoutError):
+            await service.transcribe_async(b"audio", "first.wav")
+        assert service.in_flight == 1
+        # The next call waits for the slot, not in the executor queue, so its own timeout still holds
+        text = await service.transcribe_async(b"audio", "second.wav")
+        assert service.in_flight == 0
+        return text
+
+    assert asyncio.run(scenario()) == "next"
+    assert (service.completed, service.failed, service.timed_out) == (1, 0, 1)
@@ -0,0 +1,86 @@
+import asyncio
+
+from app.api.uploads import ROUTE_BODY_LIMITS, UploadLimitMiddleware
+
+
+class EchoApp:
+    """ASGI app that reads the whole body and answers 200 with its size."""
+
+    def __init__(self):
+        self.called = False
+        self.last_message = None
+
+    async def __call__(self, scope, receive, send):
+        self.called = True
+        size = 0
+        while True:
+            message = await receive()
+            self.last_message = message
+            if message["type"] == "http.disconnect":
+                break
+            size += len(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(size).encode()})
+
+
+def call(app, chunks: list[bytes], content_length: int | None = None) -> tuple[list[dict], int]:
+    """Send a POST with the given body chunks; returns the sent messages and how many chunks were read."""
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    scope = {"type": "http", "method": "POST", "path": "/upload", "headers": headers}
+    pending = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+    read = 0
+    sent = []
+
+    async def receive():
+        nonlocal read
+        read += 1
+        return pending.pop(0) if pending else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent, read
+
+
+def test_body_under_the_limit_passes_through():
+    inner = EchoApp()
+    sent, _ = call(UploadLimitMiddleware(inner, limits={"/upload": 10}), [b"12345", b"67890"])
+
+    assert sent[0]["status"] == 200
+    assert sent[1]["body"] == b"10"
+
+
+def test_declared_oversized_body_is_rejected_before_reading():
+    inner = EchoApp()
+    sent, read = call(UploadLimitMiddleware(inner, limits={"/upload": 10}), [b"x" * 11], content_length=11)
+
+    assert sent[0]["status"] == 413
+    assert b"Request body too large" in sent[1]["body"]
+    assert (inner.called, read) == (False, 0)
+
+
+def test_streamed_body_is_cut_off_at_the_limit():
+    inner = EchoApp()
+    chunks = [b"x" * 4] * 10
+    sent, read = call(UploadLimitMiddleware(inner, limits={"/upload": 10}), chunks)
+
+    # Only the 413 is sent; the app sees a disconnect and its own response is dropped
+    assert [message.get("status") for message in sent] == [413, None]
+    assert inner.last_message == {"type": "http.disconnect"}
+    assert read == 3
+
+
+def test_route_limit_applies_to_the_app(client, sample_audio, monkeypatch):
+    monkeypatch.setitem(ROUTE_BODY_LIMITS, "/api/transcribe", 1000)
+
+    response = client.post("/api/transcribe", files={"file": ("sample.mp3", sample_audio, "audio/mpeg")})
+
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Request body too large.")
+    assert client.get("/api/stats").json()["uploads"]["rejected_early"] >= 1
@@ -0,0 +1,122 @@
+import asyncio
+import collections
+import threading
+import time
+
+import httpx
+
+from app.services.upstream_governor import GovernedAsyncTransport, TokenBucket, UpstreamGovernor
+
+
+class QuotaStub:
+    """ASGI app accepting `limit` requests per sliding window and answering the rest with 429 + Retry-After."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.accepted: collections.deque[float] = collections.deque()
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        now = time.monotonic()
+        while self.accepted and self.accepted[0] <= now - self.window_seconds:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.limit:
+            self.rejected += 1
+            retry_after = self.accepted[0] + self.window_seconds - now
+            status, headers = 429, [(b"retry-after", f"{retry_after:.3f}".encode())]
+        else:
+            self.accepted.append(now)
+            status, headers = 200, []
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def governed_client(stub: QuotaStub, governor: UpstreamGovernor) -> httpx.AsyncClient:
+    transport = GovernedAsyncTransport(httpx.ASGITransport(app=stub), governor)
+    return httpx.AsyncClient(transport=transport, base_url="http://upstream")
+
+
+def test_burst_is_paced_to_the_quota():
+    # 20 requests/s with a 0.25s burst; the stub allows the rate plus the burst per second
+    stub = QuotaStub(limit=25, window_seconds=1.0)
+    governor = UpstreamGovernor("test", requests_per_minute=1200, burst_seconds=0.25, admission_timeout_seconds=10)
+
+    async def scenario():
+        async with governed_client(stub, governor) as client:
+            start = time.monotonic()
+            responses = await asyncio.gather(*(client.post("/chat", json={}) for _ in range(20)))
+            return responses, time.monotonic() - start
+
+    responses, elapsed = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200] * 20
+    assert stub.rejected == 0
+    # 5 requests go out at once, the other 15 at 20/s
+    assert elapsed >= 0.7
+    assert governor.stats()["queued"] == 0
+    assert governor.admitted == 20
+
+
+def test_throttled_request_is_retried_after_retry_after():
+    stub = QuotaStub(limit=1, window_seconds=0.3)
+    governor = UpstreamGovernor("test", retry_base_seconds=0.01, admission_timeout_seconds=10)
+
+    async def scenario():
+        async with governed_client(stub, governor) as client:
+            return [(await client.post("/chat", json={})).status_code for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [200, 200]
+    assert stub.rejected == 1
+    assert (governor.throttled, governor.retries) == (1, 1)
+
+
+def test_request_over_the_deadline_is_rejected_locally():
+    stub = QuotaStub(limit=100, window_seconds=1.0)
+    governor = UpstreamGovernor("test", requests_per_minute=60, burst_seconds=1, admission_timeout_seconds=0.2)
+
+    async def scenario():
+        async with governed_client(stub, governor) as client:
+            return [(await client.post("/chat", json={})).status_code for _ in range(2)]
+
+    # The second request would have to wait a second for its token
+    assert asyncio.run(scenario()) == [200, 429]
+    assert len(stub.accepted) == 1
+    assert governor.rejected == 1
+
+
+def test_oversized_request_does_not_leave_the_bucket_in_debt():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=600, burst_seconds=1, clock=lambda: now[0])
+
+    assert bucket.wait_time(1_000_000) == 0
+    bucket.take(1_000_000)
+
+    # The next small request waits for its own tokens, not for the big one's excess
+    assert bucket.wait_time(1) == 0.1
+    now[0] += 0.1
+    assert bucket.wait_time(1) == 0
+
+
+def test_counters_stay_consistent_across_threads_and_the_loop():
+    governor = UpstreamGovernor("test", max_queued=10_000)
+
+    def from_threads():
+        for _ in range(500):
+            governor.acquire_sync(0, governor.deadline())
+
+    async def from_loop():
+        for _ in range(500):
+            await governor.acquire(0, governor.deadline())
+
+    threads = [threading.Thread(target=from_threads) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(from_loop())
+    for thread in threads:
+        thread.join()
+
+    assert governor.queued == 0
+    assert governor.admitted == 2500
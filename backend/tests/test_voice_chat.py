@@ -0,0 +1,36 @@
+def test_transcribe(client, sample_audio):
+    response = client.post("/api/transcribe", files={"file": ("sample.mp3", sample_audio, "audio/mpeg")})
+
+    assert response.status_code == 200
+    assert "stub transcription of sample.mp3" in response.json()["transcription"]
+
+
+def test_voice_chat(client, sample_audio):
+    response = client.post("/api/voice-chat", files={"file": ("sample.mp3", sample_audio, "audio/mpeg")})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filename"] == "sample.mp3"
+    assert "stub transcription" in body["transcription"]
+    assert body["response"]
+
+
+def test_voice_chat_multimodal(client, sample_audio, sample_image):
+    response = client.post(
+        "/api/voice-chat-multimodal",
+        files=[
+            ("audio", ("sample.mp3", sample_audio, "audio/mpeg")),
+            ("images", ("sample.png", sample_image, "image/png")),
+        ],
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filename"] == "sample.mp3"
+    assert body["response"]
+
+
+def test_voice_chat_rejects_empty_audio(client):
+    response = client.post("/api/voice-chat", files={"file": ("empty.mp3", b"", "audio/mpeg")})
+
+    assert response.status_code == 400
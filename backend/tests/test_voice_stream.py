@@ -0,0 +1,65 @@
+from array import array
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.services.voice_activity import UtteranceSegmenter
+
+
+def pcm(ms: int, amplitude: int, sample_rate: int = 16000) -> bytes:
+    """Square wave (speech-level energy) or silence as 16-bit mono PCM."""
+    samples = sample_rate * ms // 1000
+    return array("h", (amplitude if i % 20 < 10 else -amplitude for i in range(samples))).tobytes()
+
+
+def test_segmenter_rejects_frames_without_samples():
+    with pytest.raises(ValueError):
+        UtteranceSegmenter(sample_rate=10)
+
+
+def test_segmenter_cuts_utterance_after_silence():
+    segmenter = UtteranceSegmenter()
+
+    assert segmenter.feed(pcm(300, 3000)) == []
+    segments = segmenter.feed(pcm(600, 0))
+
+    assert len(segments) == 1
+
+
+def test_voice_stream_turn(client):
+    with client.websocket_connect("/api/ws/voice-chat") as ws:
+        ws.send_json({"type": "start", "sample_rate": 16000})
+        assert ws.receive_json() == {"type": "ready"}
+
+        ws.send_bytes(pcm(400, 3000))
+        ws.send_json({"type": "end"})
+
+        segment = ws.receive_json()
+        assert segment["type"] == "segment"
+        assert segment["index"] == 0
+        assert "stub transcription of segment_0.wav" in segment["text"]
+        assert ws.receive_json()["type"] == "transcription"
+        response = ws.receive_json()
+        assert response["type"] == "response"
+        assert response["response"]
+
+
+@pytest.mark.parametrize("sample_rate", [10, 0, -16000, "16000", 16001])
+def test_voice_stream_rejects_bad_sample_rate(client, sample_rate):
+    with client.websocket_connect("/api/ws/voice-chat") as ws:
+        ws.send_json({"type": "start", "sample_rate": sample_rate})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert closed.value.code == 1003
+
+
+def test_voice_stream_unknown_session(client):
+    with client.websocket_connect("/api/ws/voice-chat") as ws:
+        ws.send_json({"type": "start", "session_id": "missing"})
+        error = ws.receive_json()
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert error["status_code"] == 404
+    assert closed.value.code == 1008